@@ -0,0 +1,297 @@
+"""
+Fifth Element Photography - Admin Image Index
+Version: 1.0.0
+
+SQLite index of the image library for the admin panel. Search (FTS5 over
+filename/title/description), gallery filtering, sorting and pagination run
+in SQL, so the admin only builds full image entries for the rows it shows.
+
+The index is rebuilt from scan_images() whenever the library's signature
+changes. The signature covers the names, sizes and mtimes of the images,
+the JSON sidecars in /data, galleries.db and print_ordering.db (Shopify
+status). Checking it is one directory listing, and every worker sees the
+same index.
+
+Usage:
+    from admin_image_index import query_admin_images
+    page = query_admin_images(scan_images, search='heron', sort='date-new', limit=24)
+    page['images'], page['next_cursor'], page['total']
+"""
+
+import os
+import json
+import base64
+import hashlib
+import sqlite3
+import threading
+
+if os.path.exists('/data'):
+    DATA_DIR = '/data'
+    DB_PATH = '/data/admin_image_index.db'
+    PRINT_ORDERING_DB_PATH = '/data/print_ordering.db'
+else:
+    DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'admin_image_index.db')
+    PRINT_ORDERING_DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering.db')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+# Databases in /data whose changes show up in the admin listing
+SOURCE_DATABASES = ('galleries.db', 'print_ordering.db')
+
+# sort name -> [(column, direction)], always ending in a unique column for keyset pagination
+SORTS = {
+    'az': [('title_sort', 'ASC'), ('filename', 'ASC')],
+    'za': [('title_sort', 'DESC'), ('filename', 'DESC')],
+    'date-new': [('date_added', 'DESC'), ('filename', 'DESC')],
+    'date-old': [('date_added', 'ASC'), ('filename', 'ASC')],
+    'live': [('has_shopify', 'DESC'), ('title_sort', 'ASC'), ('filename', 'ASC')],
+    'gallery': [('gallery_names', 'ASC'), ('filename', 'ASC')],
+}
+
+MAX_LIMIT = 500
+
+_refresh_lock = threading.Lock()
+
+
+def get_index_db():
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_index_db(conn):
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS admin_images (
+            filename TEXT PRIMARY KEY,
+            title TEXT,
+            title_sort TEXT,
+            description TEXT,
+            date_added TEXT,
+            gallery_names TEXT,
+            has_shopify INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS admin_images_fts USING fts5(
+            filename, title, description,
+            content='admin_images', content_rowid='rowid'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS admin_index_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    for name, columns in (('title', 'title_sort, filename'),
+                          ('date', 'date_added, filename'),
+                          ('live', 'has_shopify, title_sort, filename'),
+                          ('gallery', 'gallery_names, filename')):
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_admin_images_{name} ON admin_images({columns})')
+    conn.commit()
+
+
+def library_signature(databases=SOURCE_DATABASES):
+    """Hash of name/size/mtime of the images, JSON sidecars and `databases` in /data"""
+    entries = []
+    try:
+        with os.scandir(DATA_DIR) as it:
+            for entry in it:
+                name = entry.name
+                base = name[:-4] if name.endswith(('-wal', '-shm')) else name
+                lower = base.lower()
+                if not (lower.endswith(IMAGE_EXTENSIONS) or lower.endswith('.json') or base in databases):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append(f'{name}:{stat.st_size}:{stat.st_mtime_ns}')
+    except OSError:
+        return None
+    entries.sort()
+    return hashlib.sha1('\n'.join(entries).encode('utf-8')).hexdigest()
+
+
+def _shopify_filenames():
+    try:
+        conn = sqlite3.connect(PRINT_ORDERING_DB_PATH)
+        rows = conn.execute('SELECT DISTINCT image_filename FROM shopify_products').fetchall()
+        conn.close()
+        return {row[0] for row in rows}
+    except sqlite3.Error:
+        return set()
+
+
+def _gallery_names(image):
+    names = []
+    for gallery in image.get('galleries') or []:
+        names.append(gallery.get('name', '') if isinstance(gallery, dict) else str(gallery))
+    return ','.join(names)
+
+
+def rebuild_admin_image_index(images, signature=None):
+    """Replace the index contents with these scan_images() entries in one transaction"""
+    shopify_filenames = _shopify_filenames()
+    rows = [(
+        image['filename'],
+        image.get('title') or '',
+        (image.get('title') or image['filename']).lower(),
+        image.get('description') or '',
+        image.get('date_added') or '',
+        _gallery_names(image),
+        1 if image['filename'] in shopify_filenames else 0
+    ) for image in images]
+
+    conn = get_index_db()
+    try:
+        init_index_db(conn)
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('DELETE FROM admin_images')
+        cursor.executemany('''
+            INSERT INTO admin_images (filename, title, title_sort, description, date_added, gallery_names, has_shopify)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        cursor.execute("INSERT INTO admin_images_fts(admin_images_fts) VALUES ('rebuild')")
+        cursor.execute("INSERT OR REPLACE INTO admin_index_meta (key, value) VALUES ('signature', ?)", (signature,))
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"[ADMIN INDEX] Indexed {len(rows)} images")
+    return len(rows)
+
+
+def _indexed_signature():
+    conn = get_index_db()
+    try:
+        init_index_db(conn)
+        row = conn.execute("SELECT value FROM admin_index_meta WHERE key = 'signature'").fetchone()
+        return row['value'] if row else None
+    finally:
+        conn.close()
+
+
+def ensure_admin_image_index(load_images):
+    """Rebuild the index from load_images() if the library changed since it was built"""
+    signature = library_signature()
+    indexed = _indexed_signature()
+    if indexed and (signature is None or indexed == signature):
+        return False
+
+    with _refresh_lock:
+        # Another thread may have rebuilt it while this one waited
+        if _indexed_signature() == signature and signature is not None:
+            return False
+        rebuild_admin_image_index(load_images(), signature)
+    return True
+
+
+def fts_query(search):
+    """'blue heron' -> '"blue"* "heron"*' (every word, prefix match)"""
+    words = [word.replace('"', '') for word in search.split()]
+    return ' '.join(f'"{word}"*' for word in words if word)
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return values if isinstance(values, list) else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _keyset_condition(sort_columns, values):
+    """WHERE clause selecting rows strictly after `values` in the sort order"""
+    clauses = []
+    params = []
+    for i, (column, direction) in enumerate(sort_columns):
+        parts = [f'a.{prev} = ?' for prev, _ in sort_columns[:i]]
+        parts.append(f"a.{column} {'>' if direction == 'ASC' else '<'} ?")
+        clauses.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:i + 1])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def query_admin_images(load_images, search='', gallery='', sort='az', limit=24, offset=None, cursor=None):
+    """
+    One page of the admin listing.
+    Pass `cursor` (from a previous page's next_cursor) for keyset pagination,
+    or `offset` for numbered pages. Returns {'images', 'total', 'next_cursor'}.
+    """
+    ensure_admin_image_index(load_images)
+
+    sort_columns = SORTS.get(sort, SORTS['az'])
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    where = []
+    params = []
+    if search:
+        query = fts_query(search)
+        if query:
+            where.append('a.rowid IN (SELECT rowid FROM admin_images_fts WHERE admin_images_fts MATCH ?)')
+            params.append(query)
+    if gallery and gallery != 'all':
+        where.append('''a.filename IN (
+            SELECT gi.image_filename FROM g.gallery_images gi
+            JOIN g.galleries gal ON gal.id = gi.gallery_id
+            WHERE lower(gal.slug) = lower(?) OR lower(gal.name) = lower(?)
+        )''')
+        params.extend([gallery, gallery])
+
+    conn = get_index_db()
+    try:
+        if gallery and gallery != 'all':
+            conn.execute('ATTACH DATABASE ? AS g', (os.path.join(DATA_DIR, 'galleries.db'),))
+
+        filter_sql = ('WHERE ' + ' AND '.join(where)) if where else ''
+        total = conn.execute(f'SELECT COUNT(*) FROM admin_images a {filter_sql}', params).fetchone()[0]
+
+        page_where = list(where)
+        page_params = list(params)
+        cursor_values = decode_cursor(cursor) if cursor else None
+        if cursor_values and len(cursor_values) == len(sort_columns):
+            condition, condition_params = _keyset_condition(sort_columns, cursor_values)
+            page_where.append(condition)
+            page_params.extend(condition_params)
+
+        page_sql = ('WHERE ' + ' AND '.join(page_where)) if page_where else ''
+        order_sql = ', '.join(f'a.{column} {direction}' for column, direction in sort_columns)
+        page_params.append(limit + 1)
+        offset_sql = ''
+        if offset and not cursor_values:
+            offset_sql = ' OFFSET ?'
+            page_params.append(int(offset))
+
+        rows = conn.execute(f'''
+            SELECT a.* FROM admin_images a
+            {page_sql}
+            ORDER BY {order_sql}
+            LIMIT ?{offset_sql}
+        ''', page_params).fetchall()
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    images = [{
+        'filename': row['filename'],
+        'title': row['title'],
+        'description': row['description'],
+        'date_added': row['date_added'] or None,
+        'galleries': [name for name in (row['gallery_names'] or '').split(',') if name],
+        'has_shopify_products': bool(row['has_shopify']),
+        'thumbnail_url': f"/thumbnail/{row['filename']}"
+    } for row in rows]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor([rows[-1][column] for column, _ in sort_columns])
+
+    return {'images': images, 'total': total, 'next_cursor': next_cursor}
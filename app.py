@@ -2,7 +2,7 @@
 # Print ordering removed - Gallery and admin tools only
 # See app_version.py for changelog and REMOVAL_LOG_20251027.md for details
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, send_from_directory, abort
 import os
 import json
 import sqlite3
@@ -53,6 +53,8 @@ from routes.shopify_api_creator import shopify_api_creator_bp
 from routes.shopify_bulk_update import shopify_bulk_update_bp
 from routes.shopify_status_api import shopify_status_api_bp
 from routes.shopify_price_sync_api import shopify_price_sync_bp
+from routes.shopify_catalog_api import shopify_catalog_api_bp
+from routes.jobs_api import jobs_api_bp
 from routes.add_metal_migration import add_metal_bp
 from routes.debug_metal import debug_metal_bp
 from routes.fix_metal_36x36 import fix_metal_36x36_bp
@@ -83,6 +85,8 @@ app.register_blueprint(shopify_api_creator_bp)
 app.register_blueprint(shopify_bulk_update_bp)
 app.register_blueprint(shopify_status_api_bp)
 app.register_blueprint(shopify_price_sync_bp)
+app.register_blueprint(shopify_catalog_api_bp)
+app.register_blueprint(jobs_api_bp)
 app.register_blueprint(add_metal_bp)
 app.register_blueprint(debug_metal_bp)
 app.register_blueprint(fix_metal_36x36_bp)
@@ -105,6 +109,17 @@ app.register_blueprint(print_notifications_bp)
 app.register_blueprint(clean_descriptions_admin_bp)
 app.register_blueprint(database_backup_bp)
 
+# Cached read-only JSON APIs are invalidated after every successful admin write
+from response_cache import cached_response, install_write_invalidation, CATALOG, IMAGES, HERO
+install_write_invalidation(app)
+
+# SQL behind /api/hierarchical/* (shared with test_query_plans.py)
+from hierarchical_queries import (PRODUCT_TYPES_SQL, SUB_OPTIONS_SQL, MARKUP_PERCENTAGE_SQL, PRODUCT_DETAILS_SQL,
+                                  build_available_sizes_query)
+
+# Background jobs (the runner is started at the end of this module, once every job type is registered)
+from job_runner import start_job_runner, register_job_type, submit_job
+
 # Initialize database if it doesn't exist
 def ensure_database_exists():
     """Ensure the database exists and has the required schema"""
@@ -179,6 +194,14 @@ def ensure_database_exists():
 # Call initialization on startup
 ensure_database_exists()
 
+# Covering indexes for pricing/ordering queries (idempotent)
+from migrate_query_indexes import run_index_migrations
+run_index_migrations()
+
+# Exploded lumaprints_options for indexed option filtering (kept in sync by triggers)
+from product_option_links import ensure_product_option_links
+ensure_product_option_links()
+
 # Admin system - Multi-user support (up to 4 users)
 ADMIN_USERS_FILE = "data/admin_users.json"
 ADMIN_CONFIG_FILE = "admin_config.json"
@@ -372,6 +395,13 @@ ABOUT_FILE = '/data/about.json'
 # Register regenerate gallery image route (must be after require_admin_auth is defined)
 register_regenerate_gallery_image_route(app, require_admin_auth, IMAGES_FOLDER)
 
+# Portfolio order moved from /data/<image>.json sidecars into galleries.db (one-shot, marked done in its migrations table)
+try:
+    from gallery_db import migrate_portfolio_order_sidecars
+    migrate_portfolio_order_sidecars(IMAGES_FOLDER)
+except Exception as e:
+    print(f"Portfolio order migration failed: {e}")
+
 # Lumaprints configuration
 ORDERS_FILE = '/data/lumaprints_orders.json'
 LUMAPRINTS_CATALOG_FILE = os.path.join(os.path.dirname(__file__), 'lumaprints_catalog.json')
@@ -646,158 +676,177 @@ def save_carousel_images(carousel_list):
     with open('/data/carousel_images.json', 'w') as f:
         json.dump(carousel_list, f)
 
+# Default categories mapping for auto-detection
+DEFAULT_CATEGORY_KEYWORDS = {
+    'portrait': ['portrait', 'headshot', 'person', 'people', 'face'],
+    'landscape': ['mountain', 'lake', 'sunset', 'landscape', 'nature', 'scenic'],
+    'wildlife': ['bird', 'animal', 'turkey', 'duck', 'rabbit', 'crane', 'sparrow', 'woodpecker'],
+    'wedding': ['wedding', 'bride', 'groom', 'celebration', 'reception'],
+    'commercial': ['logo', 'business', 'corporate', 'commercial'],
+    'street': ['street', 'urban', 'city', 'skyline']
+}
+
+def load_image_catalog_data(filenames=None):
+    """
+    Load the saved per-image data (categories, titles, flags, EXIF, portfolio order) shared by every image entry.
+    With `filenames`, EXIF and portfolio order are looked up for just those images (one page, not the library).
+    """
+    from exif_db_helper import get_all_exif_from_db, get_exif_for_filenames
+    from gallery_db import get_portfolio_order
+    return {
+        'image_categories': load_image_categories(),
+        'image_descriptions': load_image_descriptions(),
+        'image_titles': load_image_titles(),
+        'background_images': load_background_images(),
+        'featured_image_data': load_featured_image(),
+        'hero_image_data': load_hero_image(),
+        'carousel_images': load_carousel_images(),
+        'exif': get_all_exif_from_db() if filenames is None else get_exif_for_filenames(filenames),
+        'portfolio_order': get_portfolio_order(filenames)
+    }
+
+def build_image_entry(filename, catalog_data):
+    """Build the image dict used by templates and APIs for one file in /data"""
+    filepath = os.path.join(IMAGES_FOLDER, filename)
+    image_categories = catalog_data['image_categories']
+    image_descriptions = catalog_data['image_descriptions']
+    image_titles = catalog_data['image_titles']
+    background_images = catalog_data['background_images']
+    featured_image_data = catalog_data['featured_image_data']
+    hero_image_data = catalog_data['hero_image_data']
+    carousel_images = catalog_data['carousel_images']
+    default_categories = DEFAULT_CATEGORY_KEYWORDS
+    
+    # Use saved category assignment or auto-detect
+    if filename in image_categories:
+        # Handle both old (string) and new (list) formats
+        categories = image_categories[filename]
+        if isinstance(categories, str):
+            category = categories  # Old format compatibility
+        elif isinstance(categories, list) and len(categories) > 0:
+            category = categories[0]  # Use first category for display
+        else:
+            category = 'other'
+    else:
+        # Auto-detect category based on filename
+        category = 'other'
+        filename_lower = filename.lower()
+        for cat, keywords in default_categories.items():
+            if any(keyword in filename_lower for keyword in keywords):
+                category = cat
+                break
+    
+    # Get description
+    description = image_descriptions.get(filename, '')
+    
+    # Get title (use saved title or generate from filename)
+    if filename in image_titles:
+        title = image_titles[filename]
+    else:
+        # Create clean title from filename
+        title = filename.replace('-', ' ').replace('_', ' ')
+        title = os.path.splitext(title)[0]
+        title = ' '.join(word.capitalize() for word in title.split())
+    
+    # Check if image is marked for background use
+    is_background = filename in background_images
+    
+    # Check if image is the weekly featured image
+    is_featured = featured_image_data and featured_image_data.get('filename') == filename
+    
+    # Check if image is the hero image
+    is_hero = hero_image_data and hero_image_data.get('filename') == filename
+    
+    # Check if image is marked for homepage carousel
+    show_in_carousel = filename in carousel_images
+    
+    # SINGLE SOURCE: Use description as the story (no separate featured_story)
+    # Description and story are now the same field
+    featured_story = description
+    
+    # EXIF and metadata from the EXIF database (filled at ingest, one query for all images)
+    exif_data = catalog_data['exif'].get(filename)
+    
+    # Dimensions from the EXIF database, else image info (skip network fetch during startup to prevent timeouts)
+    if exif_data and exif_data.get('width'):
+        info = {'width': exif_data['width'], 'height': exif_data['height']}
+    else:
+        info = get_image_info(filepath, skip_network_fetch=True)
+    
+    # Get file modification time for date_added
+    date_added = None
+    try:
+        import datetime
+        mtime = os.path.getmtime(filepath)
+        date_added = datetime.datetime.fromtimestamp(mtime).isoformat()
+    except Exception as e:
+        print(f"Warning: Failed to get date for {filename}: {e}")
+    
+    # Portfolio position (None if the image hasn't been ordered)
+    display_order = catalog_data['portfolio_order'].get(filename)
+    
+    # Get all categories for this image (for frontend filtering)
+    all_cats = image_categories.get(filename, [category])
+    if isinstance(all_cats, str):
+        all_cats = [all_cats]
+    
+    # Check if thumbnail exists for this image
+    thumb_filename = f"thumb_{filename}"
+    thumb_path = os.path.join(os.path.dirname(__file__), f"static/thumbnails/{thumb_filename}")
+    thumbnail_url = f'/static/thumbnails/{thumb_filename}' if os.path.exists(thumb_path) else None
+    
+    # Get galleries for this image
+    galleries = []
+    try:
+        from gallery_db import get_galleries_for_image
+        gallery_list = get_galleries_for_image(filename)
+        galleries = [g['name'] for g in gallery_list]
+    except Exception as e:
+        print(f"Warning: Failed to get galleries for {filename}: {e}")
+    
+    return {
+        'filename': filename,
+        'title': title,
+        'category': category,  # Primary category (first one)
+        'all_categories': all_cats,  # All categories for filtering
+        'galleries': galleries,  # List of gallery names this image belongs to
+        'description': description,
+        'is_background': is_background,
+        'is_featured': is_featured,
+        'is_hero': is_hero,
+        'show_in_carousel': show_in_carousel,
+        'story': featured_story,
+        'url': f'/images/{filename}',
+        'thumbnail_url': thumbnail_url,
+        'width': info['width'],
+        'height': info['height'],
+        'display_order': display_order,
+        'date_added': date_added,
+        # EXIF data loaded from database (instant, no file extraction)
+        'model': exif_data.get('model') if exif_data else None,
+        'lens': exif_data.get('lens') if exif_data else None,
+        'aperture': exif_data.get('aperture') if exif_data else None,
+        'shutter_speed': exif_data.get('shutter_speed') if exif_data else None,
+        'iso': exif_data.get('iso') if exif_data else None,
+        'focal_length': exif_data.get('focal_length') if exif_data else None
+    }
+
+def get_image_entries(filenames):
+    """Image dicts for just these files, in the given order (missing files are skipped)"""
+    filenames = [filename for filename in filenames if os.path.isfile(os.path.join(IMAGES_FOLDER, filename))]
+    catalog_data = load_image_catalog_data(filenames)
+    return [build_image_entry(filename, catalog_data) for filename in filenames]
+
 def scan_images():
     """Scan /data directory for images"""
     images = []
     if not os.path.exists(IMAGES_FOLDER):
         return images
     
-    # Load saved data
-    image_categories = load_image_categories()
-    image_descriptions = load_image_descriptions()
-    image_titles = load_image_titles()
-    background_images = load_background_images()
-    featured_image_data = load_featured_image()
-    hero_image_data = load_hero_image()
-    carousel_images = load_carousel_images()
-    
-    # Default categories mapping for auto-detection
-    default_categories = {
-        'portrait': ['portrait', 'headshot', 'person', 'people', 'face'],
-        'landscape': ['mountain', 'lake', 'sunset', 'landscape', 'nature', 'scenic'],
-        'wildlife': ['bird', 'animal', 'turkey', 'duck', 'rabbit', 'crane', 'sparrow', 'woodpecker'],
-        'wedding': ['wedding', 'bride', 'groom', 'celebration', 'reception'],
-        'commercial': ['logo', 'business', 'corporate', 'commercial'],
-        'street': ['street', 'urban', 'city', 'skyline']
-    }
-    
+    catalog_data = load_image_catalog_data()
     for filename in os.listdir(IMAGES_FOLDER):
         if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-            filepath = os.path.join(IMAGES_FOLDER, filename)
-            
-            # Use saved category assignment or auto-detect
-            if filename in image_categories:
-                # Handle both old (string) and new (list) formats
-                categories = image_categories[filename]
-                if isinstance(categories, str):
-                    category = categories  # Old format compatibility
-                elif isinstance(categories, list) and len(categories) > 0:
-                    category = categories[0]  # Use first category for display
-                else:
-                    category = 'other'
-            else:
-                # Auto-detect category based on filename
-                category = 'other'
-                filename_lower = filename.lower()
-                for cat, keywords in default_categories.items():
-                    if any(keyword in filename_lower for keyword in keywords):
-                        category = cat
-                        break
-            
-            # Get description
-            description = image_descriptions.get(filename, '')
-            
-            # Get title (use saved title or generate from filename)
-            if filename in image_titles:
-                title = image_titles[filename]
-            else:
-                # Create clean title from filename
-                title = filename.replace('-', ' ').replace('_', ' ')
-                title = os.path.splitext(title)[0]
-                title = ' '.join(word.capitalize() for word in title.split())
-            
-            # Check if image is marked for background use
-            is_background = filename in background_images
-            
-            # Check if image is the weekly featured image
-            is_featured = featured_image_data and featured_image_data.get('filename') == filename
-            
-            # Check if image is the hero image
-            is_hero = hero_image_data and hero_image_data.get('filename') == filename
-            
-            # Check if image is marked for homepage carousel
-            show_in_carousel = filename in carousel_images
-            
-            # SINGLE SOURCE: Use description as the story (no separate featured_story)
-            # Description and story are now the same field
-            featured_story = description
-            
-            # Get image info (skip network fetch during startup to prevent timeouts)
-            info = get_image_info(filepath, skip_network_fetch=True)
-            
-            # Get file modification time for date_added
-            date_added = None
-            try:
-                import datetime
-                mtime = os.path.getmtime(filepath)
-                date_added = datetime.datetime.fromtimestamp(mtime).isoformat()
-            except Exception as e:
-                print(f"Warning: Failed to get date for {filename}: {e}")
-            
-            # Load display order from metadata if available
-            display_order = None
-            metadata_file = os.path.join(IMAGES_FOLDER, f"{filename}.json")
-            if os.path.exists(metadata_file):
-                try:
-                    with open(metadata_file, 'r') as f:
-                        metadata = json.load(f)
-                        display_order = metadata.get('display_order')
-                except:
-                    pass
-            
-            # Get all categories for this image (for frontend filtering)
-            all_cats = image_categories.get(filename, [category])
-            if isinstance(all_cats, str):
-                all_cats = [all_cats]
-            
-            # Check if thumbnail exists for this image
-            thumb_filename = f"thumb_{filename}"
-            thumb_path = os.path.join(os.path.dirname(__file__), f"static/thumbnails/{thumb_filename}")
-            thumbnail_url = f'/static/thumbnails/{thumb_filename}' if os.path.exists(thumb_path) else None
-            
-            # Get EXIF data from database (instant retrieval)
-            exif_data = None
-            try:
-                from exif_db_helper import get_exif_from_db
-                exif_data = get_exif_from_db(filename)
-            except Exception as e:
-                print(f"Warning: Failed to get EXIF for {filename}: {e}")
-            
-            # Get galleries for this image
-            galleries = []
-            try:
-                from gallery_db import get_galleries_for_image
-                gallery_list = get_galleries_for_image(filename)
-                galleries = [g['name'] for g in gallery_list]
-            except Exception as e:
-                print(f"Warning: Failed to get galleries for {filename}: {e}")
-            
-            images.append({
-                'filename': filename,
-                'title': title,
-                'category': category,  # Primary category (first one)
-                'all_categories': all_cats,  # All categories for filtering
-                'galleries': galleries,  # List of gallery names this image belongs to
-                'description': description,
-                'is_background': is_background,
-                'is_featured': is_featured,
-                'is_hero': is_hero,
-                'show_in_carousel': show_in_carousel,
-                'story': featured_story,
-                'url': f'/images/{filename}',
-                'thumbnail_url': thumbnail_url,
-                'width': info['width'],
-                'height': info['height'],
-                'display_order': display_order,
-                'date_added': date_added,
-                # EXIF data loaded from database (instant, no file extraction)
-                'model': exif_data.get('model') if exif_data else None,
-                'lens': exif_data.get('lens') if exif_data else None,
-                'aperture': exif_data.get('aperture') if exif_data else None,
-                'shutter_speed': exif_data.get('shutter_speed') if exif_data else None,
-                'iso': exif_data.get('iso') if exif_data else None,
-                'focal_length': exif_data.get('focal_length') if exif_data else None
-            })
+            images.append(build_image_entry(filename, catalog_data))
     
     # Sort images by display_order if available, otherwise by filename
     def sort_key(img):
@@ -813,10 +862,8 @@ def scan_images():
 @app.route('/')
 def index():
     """Main homepage with carousel"""
-    from gallery_db import get_all_galleries
-    from navigation_helpers import get_navigation_for_template
-    galleries = get_all_galleries()
-    nav_items = get_navigation_for_template()
+    from navigation_helpers import get_site_navigation
+    nav_items, galleries = get_site_navigation()
     
     # Check if an image parameter is provided for Open Graph tags
     image_param = request.args.get('image')
@@ -831,11 +878,80 @@ def index():
     
     return render_template('index_new.html', galleries=galleries, nav_items=nav_items, og_image_data=og_image_data)
 
+# Portfolio/mobile view model, rebuilt only when the library signature changes
+# (images, JSON sidecars, galleries/Shopify/EXIF databases in /data)
+_portfolio_view_model = {'signature': None, 'model': None}
+
+def build_portfolio_view_model():
+    """Precompute everything portfolio() and mobile_new() render"""
+    from collections import Counter
+    from exif_db_helper import get_exif_from_db
+    
+    images = scan_images()
+    categories = sorted(load_categories())
+    by_filename = {image['filename']: image for image in images}
+    
+    # Count images in all their assigned categories (portfolio) and by primary category (mobile-new)
+    assigned_counts = Counter()
+    for filename, img_cats in load_image_categories().items():
+        if filename not in by_filename:
+            continue
+        if isinstance(img_cats, str):
+            img_cats = [img_cats]
+        assigned_counts.update(set(img_cats))
+    primary_counts = Counter(image['category'] for image in images)
+    
+    # First image of each category, for Open Graph fallbacks
+    first_image_by_category = {}
+    for image in images:
+        for category in image.get('all_categories') or [image.get('category', '')]:
+            first_image_by_category.setdefault(category, image)
+    
+    # Featured image from featured_image.json, else first landscape image, else first image
+    featured_image_data = load_featured_image()
+    featured_image = by_filename.get(featured_image_data.get('filename')) if featured_image_data else None
+    if not featured_image:
+        featured_image = next((image for image in images if image['category'] == 'landscape'), None)
+        if not featured_image and images:
+            featured_image = images[0]
+    
+    # Featured EXIF comes from the EXIF database (filled at ingest / by the EXIF backfill job)
+    featured_exif = None
+    if featured_image:
+        featured_exif = get_exif_from_db(featured_image['filename'])
+        
+        # Load story from featured_stories.json
+        featured_stories = load_featured_stories()
+        featured_image['story'] = featured_stories.get(featured_image['filename'], '')
+    
+    hero_image_data = load_hero_image()
+    hero_image = by_filename.get(hero_image_data.get('filename')) if hero_image_data else None
+    
+    return {
+        'images': images,
+        'categories': categories,
+        'category_counts': {category: assigned_counts[category] for category in categories},
+        'primary_category_counts': {category: primary_counts[category] for category in categories},
+        'first_image_by_category': first_image_by_category,
+        'featured_image': featured_image,
+        'featured_exif': featured_exif,
+        'hero_image': hero_image,
+        'about_data': load_about_data()
+    }
+
+def get_portfolio_view_model():
+    """Memoized portfolio view model (rebuilt when anything it is built from changes)"""
+    from admin_image_index import library_signature, SOURCE_DATABASES
+    signature = library_signature(SOURCE_DATABASES + ('image_exif.db',))
+    if signature is None or _portfolio_view_model['signature'] != signature:
+        _portfolio_view_model['model'] = build_portfolio_view_model()
+        _portfolio_view_model['signature'] = signature
+    return _portfolio_view_model['model']
+
 @app.route('/portfolio')
 def portfolio():
     """Full portfolio page (old layout)"""
-    images = scan_images()
-    categories = sorted(load_categories())
+    view_model = get_portfolio_view_model()
     
     # Check for category parameter for Open Graph tags
     category_param = request.args.get('category')
@@ -852,110 +968,25 @@ def portfolio():
             # Use static OG image for this category
             og_image = {'url': og_image_path, 'title': f"{category_param.title()} Gallery"}
         else:
-            # Fallback: try to find first image in category from persistent storage
-            for img in images:
-                # Check all_categories field (new format) or category field (old format)
-                img_cats = img.get('all_categories', [])
-                if not img_cats:
-                    # Fallback to single category field
-                    img_cats = [img.get('category', '')]
-                if category_param in img_cats:
-                    og_image = img
-                    break
+            # Fallback: first image in the category
+            og_image = view_model['first_image_by_category'].get(category_param)
         
         og_title = f"Fifth Element Photography - {category_param.title()} Gallery"
         og_description = f"Explore {category_param} photography with artistic vision and technical excellence"
     
-    # Get category counts (count images in all their assigned categories)
-    category_counts = {}
-    image_categories = load_image_categories()
-    for category in categories:
-        count = 0
-        for img in images:
-            img_cats = image_categories.get(img['filename'], [])
-            if isinstance(img_cats, str):
-                img_cats = [img_cats]
-            if category in img_cats:
-                count += 1
-        category_counts[category] = count
-    
-    # Get featured image from featured_image.json
-    featured_image = None
-    featured_image_data = load_featured_image()
-    if featured_image_data and featured_image_data.get('filename'):
-        # Find the featured image in the images list
-        for image in images:
-            if image['filename'] == featured_image_data['filename']:
-                featured_image = image
-                break
-    
-    # If no featured image is set, fallback to first landscape image or first image
-    if not featured_image:
-        for image in images:
-            if image['category'] == 'landscape':
-                featured_image = image
-                break
-        if not featured_image and images:
-            featured_image = images[0]
-    
-    # Extract EXIF data for featured image
-    featured_exif = None
-    if featured_image:
-        image_path = os.path.join(IMAGES_FOLDER, featured_image['filename'])
-        featured_exif = extract_exif_data(image_path)
-        
-        # Load story from featured_stories.json
-        featured_stories = load_featured_stories()
-        featured_image['story'] = featured_stories.get(featured_image['filename'], '')
-    
-    about_data = load_about_data()
-
-    # Load hero image for admin template
-    hero_image_data = load_hero_image()
-    hero_image = None
-    if hero_image_data and hero_image_data.get("filename"):
-        # Find the hero image in the images list
-        for image in images:
-            if image["filename"] == hero_image_data["filename"]:
-                hero_image = image
-                break
-    
-    # Load hero image for mobile template
-    hero_image_data = load_hero_image()
-    hero_image = None
-    if hero_image_data and hero_image_data.get('filename'):
-        # Find the hero image in the images list
-        for image in images:
-            if image['filename'] == hero_image_data['filename']:
-                hero_image = image
-                break
-    
     # Mobile detection - serve different template based on device
-    if is_mobile_device():
-        return render_template('mobile_new.html', 
-                             images=images, 
-                             categories=categories,
-                             category_counts=category_counts,
-                             featured_image=featured_image,
-                             featured_exif=featured_exif,
-                             about_data=about_data,
-                             hero_image=hero_image,
-                             og_image=og_image,
-                             og_title=og_title,
-                             og_description=og_description)
-    else:
-        # Desktop users get the original template (unchanged)
-        return render_template('index.html', 
-                             images=images, 
-                             categories=categories,
-                             category_counts=category_counts,
-                             featured_image=featured_image,
-                             featured_exif=featured_exif,
-                             about_data=about_data,
-                             hero_image=hero_image,
-                             og_image=og_image,
-                             og_title=og_title,
-                             og_description=og_description)
+    template = 'mobile_new.html' if is_mobile_device() else 'index.html'
+    return render_template(template, 
+                         images=view_model['images'], 
+                         categories=view_model['categories'],
+                         category_counts=view_model['category_counts'],
+                         featured_image=view_model['featured_image'],
+                         featured_exif=view_model['featured_exif'],
+                         about_data=view_model['about_data'],
+                         hero_image=view_model['hero_image'],
+                         og_image=og_image,
+                         og_title=og_title,
+                         og_description=og_description)
 
 @app.route('/mobile')
 def mobile_gallery():
@@ -963,67 +994,19 @@ def mobile_gallery():
     """Mobile-optimized gallery page"""
     return render_template('mobile_new.html')
 
-@app.route('/mobile-new')
 @app.route('/mobile-new')
 def mobile_new():
     """Mobile layout with admin data - using same data loading as main route"""
-    images = scan_images()
-    categories = sorted(load_categories())
-    
-    # Get category counts (same as main route)
-    category_counts = {}
-    for category in categories:
-        category_counts[category] = len([img for img in images if img['category'] == category])
-    
-    # Get featured image from featured_image.json (same as main route)
-    featured_image = None
-    featured_image_data = load_featured_image()
-    if featured_image_data and featured_image_data.get('filename'):
-        # Find the featured image in the images list
-        for image in images:
-            if image['filename'] == featured_image_data['filename']:
-                featured_image = image
-                break
-    
-    # If no featured image is set, fallback to first landscape image or first image (same as main route)
-    if not featured_image:
-        for image in images:
-            if image['category'] == 'landscape':
-                featured_image = image
-                break
-        if not featured_image and images:
-            featured_image = images[0]
-    
-    # Extract EXIF data for featured image (same as main route)
-    featured_exif = None
-    if featured_image:
-        image_path = os.path.join(IMAGES_FOLDER, featured_image['filename'])
-        featured_exif = extract_exif_data(image_path)
-        
-        # Load story from featured_stories.json
-        featured_stories = load_featured_stories()
-        featured_image['story'] = featured_stories.get(featured_image['filename'], '')
-    
-    about_data = load_about_data()
-
-    # Load hero image (same as main route)
-    hero_image_data = load_hero_image()
-    hero_image = None
-    if hero_image_data and hero_image_data.get('filename'):
-        # Find the hero image in the images list
-        for image in images:
-            if image['filename'] == hero_image_data['filename']:
-                hero_image = image
-                break
-    
+    view_model = get_portfolio_view_model()
     return render_template("mobile_new.html",
-                         images=images,
-                         categories=categories,
-                         category_counts=category_counts,
-                         featured_image=featured_image,
-                         featured_exif=featured_exif,
-                         about_data=about_data,
-                         hero_image=hero_image)
+                         images=view_model['images'],
+                         categories=view_model['categories'],
+                         category_counts=view_model['primary_category_counts'],
+                         featured_image=view_model['featured_image'],
+                         featured_exif=view_model['featured_exif'],
+                         about_data=view_model['about_data'],
+                         hero_image=view_model['hero_image'])
+
 @app.route('/featured')
 def featured():
     """Featured Image of the Week page"""
@@ -1040,11 +1023,9 @@ def featured():
         # If no featured image is set, return to index
         return redirect(url_for('index'))
     
-    # Extract EXIF data from the actual featured image
-    exif_data = None
-    if featured_image:
-        image_path = os.path.join(IMAGES_FOLDER, featured_image['filename'])
-        exif_data = extract_exif_data(image_path)
+    # EXIF data for the featured image from the EXIF database
+    from exif_db_helper import get_exif_from_db
+    exif_data = get_exif_from_db(featured_image['filename'])
     
     return render_template('featured.html', 
                          featured_image=featured_image,
@@ -1071,17 +1052,7 @@ def image_detail(filename):
     print(f"[IMAGE_DETAIL] Image URL: {image.get('url', 'NO URL')}")
     print(f"[IMAGE_DETAIL] Image dimensions: {image.get('width', 'NO WIDTH')}x{image.get('height', 'NO HEIGHT')}")
     
-    # Extract EXIF data on-demand for detail view
-    filepath = os.path.join(IMAGES_FOLDER, filename)
-    if os.path.exists(filepath):
-        exif_data = extract_exif_data(filepath)
-        # Update image dict with fresh EXIF data
-        image['model'] = exif_data.get('model')
-        image['lens'] = exif_data.get('lens')
-        image['aperture'] = exif_data.get('aperture')
-        image['shutter_speed'] = exif_data.get('shutter_speed')
-        image['iso'] = exif_data.get('iso')
-        image['focal_length'] = exif_data.get('focal_length')
+    # EXIF fields on the image dict come from the EXIF database (no file access here)
     
     # Check if image has Shopify product mapping
     has_shopify_product = False
@@ -1100,11 +1071,36 @@ def image_detail(filename):
     return render_template('image_detail.html', image=image, has_shopify_product=has_shopify_product)
 
 @app.route('/api/images')
+@cached_response(IMAGES, ttl=300)
 def api_images():
     """API endpoint for images"""
     images = scan_images()
     return jsonify(images)
 
+@app.route('/api/photos/search')
+@cached_response(IMAGES, ttl=300)
+def api_photos_search():
+    """
+    Faceted photo search on EXIF: ?camera=&lens=&focal_min=300&focal_max=600&iso_max=800
+    (also aperture_* and exposure_* in seconds), &sort=focal|-iso|..., &limit=&offset=
+    """
+    from exif_search import parse_filters, search_photos
+    try:
+        filters = parse_filters(request.args)
+        result = search_photos(filters,
+                               limit=request.args.get('limit', 48, type=int),
+                               offset=request.args.get('offset', 0, type=int),
+                               sort=request.args.get('sort'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'total': result['total'],
+        'images': get_image_entries(result['filenames']),
+        'facets': result['facets']
+    })
+
 # Removed duplicate subcategories route - using the one at line ~2463 instead
 
 @app.route('/images/<filename>')
@@ -1156,60 +1152,22 @@ def get_thumbnail(filename):
 def get_gallery_image(filename):
     """Generate and serve gallery-optimized images (1200px wide for public display)"""
     try:
-        from PIL import Image
-        import io
         from flask import make_response
-        import os.path
-        
-        # Check if gallery image already exists
-        gallery_path = os.path.join('/data/gallery-images', filename)
-        if os.path.exists(gallery_path):
-            # Get file modification time for cache busting
-            mtime = os.path.getmtime(gallery_path)
-            response = make_response(send_file(gallery_path))
-            response.headers['Cache-Control'] = 'public, max-age=300'  # 5 minute cache
-            response.headers['Last-Modified'] = str(int(mtime))
-            response.headers['ETag'] = f'"{filename}-{int(mtime)}"'
-            return response
         
-        # Create gallery-images directory if it doesn't exist
-        os.makedirs('/data/gallery-images', exist_ok=True)
-        
-        # Open original image
-        original_path = os.path.join(IMAGES_FOLDER, filename)
-        if not os.path.exists(original_path):
+        # Cached rendition for the image's watermark settings (rendered from the original on a miss)
+        from gallery_renditions import ensure_gallery_image, rendition_path, get_watermark_settings
+        if not os.path.exists(rendition_path(filename, get_watermark_settings(filename))) and \
+                not os.path.exists(os.path.join(IMAGES_FOLDER, filename)):
             return jsonify({'error': 'Image not found'}), 404
-        
-        with Image.open(original_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Get original dimensions
-            orig_width, orig_height = img.size
-            
-            # Calculate new dimensions (max 1200px on longest side)
-            max_dimension = 1200
-            if orig_width > orig_height:
-                new_width = max_dimension
-                new_height = int((max_dimension / orig_width) * orig_height)
-            else:
-                new_height = max_dimension
-                new_width = int((max_dimension / orig_height) * orig_width)
-            
-            # Resize image with high quality
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save gallery image with good quality
-            img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-            
-            # Return with cache headers
-            mtime = os.path.getmtime(gallery_path)
-            response = make_response(send_file(gallery_path))
-            response.headers['Cache-Control'] = 'public, max-age=300'  # 5 minute cache
-            response.headers['Last-Modified'] = str(int(mtime))
-            response.headers['ETag'] = f'"{filename}-{int(mtime)}"'
-            return response
+        gallery_path = ensure_gallery_image(filename, images_folder=IMAGES_FOLDER)
+        
+        # Get file modification time for cache busting
+        mtime = os.path.getmtime(gallery_path)
+        response = make_response(send_file(gallery_path))
+        response.headers['Cache-Control'] = 'public, max-age=300'  # 5 minute cache
+        response.headers['Last-Modified'] = str(int(mtime))
+        response.headers['ETag'] = f'"{filename}-{int(mtime)}"'
+        return response
             
     except Exception as e:
         # Fallback to original image if gallery image generation fails
@@ -1490,65 +1448,23 @@ def admin():
         gallery_filter = request.args.get('gallery', '').strip()
         sort_by = request.args.get('sort', 'az').strip()
         
-        all_images_unfiltered = scan_images()  # Keep unfiltered copy for Shopify tab
-        images = list(all_images_unfiltered)  # Create copy for filtering
         all_categories = sorted(load_categories())
         
         # Get all galleries for filter dropdown
         from gallery_db import get_all_galleries
         all_galleries = get_all_galleries()
         
-        # Apply search filter
-        if search_query:
-            images = [img for img in images if search_query in img.get('filename', '').lower() or search_query in img.get('title', '').lower()]
-        
-        # Apply gallery filter
-        if gallery_filter and gallery_filter != 'all':
-            def matches_gallery(img):
-                galleries = img.get('galleries', [])
-                if not galleries:
-                    return False
-                # Handle both string and object formats, case-insensitive
-                gallery_filter_lower = gallery_filter.lower()
-                for g in galleries:
-                    if isinstance(g, dict):
-                        slug = g.get('slug', '').lower()
-                        name = g.get('name', '').lower()
-                        if slug == gallery_filter_lower or name == gallery_filter_lower:
-                            return True
-                    elif isinstance(g, str):
-                        if g.lower() == gallery_filter_lower:
-                            return True
-                return False
-            images = [img for img in images if matches_gallery(img)]
-        
-        # Check Shopify status for all images (needed for live sort)
-        import sqlite3
-        db_path = '/data/print_ordering.db' if os.path.exists('/data') else os.path.join(os.path.dirname(__file__), 'database', 'print_ordering.db')
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT image_filename FROM shopify_products')
-            shopify_filenames = {row[0] for row in cursor.fetchall()}
-            conn.close()
-        except:
-            shopify_filenames = set()
-        
-        # Apply sorting
-        if sort_by == 'az':
-            images = sorted(images, key=lambda x: (x.get('title') or x.get('filename', '')).lower())
-        elif sort_by == 'za':
-            images = sorted(images, key=lambda x: (x.get('title') or x.get('filename', '')).lower(), reverse=True)
-        elif sort_by == 'date-new':
-            images = sorted(images, key=lambda x: x.get('date_added', ''), reverse=True)
-        elif sort_by == 'date-old':
-            images = sorted(images, key=lambda x: x.get('date_added', ''))
-        elif sort_by == 'live':
-            images = sorted(images, key=lambda x: (x['filename'] not in shopify_filenames, (x.get('title') or x.get('filename', '')).lower()))
-        elif sort_by == 'category':
-            images = sorted(images, key=lambda x: ','.join(x.get('categories', [])))
-        elif sort_by == 'gallery':
-            images = sorted(images, key=lambda x: ','.join([g.get('name', '') for g in x.get('galleries', [])]))
+        # Search, gallery filter, sort and pagination run against the admin image index;
+        # full entries are only built for the images on this page
+        from admin_image_index import query_admin_images
+        per_page = max(per_page, 1)
+        page = max(page, 1)
+        listing = query_admin_images(scan_images, search=search_query, gallery=gallery_filter, sort=sort_by,
+                                     limit=per_page, offset=(page - 1) * per_page)
+        live_filenames = {img['filename'] for img in listing['images'] if img['has_shopify_products']}
+        paginated_images = get_image_entries([img['filename'] for img in listing['images']])
+        for img in paginated_images:
+            img['has_shopify_products'] = img['filename'] in live_filenames
         
         about_data = load_about_data()
 
@@ -1556,29 +1472,15 @@ def admin():
         hero_image_data = load_hero_image()
         hero_image = None
         if hero_image_data and hero_image_data.get("filename"):
-            # Find the hero image in the images list
-            for image in images:
-                if image["filename"] == hero_image_data["filename"]:
-                    hero_image = image
-                    break
-        
-        # Add has_shopify_products flag to each image
-        for img in all_images_unfiltered:
-            img['has_shopify_products'] = img['filename'] in shopify_filenames
-        for img in images:
-            img['has_shopify_products'] = img['filename'] in shopify_filenames
+            hero_entries = get_image_entries([hero_image_data["filename"]])
+            hero_image = hero_entries[0] if hero_entries else None
         
         # Calculate pagination
-        total_images = len(images)
+        total_images = listing['total']
         total_pages = (total_images + per_page - 1) // per_page  # Ceiling division
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        paginated_images = images[start_idx:end_idx]
         
         return render_template('admin_new.html', 
                              images=paginated_images,
-                             all_images=images,  # Filtered images for Images tab stats
-                             all_images_unfiltered=all_images_unfiltered,  # Unfiltered images for Shopify tab
                              all_categories=all_categories,
                              all_galleries=all_galleries,  # For gallery filter dropdown
                              about_data=about_data,
@@ -1593,6 +1495,24 @@ def admin():
     except Exception as e:
         return f"Admin Error: {str(e)}", 500
 
+@app.route('/api/admin/images')
+@require_admin_auth
+def api_admin_images():
+    """Indexed admin image listing (?search=&gallery=&sort=az&limit=60&cursor=)"""
+    try:
+        from admin_image_index import query_admin_images
+        listing = query_admin_images(
+            scan_images,
+            search=request.args.get('search', '').strip(),
+            gallery=request.args.get('gallery', '').strip(),
+            sort=request.args.get('sort', 'az').strip(),
+            limit=request.args.get('limit', 60, type=int),
+            cursor=request.args.get('cursor') or None
+        )
+        return jsonify({'success': True, **listing})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/admin/upload', methods=['POST'])
 @require_admin_auth
 @require_admin_auth
@@ -1627,38 +1547,29 @@ def upload_image():
         
         # Generate gallery-optimized image automatically for Shopify
         try:
-            from PIL import Image
-            os.makedirs('/data/gallery-images', exist_ok=True)
-            gallery_path = os.path.join('/data/gallery-images', filename)
-            
-            with Image.open(filepath) as img:
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                
-                orig_width, orig_height = img.size
-                max_dimension = 1200
-                
-                if orig_width > orig_height:
-                    new_width = max_dimension
-                    new_height = int((max_dimension / orig_width) * orig_height)
-                else:
-                    new_height = max_dimension
-                    new_width = int((max_dimension / orig_height) * orig_width)
-                
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-                print(f"Generated gallery image for {filename}")
+            from gallery_renditions import regenerate_gallery_image
+            regenerate_gallery_image(filename, images_folder=IMAGES_FOLDER)
+            print(f"Generated gallery image for {filename}")
         except Exception as gallery_error:
             print(f"Warning: Failed to generate gallery image for {filename}: {gallery_error}")
         
         # Extract and store EXIF in database
         try:
             from exif_db_helper import store_exif_in_db
-            exif_data = extract_exif_data(filepath)
-            store_exif_in_db(filename, exif_data)
+            from exif_engine import extract_image_metadata
+            exif_data = extract_image_metadata(filepath)
+            if exif_data:
+                store_exif_in_db(filename, exif_data)
         except Exception as exif_error:
             print(f"Warning: Failed to store EXIF for {filename}: {exif_error}")
         
+        # Precompute which print products this image supports (used by /api/order/products)
+        try:
+            from print_compatibility import index_image_file
+            index_image_file(filename)
+        except Exception as compat_error:
+            print(f"Warning: Failed to index print compatibility for {filename}: {compat_error}")
+        
         flash(f'Image "{filename}" uploaded successfully!')
     else:
         flash('Invalid file type. Please upload JPG, PNG, or GIF files.')
@@ -2388,38 +2299,29 @@ def upload_images_new():
                 
                 # Generate gallery-optimized image automatically for Shopify
                 try:
-                    from PIL import Image
-                    os.makedirs('/data/gallery-images', exist_ok=True)
-                    gallery_path = os.path.join('/data/gallery-images', filename)
-                    
-                    with Image.open(filepath) as img:
-                        if img.mode in ('RGBA', 'P'):
-                            img = img.convert('RGB')
-                        
-                        orig_width, orig_height = img.size
-                        max_dimension = 1200
-                        
-                        if orig_width > orig_height:
-                            new_width = max_dimension
-                            new_height = int((max_dimension / orig_width) * orig_height)
-                        else:
-                            new_height = max_dimension
-                            new_width = int((max_dimension / orig_height) * orig_width)
-                        
-                        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                        img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-                        print(f"Generated gallery image for {filename}")
+                    from gallery_renditions import regenerate_gallery_image
+                    regenerate_gallery_image(filename, images_folder=IMAGES_FOLDER)
+                    print(f"Generated gallery image for {filename}")
                 except Exception as gallery_error:
                     print(f"Warning: Failed to generate gallery image for {filename}: {gallery_error}")
                 
                 # Extract and store EXIF in database
                 try:
                     from exif_db_helper import store_exif_in_db
-                    exif_data = extract_exif_data(filepath)
-                    store_exif_in_db(filename, exif_data)
+                    from exif_engine import extract_image_metadata
+                    exif_data = extract_image_metadata(filepath)
+                    if exif_data:
+                        store_exif_in_db(filename, exif_data)
                 except Exception as exif_error:
                     print(f"Warning: Failed to store EXIF for {filename}: {exif_error}")
                 
+                # Precompute which print products this image supports (used by /api/order/products)
+                try:
+                    from print_compatibility import index_image_file
+                    index_image_file(filename)
+                except Exception as compat_error:
+                    print(f"Warning: Failed to index print compatibility for {filename}: {compat_error}")
+                
                 uploaded_files.append(filename)
             else:
                 failed_files.append(file.filename if file.filename else 'Unknown file')
@@ -2481,31 +2383,10 @@ def replace_image():
             
             # Regenerate gallery-optimized image
             try:
-                from PIL import Image
-                print(f"[REPLACE] Starting gallery image regeneration for {original_filename}")
-                os.makedirs('/data/gallery-images', exist_ok=True)
-                gallery_path = os.path.join('/data/gallery-images', original_filename)
-                print(f"[REPLACE] Gallery path: {gallery_path}")
-                
-                with Image.open(original_filepath) as img:
-                    if img.mode in ('RGBA', 'P'):
-                        img = img.convert('RGB')
-                    
-                    orig_width, orig_height = img.size
-                    max_dimension = 1200
-                    print(f"[REPLACE] Original dimensions: {orig_width}x{orig_height}")
-                    
-                    if orig_width > orig_height:
-                        new_width = max_dimension
-                        new_height = int((max_dimension / orig_width) * orig_height)
-                    else:
-                        new_height = max_dimension
-                        new_width = int((max_dimension / orig_height) * orig_width)
-                    
-                    print(f"[REPLACE] Resizing to: {new_width}x{new_height}")
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-                    print(f"[REPLACE] ✓ Successfully regenerated gallery image for {original_filename} at {gallery_path}")
+                # Saved watermark settings are re-applied to the new original
+                from gallery_renditions import regenerate_gallery_image
+                gallery_path = regenerate_gallery_image(original_filename, images_folder=IMAGES_FOLDER)
+                print(f"[REPLACE] ✓ Successfully regenerated gallery image for {original_filename} at {gallery_path}")
             except Exception as gallery_error:
                 print(f"[REPLACE] ✗ Failed to regenerate gallery image for {original_filename}: {gallery_error}")
                 import traceback
@@ -2514,11 +2395,20 @@ def replace_image():
             # Update EXIF data in database
             try:
                 from exif_db_helper import store_exif_in_db
-                exif_data = extract_exif_data(original_filepath)
-                store_exif_in_db(original_filename, exif_data)
+                from exif_engine import extract_image_metadata
+                exif_data = extract_image_metadata(original_filepath)
+                if exif_data:
+                    store_exif_in_db(original_filename, exif_data)
             except Exception as exif_error:
                 print(f"Warning: Failed to update EXIF for {original_filename}: {exif_error}")
             
+            # Precompute which print products this image supports (used by /api/order/products)
+            try:
+                from print_compatibility import index_image_file
+                index_image_file(original_filename)
+            except Exception as compat_error:
+                print(f"Warning: Failed to index print compatibility for {original_filename}: {compat_error}")
+            
             # Remove backup after successful replacement
             if os.path.exists(backup_path):
                 os.remove(backup_path)
@@ -2774,253 +2664,14 @@ def create_backup():
 
 
 def extract_exif_data(image_path):
-    """Extract EXIF data from image file"""
-    try:
-        from PIL import Image
-        from PIL.ExifTags import TAGS
-        
-        print(f"Extracting EXIF from: {image_path}")
-        
-        # Open image and get EXIF data
-        with Image.open(image_path) as img:
-            exif_data = img._getexif()
-            
-        if not exif_data:
-            print("No EXIF data found in image")
-            return get_default_exif()
-            
-        # Convert EXIF data to readable format
-        exif = {}
-        for tag_id, value in exif_data.items():
-            tag = TAGS.get(tag_id, tag_id)
-            exif[tag] = value
-        
-        print(f"Found EXIF data: {exif}")
-        
-        # Convert exposure time to fraction format
-        if 'ExposureTime' in exif:
-            exposure_time = exif['ExposureTime']
-            print(f"Original ExposureTime: {exposure_time}, type: {type(exposure_time)}")
-            try:
-                # Handle different data types
-                if isinstance(exposure_time, str):
-                    exposure_time = float(exposure_time)
-                
-                if isinstance(exposure_time, tuple) and len(exposure_time) == 2:
-                    if exposure_time[0] == 1:
-                        exif['ExposureTime'] = f"1/{exposure_time[1]}s"
-                    else:
-                        exif['ExposureTime'] = f"{exposure_time[0]}/{exposure_time[1]}s"
-                elif isinstance(exposure_time, (float, int)):
-                    if exposure_time >= 1:
-                        exif['ExposureTime'] = f"{exposure_time:.1f}s"
-                    else:
-                        # Convert decimal to fraction (e.g., 0.00133 -> 1/750)
-                        fraction = int(round(1 / exposure_time))
-                        exif['ExposureTime'] = f"1/{fraction}s"
-                        print(f"Converted ExposureTime to: {exif['ExposureTime']}")
-            except Exception as e:
-                print(f"Error converting ExposureTime: {e}")
-                # Fallback: try simple conversion
-                try:
-                    if isinstance(exposure_time, (str, float, int)):
-                        val = float(exposure_time)
-                        if val < 1:
-                            fraction = int(round(1 / val))
-                            exif['ExposureTime'] = f"1/{fraction}s"
-                except:
-                    pass
-        
-        # Format FNumber with f/ prefix
-        if 'FNumber' in exif:
-            try:
-                f_number = exif['FNumber']
-                if isinstance(f_number, tuple) and len(f_number) == 2:
-                    aperture = f_number[0] / f_number[1]
-                    exif['FNumber'] = f"f/{aperture:.1f}"
-                else:
-                    aperture = float(f_number)
-                    exif['FNumber'] = f"f/{aperture:.1f}"
-            except:
-                pass
-        
-        # Format FocalLength with mm and remove decimals
-        if 'FocalLength' in exif:
-            try:
-                focal_length = exif['FocalLength']
-                if isinstance(focal_length, tuple) and len(focal_length) == 2:
-                    focal = focal_length[0] / focal_length[1]
-                    exif['FocalLength'] = f"{int(focal)}mm"
-                else:
-                    focal = float(focal_length)
-                    exif['FocalLength'] = f"{int(focal)}mm"
-            except:
-                pass
-        
-        # Return formatted EXIF data matching template expectations
-        return {
-            'model': get_camera_info(exif),
-            'lens': get_lens_info(exif),
-            'aperture': get_aperture_info(exif),
-            'shutter_speed': get_shutter_speed_info(exif),
-            'iso': get_iso_info(exif),
-            'focal_length': get_focal_length_info(exif)
-        }
-        
-    except Exception as e:
-        print(f"Error extracting EXIF from {image_path}: {str(e)}")
-        return get_default_exif()
-def get_camera_info(exif):
-    """Extract camera information from EXIF"""
-    make = exif.get('Make', '').strip()
-    model = exif.get('Model', '').strip()
-    
-    if make and model:
-        # Remove make from model if it's already included
-        if make.lower() in model.lower():
-            return model
-        else:
-            return f"{make} {model}"
-    elif model:
-        return model
-    elif make:
-        return make
-    else:
-        return 'Unavailable'
-
-def get_lens_info(exif):
-    """Extract lens information from EXIF"""
-    # Try different lens fields
-    lens_fields = ['LensModel', 'Lens', 'LensInfo', 'LensMake']
-    
-    for field in lens_fields:
-        lens = exif.get(field)
-        if lens:
-            if isinstance(lens, str):
-                return lens.strip()
-            elif isinstance(lens, bytes):
-                try:
-                    return lens.decode('utf-8').strip()
-                except:
-                    continue
-    
-    return 'Unavailable'
-
-def get_aperture_info(exif):
-    """Extract aperture information from EXIF"""
-    # Try FNumber first, then ApertureValue
-    f_number = exif.get('FNumber')
-    if f_number:
-        try:
-            if isinstance(f_number, tuple) and len(f_number) == 2:
-                aperture = f_number[0] / f_number[1]
-                return f"f/{aperture:.1f}"
-            else:
-                # Handle direct float/string values
-                aperture = float(f_number)
-                return f"f/{aperture:.1f}"
-        except:
-            pass
-    
-    # Try ApertureValue as backup
-    aperture_value = exif.get('ApertureValue')
-    if aperture_value:
-        try:
-            aperture = float(aperture_value)
-            return f"f/{aperture:.1f}"
-        except:
-            pass
-    
-    return 'Unavailable'
-
-def get_shutter_speed_info(exif):
-    """Extract shutter speed information from EXIF"""
-    exposure_time = exif.get('ExposureTime')
-    if exposure_time:
-        if isinstance(exposure_time, tuple) and len(exposure_time) == 2:
-            if exposure_time[0] == 1:
-                return f"1/{exposure_time[1]}s"
-            else:
-                speed = exposure_time[0] / exposure_time[1]
-                if speed >= 1:
-                    return f"{speed:.1f}s"
-                else:
-                    return f"1/{int(1/speed)}s"
-        elif hasattr(exposure_time, '__float__'):  # Handle IFDRational and other numeric types
-            speed = float(exposure_time)
-            if speed >= 1:
-                return f"{speed:.1f}s"
-            else:
-                return f"1/{int(1/speed)}s"
-        elif isinstance(exposure_time, (int, float)):
-            if exposure_time >= 1:
-                return f"{exposure_time:.1f}s"
-            else:
-                return f"1/{int(1/exposure_time)}s"
-    
-    return 'Unavailable'
-
-def get_iso_info(exif):
-    """Extract ISO information from EXIF"""
-    iso_fields = ['ISOSpeedRatings', 'ISO', 'PhotographicSensitivity']
-    
-    for field in iso_fields:
-        iso = exif.get(field)
-        if iso:
-            if isinstance(iso, (list, tuple)) and len(iso) > 0:
-                return f"ISO {iso[0]}"
-            elif isinstance(iso, (int, float)):
-                return f"ISO {int(iso)}"
-    
-    return 'Unavailable'
-
-def get_focal_length_info(exif):
-    """Extract focal length information from EXIF"""
-    focal_length = exif.get('FocalLength')
-    print(f"[FOCAL] FocalLength value: {focal_length}, type: {type(focal_length)}")
-    
-    if focal_length:
-        try:
-            if isinstance(focal_length, tuple) and len(focal_length) == 2:
-                fl = focal_length[0] / focal_length[1]
-                return f"{fl:.0f}mm"
-            elif isinstance(focal_length, str):
-                # Handle string values - may already have 'mm' suffix
-                focal_str = focal_length.strip()
-                if focal_str.endswith('mm'):
-                    # Already formatted, return as-is
-                    return focal_str
-                else:
-                    # Parse and format
-                    fl = float(focal_str)
-                    return f"{fl:.0f}mm"
-            elif hasattr(focal_length, '__float__'):  # Handle IFDRational and other numeric types
-                return f"{float(focal_length):.0f}mm"
-            elif isinstance(focal_length, (int, float)):
-                return f"{focal_length:.0f}mm"
-        except Exception as e:
-            print(f"[FOCAL] Error converting focal length: {e}")
-    
-    return 'Unavailable'
-
-def get_default_exif():
-    """Return default EXIF data when extraction fails"""
-    return {
-        'camera': 'Unavailable',
-        'lens': 'Unavailable',
-        'aperture': 'Unavailable',
-        'shutter_speed': 'Unavailable',
-        'iso': 'Unavailable',
-        'focal_length': 'Unavailable'
-    }
+    """Extract display EXIF fields from an image file's header (see exif_engine)"""
+    from exif_engine import extract_exif
+    return extract_exif(image_path)
 
 @app.route('/debug_exif')
 def debug_exif():
     """Debug route to show all EXIF data from featured image"""
     try:
-        from PIL import Image
-        from PIL.ExifTags import TAGS
-        
         # Get featured image from the actual featured_image.json file
         featured_image = None
         if os.path.exists('/data/featured_image.json'):
@@ -3034,9 +2685,9 @@ def debug_exif():
         # Get image path
         image_path = os.path.join(IMAGES_FOLDER, featured_image['filename'])
         
-        # Extract ALL EXIF data
-        with Image.open(image_path) as img:
-            exif_data = img._getexif()
+        # Extract ALL EXIF data (IFD0 and Exif sub-IFD, header only)
+        from exif_engine import read_all_tags
+        exif_data = read_all_tags(image_path)
         
         if not exif_data:
             return jsonify({
@@ -3047,9 +2698,7 @@ def debug_exif():
         
         # Convert all EXIF data to readable format
         readable_exif = {}
-        for tag_id, value in exif_data.items():
-            tag_name = TAGS.get(tag_id, f"Unknown_{tag_id}")
-            
+        for tag_name, value in exif_data.items():
             # Convert value to string for JSON serialization
             if isinstance(value, bytes):
                 try:
@@ -3115,6 +2764,7 @@ def clear_hero_image():
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/hero_image')
+@cached_response(HERO)
 def get_hero_image():
     """API endpoint to get current hero image selection"""
     try:
@@ -3136,59 +2786,15 @@ def randomize_portfolio():
     """Randomize the order of portfolio images"""
     try:
         import random
+        from gallery_db import set_portfolio_order
         
-        # Get all images
-        images = []
-        for filename in os.listdir(IMAGES_FOLDER):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                filepath = os.path.join(IMAGES_FOLDER, filename)
-                if os.path.isfile(filepath):
-                    # Get image metadata
-                    image_data = {
-                        'filename': filename,
-                        'size': os.path.getsize(filepath),
-                        'modified': os.path.getmtime(filepath)
-                    }
-                    
-                    # Load existing metadata if available
-                    metadata_file = os.path.join(IMAGES_FOLDER, f"{filename}.json")
-                    if os.path.exists(metadata_file):
-                        try:
-                            with open(metadata_file, 'r') as f:
-                                metadata = json.load(f)
-                                image_data.update(metadata)
-                        except:
-                            pass
-                    
-                    images.append(image_data)
+        images = [filename for filename in os.listdir(IMAGES_FOLDER)
+                  if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))
+                  and os.path.isfile(os.path.join(IMAGES_FOLDER, filename))]
         
-        # Randomize the order
+        # Randomize the order and save it in one transaction
         random.shuffle(images)
-        
-        # Save the new order by updating modification times
-        # We'll use a simple approach: update the metadata with a new 'display_order' field
-        for index, image in enumerate(images):
-            metadata_file = os.path.join(IMAGES_FOLDER, f"{image['filename']}.json")
-            
-            # Load existing metadata or create new
-            metadata = {}
-            if os.path.exists(metadata_file):
-                try:
-                    with open(metadata_file, 'r') as f:
-                        metadata = json.load(f)
-                except:
-                    pass
-            
-            # Add display order
-            metadata['display_order'] = index
-            metadata['randomized_at'] = datetime.now().isoformat()
-            
-            # Save metadata
-            try:
-                with open(metadata_file, 'w') as f:
-                    json.dump(metadata, f, indent=2)
-            except Exception as e:
-                print(f"Error saving metadata for {image['filename']}: {e}")
+        set_portfolio_order(images)
         
         return jsonify({
             'success': True, 
@@ -3200,6 +2806,35 @@ def randomize_portfolio():
         print(f"Error randomizing portfolio: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/admin/reorder_portfolio', methods=['POST'])
+@require_admin_auth
+def reorder_portfolio_route():
+    """Save a drag-and-drop order: {"filenames": [...]} go first, in that order"""
+    data = request.get_json() or {}
+    filenames = data.get('filenames')
+    if not isinstance(filenames, list) or not filenames:
+        return jsonify({'success': False, 'error': 'filenames list required'}), 400
+    
+    try:
+        from gallery_db import reorder_portfolio
+        count = reorder_portfolio(filenames)
+        return jsonify({'success': True, 'count': count})
+    except Exception as e:
+        print(f"Error reordering portfolio: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/admin/reset_portfolio_order', methods=['POST'])
+@require_admin_auth
+def reset_portfolio_order_route():
+    """Clear the saved portfolio order (images go back to filename order)"""
+    try:
+        from gallery_db import reset_portfolio_order
+        count = reset_portfolio_order()
+        return jsonify({'success': True, 'message': f'Reset order of {count} images', 'count': count})
+    except Exception as e:
+        print(f"Error resetting portfolio order: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 def send_contact_email(name, email, phone, shoot_type, budget, how_heard, message):
     """Send contact form email"""
     try:
@@ -3245,11 +2880,9 @@ This email was sent automatically from the Fifth Element Photography contact for
 @app.route('/about')
 def about():
     """About page with bio and image"""
-    from gallery_db import get_all_galleries
-    from navigation_helpers import get_navigation_for_template
-    galleries = get_all_galleries()
+    from navigation_helpers import get_site_navigation
+    nav_items, galleries = get_site_navigation()
     about_data = load_about_data()
-    nav_items = get_navigation_for_template()
     return render_template('about.html', galleries=galleries, about_data=about_data, nav_items=nav_items, app_version=APP_VERSION, app_revision=APP_REVISION)
 
 @app.route('/navigation-editor')
@@ -3312,10 +2945,8 @@ def contact():
     """Handle contact form page and submission"""
     if request.method == 'GET':
         # Display contact form page
-        from gallery_db import get_all_galleries
-        from navigation_helpers import get_navigation_for_template
-        galleries = get_all_galleries()
-        nav_items = get_navigation_for_template()
+        from navigation_helpers import get_site_navigation
+        nav_items, galleries = get_site_navigation()
         return render_template('contact.html', galleries=galleries, nav_items=nav_items, app_version=APP_VERSION, app_revision=APP_REVISION)
     
     # Handle POST - form submission
@@ -3649,6 +3280,7 @@ def save_pricing_config(config):
 # REMOVED v2.0.0:     return rebuild_database_route()
 
 @app.route('/api/hierarchical/product-types', methods=['GET'])
+@cached_response(CATALOG)
 def get_hierarchical_product_types():
     """Get all product types for hierarchical ordering system"""
     try:
@@ -3656,12 +3288,7 @@ def get_hierarchical_product_types():
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT id, name, display_order, has_sub_options, max_sub_option_levels, active
-            FROM product_types 
-            WHERE active = 1 
-            ORDER BY display_order
-        """)
+        cursor.execute(PRODUCT_TYPES_SQL)
         
         product_types = []
         for row in cursor.fetchall():
@@ -3687,6 +3314,7 @@ def get_hierarchical_product_types():
         }), 500
 
 @app.route('/api/hierarchical/sub-options/<int:product_type_id>/<int:level>', methods=['GET'])
+@cached_response(CATALOG)
 def get_hierarchical_sub_options(product_type_id, level):
     """Get sub-options for a product type at a specific level"""
     try:
@@ -3696,18 +3324,7 @@ def get_hierarchical_sub_options(product_type_id, level):
         
         # Get sub-options that actually have products
         # This prevents showing options with no available products
-        cursor.execute("""
-            SELECT DISTINCT so.id, so.option_type, so.name, so.value, so.image_path, so.display_order
-            FROM sub_options so
-            WHERE so.product_type_id = ? AND so.level = ? AND so.active = 1
-              AND EXISTS (
-                SELECT 1 FROM products p 
-                WHERE p.product_type_id = so.product_type_id 
-                  AND p.active = 1
-                  AND (p.sub_option_1_id = so.id OR p.sub_option_2_id = so.id)
-              )
-            ORDER BY so.display_order
-        """, (product_type_id, level))
+        cursor.execute(SUB_OPTIONS_SQL, (product_type_id, level))
         
         sub_options = []
         for row in cursor.fetchall():
@@ -3733,6 +3350,7 @@ def get_hierarchical_sub_options(product_type_id, level):
         }), 500
 
 @app.route('/api/hierarchical/available-sizes', methods=['GET'])
+@cached_response(CATALOG)
 def get_hierarchical_available_sizes():
     """Get available sizes based on product type and sub-options"""
     try:
@@ -3755,40 +3373,14 @@ def get_hierarchical_available_sizes():
         cursor = conn.cursor()
         
         # Get global markup percentage
-        cursor.execute("SELECT value FROM settings WHERE key_name = 'global_markup_percentage'")
+        cursor.execute(MARKUP_PERCENTAGE_SQL)
         markup_row = cursor.fetchone()
         markup_percentage = float(markup_row['value']) if markup_row else 150.0
         multiplier = (markup_percentage / 100) + 1  # Convert percentage to multiplier
         
         # Build query - prefer Lumaprints codes over internal IDs
-        query = """
-            SELECT p.id, p.name, p.size, p.cost_price, c.name as category_name,
-                   p.lumaprints_subcategory_id, p.lumaprints_options, p.lumaprints_frame_option
-            FROM products p
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.active = 1 AND p.product_type_id = ?
-        """
-        params = [product_type_id]
-        
-        # Use Lumaprints codes if provided, otherwise fall back to internal IDs
-        if lumaprints_subcategory_id:
-            query += " AND p.lumaprints_subcategory_id = ?"
-            params.append(lumaprints_subcategory_id)
-        elif sub_option_1_id:
-            query += " AND p.sub_option_1_id = ?"
-            params.append(sub_option_1_id)
-            
-        if lumaprints_option_id:
-            # Filter by JSON option - check if option_id exists in lumaprints_options
-            query += " AND (p.lumaprints_options LIKE ? OR p.lumaprints_frame_option = ?)"
-            params.append(f'%{lumaprints_option_id}%')
-            params.append(lumaprints_option_id)
-        elif sub_option_2_id:
-            query += " AND p.sub_option_2_id = ?"
-            params.append(sub_option_2_id)
-            
-        query += " ORDER BY p.name, p.size"
-        
+        query, params = build_available_sizes_query(product_type_id, lumaprints_subcategory_id, sub_option_1_id,
+                                                    lumaprints_option_id, sub_option_2_id)
         cursor.execute(query, params)
         
         products = []
@@ -3796,15 +3388,6 @@ def get_hierarchical_available_sizes():
             # Calculate customer price using global markup
             customer_price = row['cost_price'] * multiplier
             
-            # Parse Lumaprints options JSON
-            lumaprints_options = []
-            if row['lumaprints_options']:
-                try:
-                    import json
-                    lumaprints_options = json.loads(row['lumaprints_options'])
-                except:
-                    lumaprints_options = []
-            
             products.append({
                 'id': row['id'],
                 'name': row['name'],
@@ -3814,8 +3397,9 @@ def get_hierarchical_available_sizes():
                 'customer_price': round(customer_price, 2),
                 # Lumaprints integration fields for OrderDesk
                 'lumaprints_subcategory_id': row['lumaprints_subcategory_id'],
-                'lumaprints_options': lumaprints_options,
-                'lumaprints_frame_option': row['lumaprints_frame_option']
+                'lumaprints_frame_option': row['lumaprints_frame_option'],
+                # Always valid JSON: SQLite substitutes [] for malformed values
+                'lumaprints_options': json.loads(row['lumaprints_options_json'])
             })
         
         conn.close()
@@ -3840,21 +3424,12 @@ def get_hierarchical_product_details(product_id):
         cursor = conn.cursor()
         
         # Get global markup percentage
-        cursor.execute("SELECT value FROM settings WHERE key_name = 'global_markup_percentage'")
+        cursor.execute(MARKUP_PERCENTAGE_SQL)
         markup_row = cursor.fetchone()
         markup_percentage = float(markup_row['value']) if markup_row else 150.0
         multiplier = (markup_percentage / 100) + 1  # Convert percentage to multiplier
         
-        cursor.execute("""
-            SELECT p.*, c.name as category_name, pt.name as product_type_name,
-                   so1.value as sub_option_1_value, so2.value as sub_option_2_value
-            FROM products p
-            JOIN categories c ON p.category_id = c.id
-            LEFT JOIN product_types pt ON p.product_type_id = pt.id
-            LEFT JOIN sub_options so1 ON p.sub_option_1_id = so1.id
-            LEFT JOIN sub_options so2 ON p.sub_option_2_id = so2.id
-            WHERE p.id = ? AND p.active = 1
-        """, (product_id,))
+        cursor.execute(PRODUCT_DETAILS_SQL, (product_id,))
         
         row = cursor.fetchone()
         if not row:
@@ -5059,84 +4634,43 @@ def restore_database_from_backup():
 # Database management routes
 @app.route('/api/image/exif/<path:filename>', methods=['GET'])
 def get_image_exif(filename):
-    """Get EXIF data including DPI from image file"""
+    """Get EXIF data including dimensions and DPI from the EXIF database"""
     try:
-        from PIL import Image
-        import traceback
-        
-        # Images are stored in /data persistent volume on Railway
-        image_path = os.path.join(IMAGES_FOLDER, filename)
-        print(f"[EXIF] Attempting to read image from: {image_path}")
-        print(f"[EXIF] IMAGES_FOLDER = {IMAGES_FOLDER}")
-        print(f"[EXIF] File exists: {os.path.exists(image_path)}")
+        from exif_db_helper import get_exif_from_db, store_exif_in_db
+        
+        exif_data = get_exif_from_db(filename)
+        
+        # Images that predate the metadata columns (and weren't backfilled yet) are indexed once here
+        if not exif_data or exif_data.get('width') is None:
+            from exif_engine import extract_image_metadata
+            image_path = os.path.join(IMAGES_FOLDER, filename)
+            metadata = extract_image_metadata(image_path) if os.path.exists(image_path) else None
+            if not metadata:
+                error_msg = f'Image not found at {image_path}'
+                print(f"[EXIF ERROR] {error_msg}")
+                return jsonify({
+                    'success': False,
+                    'error': error_msg
+                }), 404
+            store_exif_in_db(filename, metadata)
+            exif_data = metadata
         
-        if not os.path.exists(image_path):
-            error_msg = f'Image not found at {image_path}'
-            print(f"[EXIF ERROR] {error_msg}")
-            return jsonify({
-                'success': False,
-                'error': error_msg
-            }), 404
-        
-        # Open image from local filesystem
-        with Image.open(image_path) as img:
-            width, height = img.size
-            
-            # Get DPI from image info
-            dpi = img.info.get('dpi', None)
-            if dpi and isinstance(dpi, tuple):
-                # DPI is stored as (x_dpi, y_dpi), usually they're the same
-                # Convert to float in case it's IFDRational
-                dpi_value = float(dpi[0])
-            else:
-                # Try to get from EXIF
-                try:
-                    exif_data = img._getexif()
-                    if exif_data:
-                        # EXIF tag 282 is XResolution, 283 is YResolution
-                        x_res = exif_data.get(282)
-                        if x_res:
-                            # Handle IFDRational objects (fractions)
-                            if isinstance(x_res, tuple) and len(x_res) == 2:
-                                dpi_value = float(x_res[0]) / float(x_res[1])
-                            else:
-                                # It's already a number or IFDRational
-                                dpi_value = float(x_res)
-                        else:
-                            dpi_value = None
-                    else:
-                        dpi_value = None
-                except Exception as exif_error:
-                    print(f"[EXIF] Error reading EXIF: {exif_error}")
-                    dpi_value = None
-            
-            # Ensure DPI is JSON serializable
-            if dpi_value is not None:
-                dpi_value = float(dpi_value)
-            
-            # Get EXIF data from database (instant retrieval)
-            from exif_db_helper import get_exif_from_db
-            exif_data = get_exif_from_db(filename)
-            
-            # If not in database, extract and store it
-            if not exif_data:
-                exif_data = extract_exif_data(image_path)
-                from exif_db_helper import store_exif_in_db
-                store_exif_in_db(filename, exif_data)
-            
-            return jsonify({
-                'success': True,
-                'width': width,
-                'height': height,
-                'dpi': dpi_value,
-                'format': img.format,
-                'model': exif_data.get('model'),
-                'lens': exif_data.get('lens'),
-                'aperture': exif_data.get('aperture'),
-                'shutter_speed': exif_data.get('shutter_speed'),
-                'iso': exif_data.get('iso'),
-                'focal_length': exif_data.get('focal_length')
-            })
+        return jsonify({
+            'success': True,
+            'width': exif_data.get('width'),
+            'height': exif_data.get('height'),
+            'dpi': exif_data.get('dpi'),
+            'format': exif_data.get('format'),
+            'capture_date': exif_data.get('capture_date'),
+            'has_gps': exif_data.get('has_gps'),
+            'orientation': exif_data.get('orientation'),
+            'model': exif_data.get('model'),
+            'lens': exif_data.get('lens'),
+            'aperture': exif_data.get('aperture'),
+            'shutter_speed': exif_data.get('shutter_speed'),
+            'iso': exif_data.get('iso'),
+            'focal_length': exif_data.get('focal_length')
+        })
             
     except Exception as e:
         import traceback
@@ -5382,6 +4916,35 @@ def lumaprints_download():
         return jsonify({'error': str(e)}), 500
 
 
+# Lumaprints library sync (streamed, resumable uploads; importing registers the job type)
+from lumaprints_library import LumaprintsLibrary
+
+@app.route('/api/lumaprints/library/sync', methods=['POST'])
+@require_admin_auth
+def lumaprints_library_sync():
+    """Queue a job uploading every image (or {"filenames": [...]}) whose content isn't in the Lumaprints library yet"""
+    try:
+        data = request.get_json(silent=True) or {}
+        filenames = data.get('filenames') or None
+        if filenames is not None and not isinstance(filenames, list):
+            return jsonify({'success': False, 'error': 'filenames must be a list'}), 400
+        job_id = LumaprintsLibrary().bulk_upload_missing_images(filenames)
+        return jsonify({'success': True, 'job_id': job_id}), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/lumaprints/library/status')
+@require_admin_auth
+def lumaprints_library_status():
+    """Sync status of every image (synced/uploading/failed/pending, library ID, last error)"""
+    try:
+        images = LumaprintsLibrary().get_sync_status_for_all_images()
+        return jsonify({'success': True, 'images': images,
+                        'synced': sum(1 for image in images if image['synced']), 'total': len(images)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/images/size-report')
 @require_admin_auth
 def image_size_report():
@@ -5437,8 +5000,15 @@ def image_size_report_page():
 
 @app.route('/data/gallery-images/<path:filename>')
 def serve_gallery_image(filename):
-    """Serve watermarked gallery images"""
-    return send_from_directory('/data/gallery-images', filename)
+    """Serve an image's gallery rendition: watermarked if it has watermark settings, else clean"""
+    from gallery_renditions import ensure_gallery_image
+    if filename != os.path.basename(filename):
+        abort(404)
+    try:
+        gallery_path = ensure_gallery_image(filename, images_folder=IMAGES_FOLDER)
+    except FileNotFoundError:
+        abort(404)
+    return send_from_directory(os.path.dirname(gallery_path), filename)
 
 
 @app.route('/api/generate-gallery-images', methods=['POST'])
@@ -5446,11 +5016,10 @@ def serve_gallery_image(filename):
 def generate_gallery_images():
     """Pre-generate all gallery-optimized images for fast loading"""
     try:
-        from PIL import Image
-        import os
+        from gallery_renditions import ensure_gallery_image, rendition_path, get_watermark_settings, GALLERY_FOLDER
         
         # Create gallery-images directory if it doesn't exist
-        os.makedirs('/data/gallery-images', exist_ok=True)
+        os.makedirs(GALLERY_FOLDER, exist_ok=True)
         
         # Get all image files
         image_files = []
@@ -5465,40 +5034,13 @@ def generate_gallery_images():
         
         for filename in image_files:
             try:
-                gallery_path = os.path.join('/data/gallery-images', filename)
-                
-                # Skip if already exists
-                if os.path.exists(gallery_path):
+                # Skip if the rendition for its current watermark settings is already cached
+                if os.path.exists(rendition_path(filename, get_watermark_settings(filename))):
                     skipped += 1
                     continue
                 
-                # Open original image
-                original_path = os.path.join(IMAGES_FOLDER, filename)
-                
-                with Image.open(original_path) as img:
-                    # Convert to RGB if necessary
-                    if img.mode in ('RGBA', 'P'):
-                        img = img.convert('RGB')
-                    
-                    # Get original dimensions
-                    orig_width, orig_height = img.size
-                    
-                    # Calculate new dimensions (max 1200px on longest side)
-                    max_dimension = 1200
-                    if orig_width > orig_height:
-                        new_width = max_dimension
-                        new_height = int((max_dimension / orig_width) * orig_height)
-                    else:
-                        new_height = max_dimension
-                        new_width = int((max_dimension / orig_height) * orig_width)
-                    
-                    # Resize image with high quality
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    
-                    # Save gallery image with good quality
-                    img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-                    
-                    generated += 1
+                ensure_gallery_image(filename, images_folder=IMAGES_FOLDER)
+                generated += 1
                     
             except Exception as e:
                 errors.append(f"{filename}: {str(e)}")
@@ -5515,168 +5057,141 @@ def generate_gallery_images():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@app.route('/api/watermark/apply', methods=['POST'])
+def list_exif_image_files():
+    """Image files in IMAGES_FOLDER that get a row in the EXIF database"""
+    if not os.path.exists(IMAGES_FOLDER):
+        return []
+    return sorted(filename for filename in os.listdir(IMAGES_FOLDER)
+                  if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')))
+
+# Background job: one checkpointed item per image missing EXIF metadata (or every image with all=1).
+# The data journal passes its added files as `filenames` and its changed files as `refresh` (always re-read).
+
+def _plan_exif_backfill(params):
+    from exif_db_helper import get_filenames_with_metadata
+    indexed = set() if params.get('all') else get_filenames_with_metadata()
+    filenames = params['filenames'] if 'filenames' in params else list_exif_image_files()
+    refresh = params.get('refresh') or []
+    return [(filename, None) for filename in dict.fromkeys(list(filenames) + list(refresh))
+            if filename in refresh or filename not in indexed]
+
+def _process_exif_backfill(params, context, item_key, payload):
+    from exif_db_helper import store_exif_in_db
+    from exif_engine import extract_image_metadata
+    metadata = extract_image_metadata(os.path.join(IMAGES_FOLDER, item_key))
+    if not metadata:
+        raise RuntimeError('image could not be read')
+    if not store_exif_in_db(item_key, metadata):
+        raise RuntimeError('EXIF database write failed')
+    return {'width': metadata['width'], 'height': metadata['height'], 'dpi': metadata['dpi']}
+
+register_job_type('exif_backfill', _plan_exif_backfill, _process_exif_backfill)
+
+# Data change journal: what was added/changed/removed in /data since the last scan (at startup or on demand)
+
+def _plan_gallery_rendition_sync(params):
+    return [(filename, {'change': change}) for change in ('added', 'changed', 'removed')
+            for filename in params.get(change) or []]
+
+def _process_gallery_rendition_sync(params, context, item_key, payload):
+    import gallery_renditions
+    change = payload['change']
+    if change == 'removed':
+        gallery_renditions.purge_renditions(item_key)
+        clean_path = gallery_renditions.rendition_path(item_key)
+        if os.path.exists(clean_path):
+            os.remove(clean_path)
+        return {'removed': True}
+    clean_path = gallery_renditions.rendition_path(item_key)
+    original_mtime = os.path.getmtime(os.path.join(IMAGES_FOLDER, item_key))
+    # Replace/upload flows render their own renditions; only rebuild ones older than the original
+    if change == 'changed' and (not os.path.exists(clean_path) or os.path.getmtime(clean_path) < original_mtime):
+        gallery_renditions.regenerate_gallery_image(item_key, images_folder=IMAGES_FOLDER)
+        return {'regenerated': True}
+    gallery_renditions.ensure_gallery_image(item_key, images_folder=IMAGES_FOLDER)
+    return {'regenerated': False}
+
+register_job_type('gallery_rendition_sync', _plan_gallery_rendition_sync, _process_gallery_rendition_sync,
+                  concurrency=4)
+
+def _journal_catalog_listener(changes):
+    from response_cache import invalidate, GALLERIES
+    invalidate(IMAGES, GALLERIES, HERO)
+
+def _journal_renditions_listener(changes):
+    submit_job('gallery_rendition_sync', changes)
+
+def _journal_exif_listener(changes):
+    from exif_db_helper import delete_exif_from_db
+    for filename in changes['removed']:
+        delete_exif_from_db(filename)
+    if changes['added'] or changes['changed']:
+        submit_job('exif_backfill', {'filenames': changes['added'], 'refresh': changes['changed']})
+
+from data_journal import register_change_listener, sync_data_journal, start_data_journal_sync, get_recent_changes
+register_change_listener('catalog', _journal_catalog_listener)
+register_change_listener('gallery_renditions', _journal_renditions_listener)
+register_change_listener('exif', _journal_exif_listener)
+start_data_journal_sync(IMAGES_FOLDER)
+
+@app.route('/api/data-journal/scan', methods=['POST'])
 @require_admin_auth
-def apply_watermark_api():
-    """Apply watermark to image and regenerate gallery version"""
+def scan_data_journal():
+    """Diff /data against the last snapshot now and queue catalog/rendition/EXIF updates for what changed"""
     try:
-        from watermark_helper import apply_watermark
-        from PIL import Image
-        
-        data = request.json
-        filename = data.get('filename')
-        position = data.get('position', 'bottom-right')
-        size = data.get('size', 'medium')
-        color = data.get('color', 'auto')
-        
-        if not filename:
-            return jsonify({'success': False, 'error': 'Missing filename'}), 400
-        
-        # Path to original image
-        original_path = os.path.join(IMAGES_FOLDER, filename)
-        if not os.path.exists(original_path):
-            return jsonify({'success': False, 'error': 'Image not found'}), 404
-        
-        # First, create gallery-optimized version WITHOUT watermark
-        gallery_path = os.path.join('/data/gallery-images', filename)
-        os.makedirs('/data/gallery-images', exist_ok=True)
-        
-        with Image.open(original_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Get original dimensions
-            orig_width, orig_height = img.size
-            
-            # Calculate new dimensions (max 1200px on longest side)
-            max_dimension = 1200
-            if orig_width > orig_height:
-                new_width = max_dimension
-                new_height = int((max_dimension / orig_width) * orig_height)
-            else:
-                new_height = max_dimension
-                new_width = int((max_dimension / orig_height) * orig_width)
-            
-            # Resize image with high quality
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save gallery image with good quality
-            img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-        
-        # Now apply watermark to the gallery-sized image
-        success = apply_watermark(
-            gallery_path,
-            output_path=gallery_path,
-            position=position,
-            size=size,
-            color_mode=color
-        )
-        
-        if not success:
-            return jsonify({'success': False, 'error': 'Failed to apply watermark'}), 500
-        
-        return jsonify({'success': True, 'message': 'Watermark applied successfully'})
-        
+        changes = sync_data_journal(IMAGES_FOLDER)
+        if changes is None:
+            return jsonify({'success': False, 'error': 'A scan is already running, try again shortly'}), 409
+        return jsonify({'success': True, 'changes': changes,
+                        'counts': {change: len(filenames) for change, filenames in changes.items()}})
     except Exception as e:
-        print(f"Error applying watermark: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-
-@app.route('/api/watermark/remove', methods=['POST'])
+@app.route('/api/data-journal/changes', methods=['GET'])
 @require_admin_auth
-def remove_watermark_api():
-    """Remove watermark by restoring from backup and regenerating gallery version"""
+def data_journal_changes():
+    """Change log after ?since=<id> (oldest first)"""
     try:
-        from PIL import Image
-        
-        data = request.json
-        filename = data.get('filename')
-        
-        if not filename:
-            return jsonify({'success': False, 'error': 'Missing filename'}), 400
-        
-        # Check if backup exists
-        backup_path = os.path.join(IMAGES_FOLDER, f"{filename}.backup")
-        original_path = os.path.join(IMAGES_FOLDER, filename)
-        
-        if not os.path.exists(backup_path):
-            return jsonify({'success': False, 'error': 'No backup found - cannot remove watermark'}), 404
-        
-        # Restore from backup
-        import shutil
-        shutil.copy2(backup_path, original_path)
-        
-        # Regenerate gallery-optimized version without watermark
-        gallery_path = os.path.join('/data/gallery-images', filename)
-        os.makedirs('/data/gallery-images', exist_ok=True)
-        
-        with Image.open(original_path) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            
-            # Get original dimensions
-            orig_width, orig_height = img.size
-            
-            # Calculate new dimensions (max 1200px on longest side)
-            max_dimension = 1200
-            if orig_width > orig_height:
-                new_width = max_dimension
-                new_height = int((max_dimension / orig_width) * orig_height)
-            else:
-                new_height = max_dimension
-                new_width = int((max_dimension / orig_height) * orig_width)
-            
-            # Resize image with high quality
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save gallery image with good quality
-            img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-        
-        return jsonify({'success': True, 'message': 'Watermark removed successfully'})
-        
-    except Exception as e:
-        print(f"Error removing watermark: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
-
+        since_id = int(request.args.get('since', 0))
+        limit = min(int(request.args.get('limit', 500)), 5000)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since and limit must be integers'}), 400
+    changes = get_recent_changes(since_id, limit)
+    return jsonify({'success': True, 'changes': changes,
+                    'last_id': changes[-1]['id'] if changes else since_id})
 
 @app.route('/api/populate-exif-database', methods=['POST'])
 @require_admin_auth
 def populate_exif_database():
-    """Extract and store EXIF data for all images in database"""
+    """
+    Extract and store EXIF data and image metadata for all images in database.
+    Pass ?background=1 to run it as a resumable job (only images missing
+    metadata, or every image with &all=1).
+    """
     try:
-        from exif_db_helper import ensure_exif_table, store_exif_in_db
+        if request.args.get('background') in ('1', 'true'):
+            job_id = submit_job('exif_backfill', {'all': request.args.get('all') in ('1', 'true')})
+            return jsonify({'success': True, 'job_id': job_id}), 202
+        
+        from exif_db_helper import ensure_exif_table, store_exif_batch
+        from exif_engine import extract_metadata_batch
         
         # Ensure table exists
         ensure_exif_table()
         
         # Get all image files
-        image_files = []
-        if os.path.exists(IMAGES_FOLDER):
-            for filename in os.listdir(IMAGES_FOLDER):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-                    image_files.append(filename)
-        
-        processed = 0
-        skipped = 0
-        errors = []
+        image_files = list_exif_image_files()
         
-        for filename in image_files:
-            try:
-                filepath = os.path.join(IMAGES_FOLDER, filename)
-                
-                # Extract EXIF data
-                exif_data = extract_exif_data(filepath)
-                
-                # Store in database
-                if store_exif_in_db(filename, exif_data):
-                    processed += 1
-                else:
-                    skipped += 1
-                    
-            except Exception as e:
-                errors.append(f"{filename}: {str(e)}")
+        # Read all headers on a small thread pool, then store them in one transaction
+        paths = {os.path.join(IMAGES_FOLDER, filename): filename for filename in image_files}
+        metadata_by_path = extract_metadata_batch(paths)
+        errors = [f"{paths[path]}: could not be read" for path, metadata in metadata_by_path.items() if not metadata]
+        try:
+            processed = store_exif_batch({paths[path]: metadata for path, metadata in metadata_by_path.items() if metadata})
+        except Exception as e:
+            processed = 0
+            errors.append(str(e))
+        skipped = len(image_files) - processed
         
         return jsonify({
             'success': True,
@@ -5762,31 +5277,54 @@ def debug_storage_check():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Gallery pages render this many images; the rest load through /api/gallery/<slug>/images as the visitor scrolls
+GALLERY_PAGE_SIZE = 48
+
 @app.route('/gallery/<slug>')
 def gallery_page(slug):
     """Display individual gallery page"""
-    from gallery_db import get_all_galleries, get_gallery_by_slug, get_gallery_images
+    from gallery_db import get_gallery_by_slug, get_gallery_images, count_gallery_images
+    from navigation_helpers import get_site_navigation
     
     # Get the gallery by slug
     gallery = get_gallery_by_slug(slug)
     if not gallery:
         return "Gallery not found", 404
     
-    # Get all galleries for navigation
-    galleries = get_all_galleries()
+    # Navigation items and all galleries (memoized until navigation/galleries change)
+    nav_items, galleries = get_site_navigation()
+    
+    # First page of member images, in the gallery's display order
+    images = get_image_entries(get_gallery_images(gallery['id'], limit=GALLERY_PAGE_SIZE))
+    total_images = count_gallery_images(gallery['id'])
+    next_offset = GALLERY_PAGE_SIZE if total_images > GALLERY_PAGE_SIZE else None
     
-    # Get navigation items
-    from navigation_helpers import get_navigation_for_template
-    nav_items = get_navigation_for_template()
+    return render_template('gallery_page.html', gallery=gallery, galleries=galleries, nav_items=nav_items, images=images,
+                           next_offset=next_offset, page_size=GALLERY_PAGE_SIZE)
+
+@app.route('/api/gallery/<slug>/images')
+def api_gallery_images(slug):
+    """One page of a gallery's images in display order (?offset=0&limit=48)"""
+    from gallery_db import get_gallery_by_slug, get_gallery_images, count_gallery_images
+    
+    gallery = get_gallery_by_slug(slug)
+    if not gallery:
+        return jsonify({'success': False, 'error': 'Gallery not found'}), 404
     
-    # Get images for this gallery
-    image_filenames = get_gallery_images(gallery['id'])
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', GALLERY_PAGE_SIZE, type=int), 1), 200)
     
-    # Load full image data
-    all_images = scan_images()
-    images = [img for img in all_images if img['filename'] in image_filenames]
+    images = get_image_entries(get_gallery_images(gallery['id'], limit=limit, offset=offset))
+    total = count_gallery_images(gallery['id'])
+    next_offset = offset + limit if offset + limit < total else None
     
-    return render_template('gallery_page.html', gallery=gallery, galleries=galleries, nav_items=nav_items, images=images)
+    return jsonify({
+        'success': True,
+        'images': images,
+        'total': total,
+        'offset': offset,
+        'next_offset': next_offset
+    })
 
 
 @app.route('/admin/update-image-field', methods=['POST'])
@@ -6013,26 +5551,15 @@ def update_image_galleries():
         if not filename:
             return jsonify({'success': False, 'error': 'No filename provided'}), 400
         
-        from gallery_db import get_all_galleries, add_image_to_gallery, remove_image_from_gallery, get_galleries_for_image
+        from gallery_db import get_all_galleries, set_image_galleries
         
         # Get all galleries
         all_galleries = get_all_galleries()
         gallery_map = {g['name']: g['id'] for g in all_galleries}
         
-        # Get current galleries for this image
-        current_galleries = get_galleries_for_image(filename)
-        current_gallery_ids = {g['id'] for g in current_galleries}
-        
-        # Determine which galleries to add and remove
-        selected_gallery_ids = {gallery_map[name] for name in gallery_names if name in gallery_map}
-        
-        # Remove from galleries not in selection
-        for gallery_id in current_gallery_ids - selected_gallery_ids:
-            remove_image_from_gallery(gallery_id, filename)
-        
-        # Add to new galleries
-        for gallery_id in selected_gallery_ids - current_gallery_ids:
-            add_image_to_gallery(gallery_id, filename)
+        # Replace this image's memberships in one transaction
+        selected_gallery_ids = [gallery_map[name] for name in gallery_names if name in gallery_map]
+        set_image_galleries(filename, selected_gallery_ids)
         
         return jsonify({'success': True, 'message': 'Galleries updated successfully'})
     except Exception as e:
@@ -6146,3 +5673,8 @@ def manage_carousel_speed():
         
         speed = int(row['value']) if row else 5000
         return jsonify({'speed': speed})
+
+
+# Start the background job runner last, after every blueprint and module has registered its
+# job types; it resumes jobs interrupted by a restart once their heartbeat goes stale
+start_job_runner()
@@ -0,0 +1,311 @@
+"""
+Fifth Element Photography - Data Change Journal
+Version: 1.0.0
+
+Knows what changed in the image library (/data) since it last looked.
+A snapshot of every image - name, size, mtime, inode and SHA-256 of its
+content - is kept in data_journal.db. detect_changes() lists the folder
+with os.scandir, hashes only files whose size/mtime/inode differ from the
+snapshot (a touched but identical file is not a change), and updates the
+snapshot and the change log in one transaction.
+
+sync_data_journal() runs detect_changes() and hands the result to every
+registered listener (catalog cache, gallery renditions, EXIF index):
+
+    from data_journal import register_change_listener, sync_data_journal
+    register_change_listener('exif', lambda changes: ...)
+    sync_data_journal()
+    # {'added': ['heron.jpg'], 'changed': [], 'removed': ['old.jpg']}
+
+Only one process scans at a time: a scan first claims the scan_lock row
+(every gunicorn worker starts one at boot; the others skip theirs rather
+than hash the same files). Files are hashed without holding the database
+write lock; the scan then takes it, re-reads the snapshot and records only
+files that still have the size/mtime/inode they were hashed with.
+"""
+
+import os
+import time
+import socket
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+if os.path.exists('/data'):
+    IMAGES_FOLDER = '/data'
+    DB_PATH = '/data/data_journal.db'
+else:
+    IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), 'data')
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'data_journal.db')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+HASH_CHUNK_SIZE = 1024 * 1024
+# Change log rows kept (oldest are pruned after each scan)
+MAX_CHANGE_ROWS = 10000
+# A scan lock not refreshed for this long belongs to a dead process and can be taken over
+SCAN_LOCK_STALE_AFTER = 300
+SCAN_LOCK_REFRESH = 30
+
+SCANNER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+_listeners = {}
+_db_initialized = False
+
+
+def get_db():
+    """Connection to data_journal.db (tables are created on first use)"""
+    global _db_initialized
+    conn = sqlite3.connect(DB_PATH, timeout=60)
+    conn.row_factory = sqlite3.Row
+    if not _db_initialized:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS file_snapshot (
+                filename TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                seen_at TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS file_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                change TEXT NOT NULL,
+                content_hash TEXT,
+                detected_at TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scan_lock (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                owner TEXT NOT NULL,
+                heartbeat_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        _db_initialized = True
+    return conn
+
+
+def _acquire_scan_lock():
+    """Claim the scan lock for this process; False if another live process holds it"""
+    conn = get_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT owner, heartbeat_at FROM scan_lock WHERE id = 1').fetchone()
+        if row and row['owner'] != SCANNER_ID and row['heartbeat_at'] > time.time() - SCAN_LOCK_STALE_AFTER:
+            conn.rollback()
+            return False
+        conn.execute('''
+            INSERT INTO scan_lock (id, owner, heartbeat_at) VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, heartbeat_at = excluded.heartbeat_at
+        ''', (SCANNER_ID, time.time()))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def _refresh_scan_lock():
+    conn = get_db()
+    conn.execute('UPDATE scan_lock SET heartbeat_at = ? WHERE id = 1 AND owner = ?', (time.time(), SCANNER_ID))
+    conn.commit()
+    conn.close()
+
+
+def _release_scan_lock():
+    conn = get_db()
+    conn.execute('DELETE FROM scan_lock WHERE id = 1 AND owner = ?', (SCANNER_ID,))
+    conn.commit()
+    conn.close()
+
+
+def content_hash(path):
+    """SHA-256 hex digest of a file, read in 1MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_folder(folder=IMAGES_FOLDER):
+    """{filename: (size, mtime_ns, inode)} for the image files directly in `folder`"""
+    entries = {}
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries[entry.name] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _read_snapshot(conn):
+    return {row['filename']: row for row in conn.execute('SELECT * FROM file_snapshot')}
+
+
+def _same_stat(row, stat):
+    return row is not None and (row['size'], row['mtime_ns'], row['inode']) == stat
+
+
+def detect_changes(folder=IMAGES_FOLDER):
+    """
+    Compare `folder` with the snapshot, record the differences and return
+    {'added': [...], 'changed': [...], 'removed': [...]} (sorted filenames),
+    or None if another process is scanning right now.
+    """
+    if not _acquire_scan_lock():
+        return None
+    try:
+        return _detect_changes(folder)
+    finally:
+        _release_scan_lock()
+
+
+def _detect_changes(folder):
+    current = scan_folder(folder)
+    conn = get_db()
+    try:
+        snapshot = _read_snapshot(conn)
+    finally:
+        conn.close()
+
+    # Hash outside any transaction: this is the slow part and must not block writers
+    hashed = {}
+    refreshed_at = time.time()
+    for filename in sorted(current):
+        if _same_stat(snapshot.get(filename), current[filename]):
+            continue
+        if time.time() - refreshed_at > SCAN_LOCK_REFRESH:
+            _refresh_scan_lock()
+            refreshed_at = time.time()
+        try:
+            hashed[filename] = (current[filename], content_hash(os.path.join(folder, filename)))
+        except OSError as e:
+            # Deleted or unreadable mid-scan: pick it up on the next scan
+            print(f"[DATA JOURNAL] Could not hash {filename}: {e}")
+            continue
+
+    now = datetime.now().isoformat()
+    changes = {'added': [], 'changed': [], 'removed': []}
+    upserts = []
+    log = []
+
+    conn = get_db()
+    try:
+        # Re-read under the write lock so concurrent scans don't report the same change twice
+        conn.execute('BEGIN IMMEDIATE')
+        snapshot = _read_snapshot(conn)
+
+        for filename, (stat, digest) in hashed.items():
+            previous = snapshot.get(filename)
+            if _same_stat(previous, stat):
+                continue  # Another scan recorded it meanwhile
+            try:
+                st = os.stat(os.path.join(folder, filename))
+            except OSError:
+                continue
+            if (st.st_size, st.st_mtime_ns, st.st_ino) != stat:
+                continue  # Modified since it was hashed: the next scan picks it up
+            upserts.append((filename, *stat, digest, now))
+            if previous is None:
+                changes['added'].append(filename)
+                log.append((filename, 'added', digest, now))
+            elif previous['content_hash'] != digest:
+                changes['changed'].append(filename)
+                log.append((filename, 'changed', digest, now))
+
+        # Confirm on disk: another scan may have recorded a file created after our listing
+        changes['removed'] = sorted(name for name in set(snapshot) - set(current)
+                                    if not os.path.exists(os.path.join(folder, name)))
+        log.extend((filename, 'removed', None, now) for filename in changes['removed'])
+
+        conn.executemany('''
+            INSERT INTO file_snapshot (filename, size, mtime_ns, inode, content_hash, seen_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(filename) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode,
+                content_hash = excluded.content_hash, seen_at = excluded.seen_at
+        ''', upserts)
+        conn.executemany('DELETE FROM file_snapshot WHERE filename = ?', [(name,) for name in changes['removed']])
+        conn.executemany('INSERT INTO file_changes (filename, change, content_hash, detected_at) VALUES (?, ?, ?, ?)', log)
+        conn.execute('DELETE FROM file_changes WHERE id <= (SELECT MAX(id) FROM file_changes) - ?', (MAX_CHANGE_ROWS,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return changes
+
+
+def register_change_listener(name, callback):
+    """Call callback(changes) after every scan that found something (replaces a listener of the same name)"""
+    _listeners[name] = callback
+
+
+def sync_data_journal(folder=IMAGES_FOLDER):
+    """
+    Detect changes and notify the listeners; a failing listener doesn't stop
+    the others. Returns None if another process is already scanning.
+    """
+    changes = detect_changes(folder)
+    if changes is None:
+        print("[DATA JOURNAL] Another worker is scanning; skipped")
+        return None
+    counts = {change: len(filenames) for change, filenames in changes.items()}
+    if not any(counts.values()):
+        return changes
+
+    print(f"[DATA JOURNAL] {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+    for name, callback in list(_listeners.items()):
+        try:
+            callback(changes)
+        except Exception as e:
+            print(f"[DATA JOURNAL] Listener {name} failed: {e}")
+    return changes
+
+
+def start_data_journal_sync(folder=IMAGES_FOLDER):
+    """Run sync_data_journal() once in a background thread (startup: hashing new files can take a while)"""
+    def run():
+        try:
+            sync_data_journal(folder)
+        except Exception as e:
+            print(f"[DATA JOURNAL] Scan failed: {e}")
+    thread = threading.Thread(target=run, name='data-journal', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_snapshot_entry(filename):
+    """Snapshot row for a file ({'size', 'mtime_ns', 'inode', 'content_hash', 'seen_at'}) or None"""
+    conn = get_db()
+    row = conn.execute('SELECT * FROM file_snapshot WHERE filename = ?', (filename,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def get_recent_changes(since_id=0, limit=500):
+    """Change log entries after `since_id`, oldest first"""
+    conn = get_db()
+    rows = conn.execute('''
+        SELECT id, filename, change, content_hash, detected_at FROM file_changes
+        WHERE id > ? ORDER BY id LIMIT ?
+    ''', (since_id, limit)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
@@ -0,0 +1,20 @@
+-- Migration: Covering indexes for the hot print_ordering lookups
+-- Created: 2026-10-19
+-- Applied at startup by migrate_query_indexes.py; checked by test_query_plans.py
+
+-- Markup lookups: WHERE rule_type = ? AND is_active = TRUE ORDER BY priority DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_markup_rules_type_active_priority ON markup_rules(rule_type, is_active, priority, markup_value);
+
+-- Pricing by aspect ratio / product type name
+CREATE INDEX IF NOT EXISTS idx_aspect_ratios_display_name ON aspect_ratios(display_name);
+CREATE INDEX IF NOT EXISTS idx_subcategories_display_name ON product_subcategories(display_name);
+CREATE INDEX IF NOT EXISTS idx_base_pricing_available ON base_pricing(is_available, subcategory_id, size_id, cost_price);
+
+-- Frame price adjustments: WHERE po.option_name = ?
+CREATE INDEX IF NOT EXISTS idx_product_options_name ON product_options(option_name);
+
+-- CSV export frame list: WHERE fo.subcategory_id = ? AND fo.is_available = TRUE
+CREATE INDEX IF NOT EXISTS idx_frame_options_subcategory ON frame_options(subcategory_id, is_available, frame_name);
+
+-- Shopify product tracking by image
+CREATE INDEX IF NOT EXISTS idx_shopify_products_filename ON shopify_products(image_filename);
@@ -290,6 +290,11 @@ CREATE INDEX IF NOT EXISTS idx_coupons_active ON coupons(is_active);
 CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(order_status);
 CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id);
 CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_markup_rules_type_active_priority ON markup_rules(rule_type, is_active, priority, markup_value);
+CREATE INDEX IF NOT EXISTS idx_aspect_ratios_display_name ON aspect_ratios(display_name);
+CREATE INDEX IF NOT EXISTS idx_subcategories_display_name ON product_subcategories(display_name);
+CREATE INDEX IF NOT EXISTS idx_base_pricing_available ON base_pricing(is_available, subcategory_id, size_id, cost_price);
+CREATE INDEX IF NOT EXISTS idx_product_options_name ON product_options(option_name);
 
 -- ============================================================================
 -- INITIAL DATA POPULATION
@@ -1,8 +1,20 @@
 """
 Helper functions for EXIF database operations
+
+Besides the display fields (model, lens, ...) each row holds the image
+metadata pages and the order form need - pixel dimensions, format, DPI,
+capture date, GPS presence and orientation - filled at ingest from
+exif_engine.extract_image_metadata(), so nothing re-opens the file per request.
+Rows written before those columns existed have width NULL until backfilled.
+
+image_exif_numeric mirrors the display fields as indexed numbers (aperture
+as f-number, exposure in seconds, ISO, focal length in mm) plus the camera
+and lens names, for range and facet queries (see exif_search). It is written
+in the same transaction as image_exif.
 """
 import sqlite3
 import os
+import re
 
 # Database path - use /data on Railway, local path for development
 if os.path.exists('/data'):
@@ -10,26 +22,107 @@ if os.path.exists('/data'):
 else:
     DB_PATH = os.path.join(os.path.dirname(__file__), 'image_exif.db')
 
+DISPLAY_FIELDS = ('model', 'lens', 'aperture', 'shutter_speed', 'iso', 'focal_length')
+# Metadata columns added to image_exif (name, SQL type)
+METADATA_COLUMNS = (
+    ('width', 'INTEGER'),
+    ('height', 'INTEGER'),
+    ('format', 'TEXT'),
+    ('dpi', 'REAL'),
+    ('capture_date', 'TEXT'),
+    ('has_gps', 'INTEGER'),
+    ('orientation', 'INTEGER')
+)
+COLUMNS = DISPLAY_FIELDS + tuple(name for name, _ in METADATA_COLUMNS)
+
+# Numeric mirror of the display fields (column, SQL type)
+NUMERIC_COLUMNS = (
+    ('camera', 'TEXT'),
+    ('lens', 'TEXT'),
+    ('aperture', 'REAL'),
+    ('exposure_seconds', 'REAL'),
+    ('iso', 'INTEGER'),
+    ('focal_length_mm', 'REAL')
+)
+
+_table_ready = False
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+def get_db():
+    """Connection to image_exif.db (table and metadata columns are created on first use)"""
+    if not _table_ready:
+        ensure_exif_table()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _exif_row(filename, exif_data):
+    row = [filename]
+    row.extend(exif_data.get(field, 'Unavailable') for field in DISPLAY_FIELDS)
+    for name, _ in METADATA_COLUMNS:
+        value = exif_data.get(name)
+        row.append(int(value) if name == 'has_gps' and value is not None else value)
+    return tuple(row)
+
+def _text_value(value):
+    if not value or value == 'Unavailable':
+        return None
+    return str(value).strip() or None
+
+def _number(value):
+    """First number in a display string ('f/2.8' -> 2.8, 'ISO 400' -> 400.0), or None"""
+    match = _NUMBER.search(str(value)) if value else None
+    return float(match.group()) if match else None
+
+def parse_exposure_seconds(value):
+    """'1/250s' -> 0.004, '2.5s' -> 2.5"""
+    value = _text_value(value)
+    if not value:
+        return None
+    value = value.rstrip('s').strip()
+    try:
+        if '/' in value:
+            numerator, denominator = value.split('/', 1)
+            return float(numerator) / float(denominator) if float(denominator) else None
+        return float(value)
+    except ValueError:
+        return None
+
+def normalize_exif(exif_data):
+    """(camera, lens, aperture, exposure_seconds, iso, focal_length_mm) from the display fields"""
+    iso = _number(_text_value(exif_data.get('iso')))
+    return (
+        _text_value(exif_data.get('model')),
+        _text_value(exif_data.get('lens')),
+        _number(_text_value(exif_data.get('aperture'))),
+        parse_exposure_seconds(exif_data.get('shutter_speed')),
+        int(iso) if iso is not None else None,
+        _number(_text_value(exif_data.get('focal_length')))
+    )
+
+def _row_to_exif(row):
+    exif_data = {field: row[field] for field in COLUMNS}
+    if exif_data['has_gps'] is not None:
+        exif_data['has_gps'] = bool(exif_data['has_gps'])
+    return exif_data
+
+_INSERT_SQL = f'''
+    INSERT OR REPLACE INTO image_exif 
+    (filename, {', '.join(COLUMNS)}, updated_at)
+    VALUES (?, {', '.join('?' for _ in COLUMNS)}, CURRENT_TIMESTAMP)
+'''
+_NUMERIC_INSERT_SQL = f'''
+    INSERT OR REPLACE INTO image_exif_numeric 
+    (filename, {', '.join(name for name, _ in NUMERIC_COLUMNS)})
+    VALUES (?, {', '.join('?' for _ in NUMERIC_COLUMNS)})
+'''
+
 def store_exif_in_db(filename, exif_data):
-    """Store EXIF data in database"""
+    """Store EXIF data (and any metadata fields present) in database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO image_exif 
-            (filename, model, lens, aperture, shutter_speed, iso, focal_length)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            filename,
-            exif_data.get('model', 'Unavailable'),
-            exif_data.get('lens', 'Unavailable'),
-            exif_data.get('aperture', 'Unavailable'),
-            exif_data.get('shutter_speed', 'Unavailable'),
-            exif_data.get('iso', 'Unavailable'),
-            exif_data.get('focal_length', 'Unavailable')
-        ))
-        
+        conn = get_db()
+        conn.execute(_INSERT_SQL, _exif_row(filename, exif_data))
+        conn.execute(_NUMERIC_INSERT_SQL, (filename,) + normalize_exif(exif_data))
         conn.commit()
         conn.close()
         print(f"✅ Stored EXIF for {filename} in database")
@@ -38,32 +131,28 @@ def store_exif_in_db(filename, exif_data):
         print(f"❌ Error storing EXIF for {filename}: {e}")
         return False
 
+def store_exif_batch(exif_by_filename):
+    """Store EXIF data for many images in one transaction, returns the number stored"""
+    rows = [_exif_row(filename, exif_data) for filename, exif_data in exif_by_filename.items()]
+    
+    conn = get_db()
+    try:
+        conn.executemany(_INSERT_SQL, rows)
+        conn.executemany(_NUMERIC_INSERT_SQL, [(filename,) + normalize_exif(exif_data)
+                                               for filename, exif_data in exif_by_filename.items()])
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ Stored EXIF for {len(rows)} images in database")
+    return len(rows)
+
 def get_exif_from_db(filename):
     """Retrieve EXIF data from database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT model, lens, aperture, shutter_speed, iso, focal_length
-            FROM image_exif
-            WHERE filename = ?
-        ''', (filename,))
-        
-        result = cursor.fetchone()
+        conn = get_db()
+        result = conn.execute('SELECT * FROM image_exif WHERE filename = ?', (filename,)).fetchone()
         conn.close()
-        
-        if result:
-            return {
-                'model': result[0],
-                'lens': result[1],
-                'aperture': result[2],
-                'shutter_speed': result[3],
-                'iso': result[4],
-                'focal_length': result[5]
-            }
-        else:
-            return None
+        return _row_to_exif(result) if result else None
     except Exception as e:
         print(f"Error retrieving EXIF for {filename}: {e}")
         return None
@@ -71,40 +160,42 @@ def get_exif_from_db(filename):
 def get_all_exif_from_db():
     """Retrieve all EXIF data from database as a dictionary"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT filename, model, lens, aperture, shutter_speed, iso, focal_length
-            FROM image_exif
-        ''')
-        
-        results = cursor.fetchall()
+        conn = get_db()
+        results = conn.execute('SELECT * FROM image_exif').fetchall()
         conn.close()
-        
-        exif_dict = {}
-        for row in results:
-            exif_dict[row[0]] = {
-                'model': row[1],
-                'lens': row[2],
-                'aperture': row[3],
-                'shutter_speed': row[4],
-                'iso': row[5],
-                'focal_length': row[6]
-            }
-        
-        return exif_dict
+        return {row['filename']: _row_to_exif(row) for row in results}
     except Exception as e:
         print(f"Error retrieving all EXIF: {e}")
         return {}
 
+# Filenames per IN (...) lookup, well under SQLite's bound-parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+def get_exif_for_filenames(filenames):
+    """EXIF data for just these images (primary-key lookups), as {filename: exif}"""
+    filenames = list(dict.fromkeys(filenames))
+    try:
+        conn = get_db()
+        exif = {}
+        for start in range(0, len(filenames), LOOKUP_BATCH_SIZE):
+            batch = filenames[start:start + LOOKUP_BATCH_SIZE]
+            rows = conn.execute(f'SELECT * FROM image_exif WHERE filename IN ({", ".join("?" for _ in batch)})',
+                                batch).fetchall()
+            exif.update((row['filename'], _row_to_exif(row)) for row in rows)
+        conn.close()
+        return exif
+    except Exception as e:
+        print(f"Error retrieving EXIF: {e}")
+        return {}
+
 def delete_exif_from_db(filename):
     """Delete EXIF data for a specific image"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cursor = conn.cursor()
         
         cursor.execute('DELETE FROM image_exif WHERE filename = ?', (filename,))
+        cursor.execute('DELETE FROM image_exif_numeric WHERE filename = ?', (filename,))
         
         conn.commit()
         conn.close()
@@ -114,8 +205,29 @@ def delete_exif_from_db(filename):
         return False
 
 
+def get_filenames_with_metadata():
+    """Filenames whose row already has the metadata columns filled (width set)"""
+    conn = get_db()
+    rows = conn.execute('SELECT filename FROM image_exif WHERE width IS NOT NULL').fetchall()
+    conn.close()
+    return {row['filename'] for row in rows}
+
+
+def get_image_dimensions_from_db():
+    """{filename: {'width', 'height'}} for every image whose dimensions were read from the file"""
+    try:
+        conn = get_db()
+        rows = conn.execute('SELECT filename, width, height FROM image_exif WHERE width > 0 AND height > 0').fetchall()
+        conn.close()
+        return {row['filename']: {'width': row['width'], 'height': row['height']} for row in rows}
+    except Exception as e:
+        print(f"Error retrieving image dimensions: {e}")
+        return {}
+
+
 def ensure_exif_table():
-    """Ensure the image_exif table exists"""
+    """Ensure the image_exif table exists with all metadata columns"""
+    global _table_ready
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
@@ -134,9 +246,40 @@ def ensure_exif_table():
             )
         ''')
         
+        # Add metadata columns to tables created before they existed
+        existing = {row[1] for row in cursor.execute('PRAGMA table_info(image_exif)')}
+        for name, sql_type in METADATA_COLUMNS:
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE image_exif ADD COLUMN {name} {sql_type}')
+        
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS image_exif_numeric (
+                filename TEXT PRIMARY KEY,
+                {', '.join(f'{name} {sql_type}' for name, sql_type in NUMERIC_COLUMNS)}
+            )
+        ''')
+        for name, _ in NUMERIC_COLUMNS:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_image_exif_numeric_{name} ON image_exif_numeric({name})')
+        
+        # Fill the numeric table from rows stored before it existed
+        if cursor.execute('SELECT 1 FROM image_exif_numeric LIMIT 1').fetchone() is None:
+            rebuild_numeric_exif(conn)
+        
         conn.commit()
         conn.close()
+        _table_ready = True
         return True
     except Exception as e:
         print(f"Error creating EXIF table: {e}")
         return False
+
+
+def rebuild_numeric_exif(conn):
+    """Recompute image_exif_numeric from image_exif (caller commits)"""
+    cursor = conn.cursor()
+    rows = cursor.execute(f'SELECT filename, {", ".join(DISPLAY_FIELDS)} FROM image_exif').fetchall()
+    cursor.execute('DELETE FROM image_exif_numeric')
+    cursor.executemany(_NUMERIC_INSERT_SQL, [
+        (row[0],) + normalize_exif(dict(zip(DISPLAY_FIELDS, row[1:]))) for row in rows
+    ])
+    return len(rows)
@@ -0,0 +1,314 @@
+"""
+Fifth Element Photography - EXIF Engine
+Version: 1.0.0
+
+Reads EXIF without decoding (or even fully reading) the image. For JPEGs
+only the marker headers up to the APP1 "Exif" segment are read (seek past
+everything else, stop at the start of scan), and that segment is parsed
+with Pillow's Image.Exif. Other formats fall back to Image.open(), which
+is lazy and only parses the header, plus getexif().
+
+Only the tags the site displays or stores are looked up (IFD0, the Exif
+sub-IFD and GPS presence). Rationals are converted with fractions.Fraction
+so the same file always formats the same way.
+
+Usage:
+    from exif_engine import extract_exif, extract_exif_batch
+    extract_exif('/data/heron.jpg')
+    # {'model': 'NIKON Z 8', 'lens': 'NIKKOR Z 180-600mm', 'aperture': 'f/6.3', ...}
+    extract_exif_batch(paths, max_workers=4)   # {path: exif}
+    extract_image_metadata('/data/heron.jpg')  # exif + width/height/dpi/capture_date/has_gps/orientation
+"""
+
+import struct
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ExifTags
+
+UNAVAILABLE = 'Unavailable'
+
+# Stop looking for APP1 after this many bytes of JPEG headers
+MAX_HEADER_SCAN = 1024 * 1024
+
+EXIF_HEADER = b'Exif\x00\x00'
+
+# tag id -> name, for the tags we use
+IFD0_TAGS = {
+    0x010F: 'Make',
+    0x0110: 'Model',
+    0x0112: 'Orientation',
+    0x011A: 'XResolution',
+    0x011B: 'YResolution',
+    0x0128: 'ResolutionUnit',
+    0x0132: 'DateTime',
+}
+EXIF_IFD_TAGS = {
+    0x829A: 'ExposureTime',
+    0x829D: 'FNumber',
+    0x8827: 'ISOSpeedRatings',
+    0x9003: 'DateTimeOriginal',
+    0x9202: 'ApertureValue',
+    0x920A: 'FocalLength',
+    0xA002: 'PixelXDimension',
+    0xA003: 'PixelYDimension',
+    0xA433: 'LensMake',
+    0xA434: 'LensModel',
+}
+
+
+def default_exif():
+    """Display fields when a file has no (readable) EXIF"""
+    return {
+        'model': UNAVAILABLE,
+        'lens': UNAVAILABLE,
+        'aperture': UNAVAILABLE,
+        'shutter_speed': UNAVAILABLE,
+        'iso': UNAVAILABLE,
+        'focal_length': UNAVAILABLE
+    }
+
+
+def read_jpeg_app1(path, max_scan=MAX_HEADER_SCAN):
+    """Raw APP1 Exif payload of a JPEG (b'Exif\\0\\0...'), or None. Reads only segment headers and APP1."""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while f.tell() < max_scan:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF:
+                return None
+            marker = header[1]
+            # Fill bytes before a marker
+            while marker == 0xFF:
+                header = header[1:] + f.read(1)
+                if len(header) < 4:
+                    return None
+                marker = header[1]
+            # Start of scan / end of image: no more metadata segments
+            if marker in (0xDA, 0xD9):
+                return None
+            length = struct.unpack('>H', header[2:4])[0]
+            if length < 2:
+                return None
+            if marker == 0xE1:
+                payload = f.read(length - 2)
+                if payload.startswith(EXIF_HEADER):
+                    return payload
+            else:
+                f.seek(length - 2, 1)
+    return None
+
+
+def _load_exif(path):
+    """Pillow Exif object for a file, parsed from the header only"""
+    payload = None
+    try:
+        payload = read_jpeg_app1(path)
+    except OSError:
+        pass
+    if payload:
+        exif = Image.Exif()
+        exif.load(payload)
+        return exif
+    with Image.open(path) as img:
+        return img.getexif()
+
+
+def _tags_from_exif(exif):
+    tags = {}
+    for tag_id, name in IFD0_TAGS.items():
+        if tag_id in exif:
+            tags[name] = exif[tag_id]
+    exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+    for tag_id, name in EXIF_IFD_TAGS.items():
+        if tag_id in exif_ifd:
+            tags[name] = exif_ifd[tag_id]
+    tags['HasGPS'] = bool(exif.get_ifd(ExifTags.IFD.GPSInfo))
+    return tags
+
+
+def read_exif_tags(path):
+    """{tag name: raw value} for the tags in IFD0_TAGS/EXIF_IFD_TAGS, plus 'HasGPS'"""
+    return _tags_from_exif(_load_exif(path))
+
+
+def read_all_tags(path):
+    """Every IFD0 and Exif sub-IFD tag by name (for debugging)"""
+    exif = _load_exif(path)
+    tags = {}
+    for ifd in (exif, exif.get_ifd(ExifTags.IFD.Exif)):
+        for tag_id, value in ifd.items():
+            tags[ExifTags.TAGS.get(tag_id, f'Unknown_{tag_id}')] = value
+    return tags
+
+
+def to_fraction(value):
+    """Exact Fraction for an EXIF rational (IFDRational, (num, den) tuple, int, float or numeric string)"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (tuple, list)):
+            if len(value) == 2 and not isinstance(value[0], (tuple, list)):
+                return Fraction(int(value[0]), int(value[1])) if value[1] else None
+            return to_fraction(value[0]) if value else None
+        if hasattr(value, 'numerator') and hasattr(value, 'denominator'):
+            if not value.denominator:
+                return None
+            return Fraction(int(value.numerator), int(value.denominator))
+        if isinstance(value, bytes):
+            value = value.decode('ascii', errors='ignore')
+        return Fraction(str(value).strip())
+    except (ValueError, ZeroDivisionError, TypeError):
+        return None
+
+
+def _round_half_up(fraction):
+    return int(fraction + Fraction(1, 2)) if fraction >= 0 else -int(-fraction + Fraction(1, 2))
+
+
+def _text(value):
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='ignore')
+    if not isinstance(value, str):
+        return ''
+    return value.replace('\x00', '').strip()
+
+
+def format_camera(tags):
+    make = _text(tags.get('Make'))
+    model = _text(tags.get('Model'))
+    if make and model:
+        # Remove make from model if it's already included
+        return model if make.lower() in model.lower() else f'{make} {model}'
+    return model or make or UNAVAILABLE
+
+
+def format_lens(tags):
+    return _text(tags.get('LensModel')) or _text(tags.get('LensMake')) or UNAVAILABLE
+
+
+def format_aperture(tags):
+    f_number = to_fraction(tags.get('FNumber'))
+    if not f_number:
+        # ApertureValue is APEX: f-number = sqrt(2) ** Av
+        apex = to_fraction(tags.get('ApertureValue'))
+        if apex is None:
+            return UNAVAILABLE
+        return f'f/{2 ** (float(apex) / 2):.1f}'
+    return f'f/{float(f_number):.1f}'
+
+
+def format_shutter_speed(tags):
+    exposure = to_fraction(tags.get('ExposureTime'))
+    if not exposure or exposure <= 0:
+        return UNAVAILABLE
+    if exposure >= 1:
+        return f'{float(exposure):.1f}s'
+    if exposure.numerator == 1:
+        return f'1/{exposure.denominator}s'
+    return f'1/{_round_half_up(1 / exposure)}s'
+
+
+def format_iso(tags):
+    iso = tags.get('ISOSpeedRatings')
+    if isinstance(iso, (tuple, list)):
+        iso = iso[0] if iso else None
+    try:
+        return f'ISO {int(iso)}' if iso else UNAVAILABLE
+    except (TypeError, ValueError):
+        return UNAVAILABLE
+
+
+def format_focal_length(tags):
+    focal = to_fraction(tags.get('FocalLength'))
+    if not focal:
+        return UNAVAILABLE
+    return f'{_round_half_up(focal)}mm'
+
+
+def format_exif(tags):
+    """Display fields (as stored in image_exif.db) from read_exif_tags() output"""
+    return {
+        'model': format_camera(tags),
+        'lens': format_lens(tags),
+        'aperture': format_aperture(tags),
+        'shutter_speed': format_shutter_speed(tags),
+        'iso': format_iso(tags),
+        'focal_length': format_focal_length(tags)
+    }
+
+
+def format_capture_date(tags):
+    """'2024:05:01 06:12:09' -> '2024-05-01T06:12:09' (DateTimeOriginal, else DateTime), or None"""
+    value = _text(tags.get('DateTimeOriginal')) or _text(tags.get('DateTime'))
+    if len(value) < 19 or value.startswith('0000'):
+        return None
+    date, _, time = value[:19].partition(' ')
+    return f"{date.replace(':', '-')}T{time}"
+
+
+def resolution_dpi(info_dpi, tags):
+    """Pixels per inch from the file header, else from EXIF XResolution (inches only), or None"""
+    if isinstance(info_dpi, tuple) and info_dpi:
+        dpi = to_fraction(info_dpi[0])
+    else:
+        unit = tags.get('ResolutionUnit', 2)
+        dpi = to_fraction(tags.get('XResolution')) if unit == 2 else None
+    return round(float(dpi), 2) if dpi else None
+
+
+def extract_exif(path):
+    """Display EXIF fields for one file (defaults if it has none or can't be read)"""
+    try:
+        return format_exif(read_exif_tags(path))
+    except Exception as e:
+        print(f"[EXIF] Could not read EXIF from {path}: {e}")
+        return default_exif()
+
+
+def extract_image_metadata(path):
+    """
+    Display EXIF fields plus width, height, format, dpi, capture_date,
+    has_gps and orientation, all from the file header. None if unreadable.
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            image_format = img.format
+            info_dpi = img.info.get('dpi')
+            tags = _tags_from_exif(img.getexif())
+    except Exception as e:
+        print(f"[EXIF] Could not read metadata from {path}: {e}")
+        return None
+
+    metadata = format_exif(tags)
+    orientation = tags.get('Orientation')
+    metadata.update({
+        'width': width,
+        'height': height,
+        'format': image_format,
+        'dpi': resolution_dpi(info_dpi, tags),
+        'capture_date': format_capture_date(tags),
+        'has_gps': tags['HasGPS'],
+        'orientation': orientation if isinstance(orientation, int) else None
+    })
+    return metadata
+
+
+def _map_paths(function, paths, max_workers):
+    paths = list(paths)
+    if max_workers <= 1 or len(paths) <= 1:
+        return {path: function(path) for path in paths}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(paths, executor.map(function, paths)))
+
+
+def extract_exif_batch(paths, max_workers=4):
+    """{path: display EXIF} for many files, reading headers on a small thread pool"""
+    return _map_paths(extract_exif, paths, max_workers)
+
+
+def extract_metadata_batch(paths, max_workers=4):
+    """{path: extract_image_metadata() result (None if unreadable)} for many files"""
+    return _map_paths(extract_image_metadata, paths, max_workers)
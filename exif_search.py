@@ -0,0 +1,184 @@
+"""
+Fifth Element Photography - EXIF Search
+Version: 1.0.0
+
+Faceted photo search over image_exif_numeric (see exif_db_helper): exact
+camera/lens filters and numeric range filters on focal length, ISO,
+aperture and exposure, all answered from indexed columns.
+
+Facet counts are disjunctive: each facet is counted with every filter
+except its own, so selecting "400mm+" still shows how many images the
+other focal buckets would give.
+
+Usage:
+    from exif_search import parse_filters, search_photos
+    filters = parse_filters({'focal_min': '300', 'focal_max': '600', 'iso_max': '800'})
+    result = search_photos(filters, limit=48)
+    result['total'], result['filenames'], result['facets']
+"""
+
+from exif_db_helper import get_db
+
+# filter name -> column
+VALUE_FILTERS = {
+    'camera': 'camera',
+    'lens': 'lens',
+}
+RANGE_FILTERS = {
+    'focal': 'focal_length_mm',
+    'iso': 'iso',
+    'aperture': 'aperture',
+    'exposure': 'exposure_seconds',
+}
+
+# Facet buckets for the range filters: (label, min inclusive, max exclusive)
+RANGE_BUCKETS = {
+    'focal': [
+        ('Under 24mm', None, 24),
+        ('24-70mm', 24, 70),
+        ('70-200mm', 70, 200),
+        ('200-400mm', 200, 400),
+        ('400mm+', 400, None),
+    ],
+    'iso': [
+        ('ISO 200 and below', None, 201),
+        ('ISO 250-800', 201, 801),
+        ('ISO 1000-3200', 801, 3201),
+        ('Above ISO 3200', 3201, None),
+    ],
+    'aperture': [
+        ('Wider than f/2.8', None, 2.8),
+        ('f/2.8-f/5.6', 2.8, 5.7),
+        ('f/5.6-f/11', 5.7, 11.5),
+        ('f/11 and narrower', 11.5, None),
+    ],
+    'exposure': [
+        ('Faster than 1/1000s', None, 0.001),
+        ('1/1000s-1/60s', 0.001, 1 / 60),
+        ('1/60s-1s', 1 / 60, 1),
+        ('1s and longer', 1, None),
+    ],
+}
+
+VALUE_FACET_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def parse_filters(args):
+    """
+    Filters from query args: camera, lens, and <name>_min / <name>_max for
+    focal, iso, aperture and exposure (inclusive). Raises ValueError on a
+    non-numeric bound.
+    """
+    filters = {}
+    for name in VALUE_FILTERS:
+        value = (args.get(name) or '').strip()
+        if value:
+            filters[name] = value
+    for name in RANGE_FILTERS:
+        low, high = args.get(f'{name}_min'), args.get(f'{name}_max')
+        if low in (None, '') and high in (None, ''):
+            continue
+        try:
+            filters[name] = (float(low) if low not in (None, '') else None,
+                             float(high) if high not in (None, '') else None)
+        except ValueError:
+            raise ValueError(f'{name}_min/{name}_max must be numbers')
+    return filters
+
+
+def _where(filters, exclude=None):
+    clauses = []
+    params = []
+    for name, value in filters.items():
+        if name == exclude:
+            continue
+        if name in VALUE_FILTERS:
+            clauses.append(f'{VALUE_FILTERS[name]} = ?')
+            params.append(value)
+        elif name in RANGE_FILTERS:
+            column = RANGE_FILTERS[name]
+            low, high = value
+            if low is not None:
+                clauses.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                clauses.append(f'{column} <= ?')
+                params.append(high)
+    return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def _value_facet(conn, name, filters):
+    column = VALUE_FILTERS[name]
+    where, params = _where(filters, exclude=name)
+    where = f'{where} AND {column} IS NOT NULL' if where else f'WHERE {column} IS NOT NULL'
+    rows = conn.execute(f'''
+        SELECT {column} AS value, COUNT(*) AS count FROM image_exif_numeric
+        {where}
+        GROUP BY {column}
+        ORDER BY count DESC, value
+        LIMIT ?
+    ''', params + [VALUE_FACET_LIMIT]).fetchall()
+    return [{'value': row['value'], 'count': row['count']} for row in rows]
+
+
+def _range_facet(conn, name, filters):
+    """One COUNT(*) per bucket, each a range predicate the column's index can answer"""
+    column = RANGE_FILTERS[name]
+    where, params = _where(filters, exclude=name)
+    facet = []
+    for label, low, high in RANGE_BUCKETS[name]:
+        conditions = [f'{column} IS NOT NULL']
+        bucket_params = []
+        if low is not None:
+            conditions.append(f'{column} >= ?')
+            bucket_params.append(low)
+        if high is not None:
+            conditions.append(f'{column} < ?')
+            bucket_params.append(high)
+        bucket_where = f"{where} AND {' AND '.join(conditions)}" if where else f"WHERE {' AND '.join(conditions)}"
+        count = conn.execute(f'SELECT COUNT(*) FROM image_exif_numeric {bucket_where}',
+                             params + bucket_params).fetchone()[0]
+        facet.append({'label': label, 'min': low, 'max': high, 'count': count})
+    return facet
+
+
+def search_photos(filters, limit=48, offset=0, sort=None):
+    """
+    One page of filenames matching `filters` (from parse_filters), the total
+    and the facet counts. `sort` is a range filter name ('focal', '-iso', ...;
+    '-' for descending), default filename order.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    offset = max(0, int(offset or 0))
+
+    order_sql = 'filename'
+    if sort and sort.lstrip('-') in RANGE_FILTERS:
+        direction = 'DESC' if sort.startswith('-') else 'ASC'
+        column = RANGE_FILTERS[sort.lstrip('-')]
+        order_sql = f'{column} IS NULL, {column} {direction}, filename'
+
+    conn = get_db()
+    try:
+        where, params = _where(filters)
+        total = conn.execute(f'SELECT COUNT(*) FROM image_exif_numeric {where}', params).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT filename FROM image_exif_numeric
+            {where}
+            ORDER BY {order_sql}
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset]).fetchall()
+
+        facets = {}
+        for name in VALUE_FILTERS:
+            facets[name] = _value_facet(conn, name, filters)
+        for name in RANGE_FILTERS:
+            facets[name] = _range_facet(conn, name, filters)
+    finally:
+        conn.close()
+
+    return {
+        'total': total,
+        'filenames': [row['filename'] for row in rows],
+        'facets': facets
+    }
@@ -1,10 +1,13 @@
 """
 Gallery Database Helper
-Manages galleries (collections of images with hero image)
+Manages galleries (collections of images with hero image) and the
+portfolio display order (portfolio_order: one row per ordered image;
+images without a row come after the ordered ones, by filename)
 """
 import sqlite3
 import os
 import json
+from urllib.parse import quote
 
 DB_PATH = '/data/galleries.db' if os.path.exists('/data') else 'galleries.db'
 
@@ -56,6 +59,29 @@ def init_gallery_db():
         )
     ''')
     
+    # Gallery pages read members in display order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_gallery_images_order
+        ON gallery_images(gallery_id, display_order, image_filename)
+    ''')
+    
+    # Portfolio order (replaces the display_order key of the per-image /data/<filename>.json sidecars)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_order (
+            image_filename TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # One-shot data migrations that have been applied (see migrate_portfolio_order_sidecars)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
     conn.commit()
     conn.close()
 
@@ -86,6 +112,30 @@ def get_all_galleries():
     conn.close()
     return galleries
 
+def get_gallery_summaries():
+    """All visible galleries with their image count and hero thumbnail URL, in one query"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT g.*, COALESCE(counts.image_count, 0) AS image_count
+        FROM galleries g
+        LEFT JOIN (
+            SELECT gallery_id, COUNT(*) AS image_count
+            FROM gallery_images
+            GROUP BY gallery_id
+        ) counts ON counts.gallery_id = g.id
+        WHERE g.visible = 1
+        ORDER BY g.display_order, g.name
+    ''')
+    galleries = []
+    for row in cursor.fetchall():
+        gallery = dict(row)
+        gallery['hero_thumbnail_url'] = f"/thumbnail/{quote(gallery['hero_image'])}" if gallery['hero_image'] else None
+        galleries.append(gallery)
+    conn.close()
+    return galleries
+
 def get_gallery_by_slug(slug):
     """Get gallery by slug"""
     conn = sqlite3.connect(DB_PATH)
@@ -122,19 +172,29 @@ def add_image_to_gallery(gallery_id, image_filename, display_order=0):
         conn.close()
         return False
 
-def get_gallery_images(gallery_id):
-    """Get all images in a gallery"""
+def get_gallery_images(gallery_id, limit=None, offset=0):
+    """Get images in a gallery in display order (optionally one page of them)"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('''
         SELECT image_filename FROM gallery_images 
         WHERE gallery_id = ? 
         ORDER BY display_order, image_filename
-    ''', (gallery_id,))
+        LIMIT ? OFFSET ?
+    ''', (gallery_id, -1 if limit is None else limit, offset))
     images = [row[0] for row in cursor.fetchall()]
     conn.close()
     return images
 
+def count_gallery_images(gallery_id):
+    """Number of images in a gallery"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM gallery_images WHERE gallery_id = ?', (gallery_id,))
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
 def remove_image_from_gallery(gallery_id, image_filename):
     """Remove image from gallery"""
     conn = sqlite3.connect(DB_PATH)
@@ -144,6 +204,106 @@ def remove_image_from_gallery(gallery_id, image_filename):
     conn.commit()
     conn.close()
 
+def apply_gallery_membership_changes(changes):
+    """
+    Apply many membership edits in one transaction.
+    changes: list of dicts with 'gallery_id', 'image_filename', 'action'
+    ('add' or 'remove') and optional 'display_order'. Adding an image that is
+    already in the gallery updates its display_order.
+    Returns {'added': n, 'removed': n}.
+    """
+    adds = [(c['gallery_id'], c['image_filename'], c.get('display_order') or 0)
+            for c in changes if c.get('action', 'add') == 'add']
+    removes = [(c['gallery_id'], c['image_filename'])
+               for c in changes if c.get('action') == 'remove']
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany('DELETE FROM gallery_images WHERE gallery_id = ? AND image_filename = ?', removes)
+        cursor.executemany('''
+            INSERT INTO gallery_images (gallery_id, image_filename, display_order)
+            VALUES (?, ?, ?)
+            ON CONFLICT(gallery_id, image_filename) DO UPDATE SET display_order = excluded.display_order
+        ''', adds)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return {'added': len(adds), 'removed': len(removes)}
+
+def set_gallery_images(gallery_id, image_filenames):
+    """Make the gallery contain exactly these images, in this display order, in one transaction"""
+    ordered = list(dict.fromkeys(image_filenames))
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(f'''
+            DELETE FROM gallery_images
+            WHERE gallery_id = ? AND image_filename NOT IN ({','.join('?' * len(ordered))})
+        ''', [gallery_id] + ordered)
+        cursor.executemany('''
+            INSERT INTO gallery_images (gallery_id, image_filename, display_order)
+            VALUES (?, ?, ?)
+            ON CONFLICT(gallery_id, image_filename) DO UPDATE SET display_order = excluded.display_order
+        ''', [(gallery_id, filename, position) for position, filename in enumerate(ordered)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(ordered)
+
+def reorder_gallery_images(gallery_id, image_filenames):
+    """Rewrite display_order for a whole gallery; images not listed keep their order after the listed ones"""
+    ordered = list(dict.fromkeys(image_filenames))
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            UPDATE gallery_images SET display_order = display_order + ?
+            WHERE gallery_id = ?
+        ''', (len(ordered), gallery_id))
+        cursor.executemany('''
+            UPDATE gallery_images SET display_order = ?
+            WHERE gallery_id = ? AND image_filename = ?
+        ''', [(position, gallery_id, filename) for position, filename in enumerate(ordered)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(ordered)
+
+def set_image_galleries(image_filename, gallery_ids):
+    """Make an image a member of exactly these galleries, in one transaction"""
+    gallery_ids = list(dict.fromkeys(gallery_ids))
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(f'''
+            DELETE FROM gallery_images
+            WHERE image_filename = ? AND gallery_id NOT IN ({','.join('?' * len(gallery_ids))})
+        ''', [image_filename] + gallery_ids)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO gallery_images (gallery_id, image_filename, display_order)
+            VALUES (?, ?, 0)
+        ''', [(gallery_id, image_filename) for gallery_id in gallery_ids])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
 def update_gallery(gallery_id, **kwargs):
     """Update gallery fields"""
     conn = sqlite3.connect(DB_PATH)
@@ -188,5 +348,122 @@ def get_galleries_for_image(image_filename):
     conn.close()
     return galleries
 
+def get_portfolio_order(filenames=None):
+    """{filename: position} for every image with a saved portfolio position (or just `filenames`)"""
+    conn = sqlite3.connect(DB_PATH)
+    if filenames is None:
+        rows = conn.execute('SELECT image_filename, position FROM portfolio_order').fetchall()
+    else:
+        filenames = list(dict.fromkeys(filenames))
+        rows = []
+        for start in range(0, len(filenames), 500):
+            batch = filenames[start:start + 500]
+            rows.extend(conn.execute(f'''
+                SELECT image_filename, position FROM portfolio_order
+                WHERE image_filename IN ({', '.join('?' for _ in batch)})
+            ''', batch).fetchall())
+    conn.close()
+    return {filename: position for filename, position in rows}
+
+def _write_portfolio_order(cursor, ordered):
+    cursor.execute('DELETE FROM portfolio_order')
+    cursor.executemany('''
+        INSERT INTO portfolio_order (image_filename, position, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+    ''', [(filename, position) for position, filename in enumerate(ordered)])
+
+def set_portfolio_order(image_filenames):
+    """Replace the whole portfolio order (randomize) in one transaction"""
+    ordered = list(dict.fromkeys(image_filenames))
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        _write_portfolio_order(cursor, ordered)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(ordered)
+
+def reorder_portfolio(image_filenames):
+    """Put these images first, in this order; previously ordered images not listed keep their order after them"""
+    ordered = list(dict.fromkeys(image_filenames))
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        listed = set(ordered)
+        rest = [row[0] for row in cursor.execute('SELECT image_filename FROM portfolio_order ORDER BY position')
+                if row[0] not in listed]
+        _write_portfolio_order(cursor, ordered + rest)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(ordered) + len(rest)
+
+def reset_portfolio_order():
+    """Forget the portfolio order (back to filename order)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM portfolio_order')
+    count = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return count
+
+PORTFOLIO_ORDER_MIGRATION = 'portfolio_order_sidecars'
+
+def migrate_portfolio_order_sidecars(images_folder):
+    """
+    One-shot import of display_order from /data/<image>.json sidecars into
+    portfolio_order (images already in the table win). A row in migrations
+    marks it done, so later boots - and the other workers racing this one -
+    skip it. The sidecars are only read, never changed.
+    Returns the number of positions imported.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    cursor = conn.cursor()
+    try:
+        if cursor.execute('SELECT 1 FROM migrations WHERE name = ?', (PORTFOLIO_ORDER_MIGRATION,)).fetchone():
+            return 0
+
+        ordered = []
+        if os.path.isdir(images_folder):
+            for name in os.listdir(images_folder):
+                if not name.endswith('.json') or not name[:-5].lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+                    continue
+                try:
+                    with open(os.path.join(images_folder, name), 'r') as f:
+                        metadata = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if isinstance(metadata, dict) and isinstance(metadata.get('display_order'), int):
+                    ordered.append((metadata['display_order'], name[:-5]))
+        ordered.sort()
+
+        # Re-check under the write lock: another worker may have finished it meanwhile
+        cursor.execute('BEGIN IMMEDIATE')
+        if cursor.execute('SELECT 1 FROM migrations WHERE name = ?', (PORTFOLIO_ORDER_MIGRATION,)).fetchone():
+            conn.rollback()
+            return 0
+        cursor.executemany('''
+            INSERT OR IGNORE INTO portfolio_order (image_filename, position) VALUES (?, ?)
+        ''', [(filename, position) for position, filename in ordered])
+        cursor.execute('INSERT INTO migrations (name) VALUES (?)', (PORTFOLIO_ORDER_MIGRATION,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"Imported portfolio order for {len(ordered)} images from sidecars")
+    return len(ordered)
+
 # Initialize on import
 init_gallery_db()
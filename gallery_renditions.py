@@ -0,0 +1,238 @@
+"""
+Fifth Element Photography - Gallery Renditions
+Version: 1.1.0
+
+One place that turns an original in /data into its gallery renditions
+(max 1200px on the longest side, JPEG q90), used by upload, bulk upload,
+replace, "generate gallery images", the force regenerate tool, watermarking
+and the /data/gallery-images/<filename> route.
+
+The watermark is part of a rendition's cache key rather than an edit of
+the file: the clean rendition lives at gallery-images/<filename> and each
+watermark variant at gallery-images/watermarked/<key>/<filename>, where the
+key hashes position/size/color/opacity and the watermark files' versions.
+All the variants an image needs are produced from one decode and resize of
+the original, each with a single encode.
+
+Per-image watermark settings are stored in gallery_renditions.db and pick
+which variant is served, so toggling a watermark only switches the key
+(rendering the variant the first time it's needed).
+
+Usage:
+    from gallery_renditions import ensure_gallery_image, set_watermark_settings
+    set_watermark_settings(['heron.jpg'], {'position': 'bottom-right', 'size': 'medium', 'color': 'auto'})
+    ensure_gallery_image('heron.jpg')   # path of the rendition to serve
+"""
+
+import os
+import glob
+import hashlib
+import sqlite3
+from datetime import datetime
+from PIL import Image
+
+if os.path.exists('/data'):
+    IMAGES_FOLDER = '/data'
+    GALLERY_FOLDER = '/data/gallery-images'
+    DB_PATH = '/data/gallery_renditions.db'
+else:
+    IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), 'data')
+    GALLERY_FOLDER = os.path.join(os.path.dirname(__file__), 'data', 'gallery-images')
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'gallery_renditions.db')
+
+WATERMARKED_FOLDER = os.path.join(GALLERY_FOLDER, 'watermarked')
+
+GALLERY_MAX_DIMENSION = 1200
+GALLERY_QUALITY = 90
+
+WATERMARK_POSITIONS = ('bottom-right', 'bottom-left', 'top-right', 'top-left', 'center')
+WATERMARK_SIZES = ('small', 'medium', 'large')
+WATERMARK_COLORS = ('auto', 'white', 'black')
+
+_db_initialized = False
+
+
+def get_db():
+    """Connection to gallery_renditions.db (tables are created on first use)"""
+    global _db_initialized
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _db_initialized:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS watermark_settings (
+                filename TEXT PRIMARY KEY,
+                position TEXT NOT NULL DEFAULT 'bottom-right',
+                size TEXT NOT NULL DEFAULT 'medium',
+                color TEXT NOT NULL DEFAULT 'auto',
+                opacity REAL NOT NULL DEFAULT 1.0,
+                updated_at TEXT
+            )
+        ''')
+        conn.commit()
+        _db_initialized = True
+    return conn
+
+
+def normalize_watermark_settings(settings):
+    """Validated {'position', 'size', 'color', 'opacity'}; raises ValueError on unknown values"""
+    settings = settings or {}
+    position = settings.get('position') or 'bottom-right'
+    size = settings.get('size') or 'medium'
+    color = settings.get('color') or 'auto'
+    if position not in WATERMARK_POSITIONS:
+        raise ValueError(f'Unknown watermark position: {position}')
+    if size not in WATERMARK_SIZES:
+        raise ValueError(f'Unknown watermark size: {size}')
+    if color not in WATERMARK_COLORS:
+        raise ValueError(f'Unknown watermark color: {color}')
+    try:
+        opacity = float(settings.get('opacity', 1.0))
+    except (TypeError, ValueError):
+        raise ValueError('Watermark opacity must be a number')
+    return {'position': position, 'size': size, 'color': color, 'opacity': min(max(opacity, 0.0), 1.0)}
+
+
+def get_watermark_settings(filename):
+    """Saved watermark settings for an image, or None if it isn't watermarked"""
+    conn = get_db()
+    row = conn.execute('SELECT position, size, color, opacity FROM watermark_settings WHERE filename = ?',
+                       (filename,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def set_watermark_settings(filenames, settings):
+    """Save the same watermark settings for many images in one transaction"""
+    settings = normalize_watermark_settings(settings)
+    now = datetime.now().isoformat()
+    conn = get_db()
+    try:
+        conn.executemany('''
+            INSERT INTO watermark_settings (filename, position, size, color, opacity, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(filename) DO UPDATE SET
+                position = excluded.position, size = excluded.size, color = excluded.color,
+                opacity = excluded.opacity, updated_at = excluded.updated_at
+        ''', [(filename, settings['position'], settings['size'], settings['color'], settings['opacity'], now)
+              for filename in filenames])
+        conn.commit()
+    finally:
+        conn.close()
+    return settings
+
+
+def clear_watermark_settings(filenames):
+    """Stop watermarking these images"""
+    conn = get_db()
+    try:
+        conn.executemany('DELETE FROM watermark_settings WHERE filename = ?', [(filename,) for filename in filenames])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def gallery_size(width, height, max_dimension=GALLERY_MAX_DIMENSION):
+    """Rendition size: longest side scaled to max_dimension"""
+    if width > height:
+        return max_dimension, int((max_dimension / width) * height)
+    return int((max_dimension / height) * width), max_dimension
+
+
+def watermark_key(watermark):
+    """Cache key of a watermark variant (changes with the settings or either watermark file)"""
+    from watermark_helper import get_watermark_path
+    versions = []
+    for color in ('white', 'black'):
+        path = get_watermark_path(color)
+        versions.append(str(os.stat(path).st_mtime_ns) if path else '-')
+    raw = '|'.join([watermark['position'], watermark['size'], watermark['color'],
+                    f"{float(watermark['opacity']):.3f}"] + versions)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def rendition_path(filename, watermark=None):
+    """Where the clean (watermark=None) or watermarked rendition of an image is cached"""
+    if not watermark:
+        return os.path.join(GALLERY_FOLDER, filename)
+    return os.path.join(WATERMARKED_FOLDER, watermark_key(watermark), filename)
+
+
+def _save_rendition(image, output_path):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f'{output_path}.tmp'
+    image.save(temp_path, 'JPEG', quality=GALLERY_QUALITY, optimize=True)
+    os.replace(temp_path, output_path)
+
+
+def render_renditions(filename, watermarks, images_folder=IMAGES_FOLDER):
+    """
+    Render the given variants (None = clean, else watermark settings) of an
+    image from one decode and resize of its original. Returns their paths.
+    """
+    from watermark_helper import watermark_image
+
+    original_path = os.path.join(images_folder, filename)
+    if not os.path.exists(original_path):
+        raise FileNotFoundError(f'Original image not found at {original_path}')
+
+    with Image.open(original_path) as img:
+        new_width, new_height = gallery_size(*img.size)
+        # Let JPEG decoding skip straight to the smallest DCT scale still >= the target size
+        img.draft('RGB', (new_width, new_height))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    paths = []
+    for watermark in watermarks:
+        if watermark:
+            rendition = watermark_image(resized.copy(), position=watermark['position'], size=watermark['size'],
+                                        color_mode=watermark['color'], opacity=watermark['opacity'])
+        else:
+            rendition = resized
+        path = rendition_path(filename, watermark)
+        _save_rendition(rendition, path)
+        paths.append(path)
+    return paths
+
+
+def purge_renditions(filename, keep=()):
+    """Delete cached watermark variants of an image except the paths in `keep`"""
+    for path in glob.glob(os.path.join(glob.escape(WATERMARKED_FOLDER), '*', glob.escape(filename))):
+        if path not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def ensure_gallery_image(filename, images_folder=IMAGES_FOLDER):
+    """
+    Path of the rendition to serve for an image (watermarked per its saved
+    settings, else clean), rendering it - and the clean one, if that's also
+    missing - only when it isn't cached yet.
+    """
+    watermark = get_watermark_settings(filename)
+    path = rendition_path(filename, watermark)
+    if not os.path.exists(path):
+        clean_path = rendition_path(filename)
+        missing = [watermark]
+        if watermark and not os.path.exists(clean_path):
+            missing.insert(0, None)
+        render_renditions(filename, missing, images_folder=images_folder)
+        # Variants for older settings are no longer reachable
+        purge_renditions(filename, keep=(path,))
+    return path
+
+
+def regenerate_gallery_image(filename, images_folder=IMAGES_FOLDER):
+    """
+    Rebuild an image's renditions from its original (after it was replaced):
+    drops every cached variant and renders the clean one plus its current
+    watermark variant. Returns the path to serve.
+    """
+    purge_renditions(filename)
+    watermark = get_watermark_settings(filename)
+    paths = render_renditions(filename, [None, watermark] if watermark else [None], images_folder=images_folder)
+    return paths[-1]
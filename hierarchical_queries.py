@@ -0,0 +1,80 @@
+"""
+SQL for the hierarchical ordering API (lumaprints_pricing.db)
+
+The /api/hierarchical/* routes in app.py run these statements, and
+test_query_plans.py checks the same ones with EXPLAIN QUERY PLAN, so a
+query can't change without its index check seeing the change.
+"""
+
+PRODUCT_TYPES_SQL = """
+SELECT id, name, display_order, has_sub_options, max_sub_option_levels, active
+FROM product_types
+WHERE active = 1
+ORDER BY display_order
+"""
+
+# Sub-options that actually have products (options with none are hidden)
+SUB_OPTIONS_SQL = """
+SELECT DISTINCT so.id, so.option_type, so.name, so.value, so.image_path, so.display_order
+FROM sub_options so
+WHERE so.product_type_id = ? AND so.level = ? AND so.active = 1
+  AND EXISTS (
+    SELECT 1 FROM products p
+    WHERE p.product_type_id = so.product_type_id
+      AND p.active = 1
+      AND (p.sub_option_1_id = so.id OR p.sub_option_2_id = so.id)
+  )
+ORDER BY so.display_order
+"""
+
+MARKUP_PERCENTAGE_SQL = "SELECT value FROM settings WHERE key_name = 'global_markup_percentage'"
+
+# Options come back as canonical JSON from SQLite ('[]' when the stored value is malformed)
+AVAILABLE_SIZES_SQL = """
+SELECT p.id, p.name, p.size, p.cost_price, c.name as category_name,
+       p.lumaprints_subcategory_id, p.lumaprints_frame_option,
+       CASE WHEN json_valid(p.lumaprints_options) THEN json(p.lumaprints_options) ELSE '[]' END
+           AS lumaprints_options_json
+FROM products p
+JOIN categories c ON p.category_id = c.id
+WHERE p.active = 1 AND p.product_type_id = ?
+"""
+
+PRODUCT_DETAILS_SQL = """
+SELECT p.*, c.name as category_name, pt.name as product_type_name,
+       so1.value as sub_option_1_value, so2.value as sub_option_2_value
+FROM products p
+JOIN categories c ON p.category_id = c.id
+LEFT JOIN product_types pt ON p.product_type_id = pt.id
+LEFT JOIN sub_options so1 ON p.sub_option_1_id = so1.id
+LEFT JOIN sub_options so2 ON p.sub_option_2_id = so2.id
+WHERE p.id = ? AND p.active = 1
+"""
+
+
+def build_available_sizes_query(product_type_id, lumaprints_subcategory_id=None, sub_option_1_id=None,
+                                lumaprints_option_id=None, sub_option_2_id=None):
+    """(sql, params) for the available-sizes filter; Lumaprints codes win over internal sub-option IDs"""
+    query = AVAILABLE_SIZES_SQL
+    params = [product_type_id]
+
+    if lumaprints_subcategory_id:
+        query += " AND p.lumaprints_subcategory_id = ?"
+        params.append(lumaprints_subcategory_id)
+    elif sub_option_1_id:
+        query += " AND p.sub_option_1_id = ?"
+        params.append(sub_option_1_id)
+
+    if lumaprints_option_id:
+        # Exact option match through the indexed product_option_links table
+        query += """ AND (p.lumaprints_frame_option = ?
+                          OR EXISTS (SELECT 1 FROM product_option_links l
+                                     WHERE l.product_id = p.id AND l.option_id = ?))"""
+        params.append(lumaprints_option_id)
+        params.append(lumaprints_option_id)
+    elif sub_option_2_id:
+        query += " AND p.sub_option_2_id = ?"
+        params.append(sub_option_2_id)
+
+    query += " ORDER BY p.name, p.size"
+    return query, params
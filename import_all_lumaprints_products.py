@@ -8,6 +8,8 @@ import sqlite3
 import json
 import os
 from datetime import datetime
+from product_option_links import install_product_option_links
+from response_cache import invalidate, CATALOG
 
 # Database path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'lumaprints_pricing.db')
@@ -588,6 +590,12 @@ def main():
     import_metal_prints()
     import_peel_stick()
     
+    # Rebuild the normalized option links used by /api/hierarchical/available-sizes
+    conn = sqlite3.connect(DB_PATH)
+    print(f"✅ Linked {install_product_option_links(conn)} product options")
+    conn.close()
+    invalidate(CATALOG)
+    
     # Print summary
     print_summary()
     
@@ -0,0 +1,406 @@
+"""
+Fifth Element Photography - Background Job Runner
+SQLite-backed job queue for long Shopify operations
+Version: 1.0.0
+
+A job type is registered with three callables:
+    plan(params)                  -> list of (item_key, payload) to process
+    setup(params)                 -> context shared by all items in one run (optional)
+    process(params, context, item_key, payload) -> result dict for one item
+
+Every item is checkpointed in job_items as it finishes, so a job that was
+interrupted (worker restart, deploy) resumes with only its pending items.
+A job type registered with concurrency > 1 processes that many items at a
+time on a thread pool (checkpoints are still written by the runner thread).
+Each gunicorn worker runs one runner thread; jobs are claimed with a
+conditional UPDATE so only one worker processes a job at a time.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+if os.path.exists('/data'):
+    DB_PATH = '/data/jobs.db'
+else:
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'jobs.db')
+
+POLL_INTERVAL = 2          # seconds between queue checks when idle
+HEARTBEAT_INTERVAL = 15    # seconds between heartbeats for running jobs
+STALE_AFTER = 90           # a running job with no heartbeat for this long is resumable
+
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+_job_types = {}
+_runner_thread = None
+_runner_lock = threading.Lock()
+_current_job = {'id': None}
+_db_initialized = False
+
+
+def get_jobs_db():
+    """Get jobs database connection (tables are created on first use)"""
+    if not _db_initialized:
+        init_jobs_db()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_jobs_db():
+    """Create job tables if they don't exist"""
+    global _db_initialized
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            job_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            params_json TEXT NOT NULL DEFAULT '{}',
+            total_items INTEGER DEFAULT 0,
+            completed_items INTEGER DEFAULT 0,
+            failed_items INTEGER DEFAULT 0,
+            planned INTEGER DEFAULT 0,
+            cancel_requested INTEGER DEFAULT 0,
+            error TEXT,
+            worker_id TEXT,
+            heartbeat_at REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_items (
+            job_id TEXT NOT NULL,
+            item_key TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            payload_json TEXT,
+            result_json TEXT,
+            error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (job_id, item_key),
+            FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+        )
+    ''')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_items_pending ON job_items(job_id, status, position)')
+
+    conn.commit()
+    conn.close()
+    _db_initialized = True
+
+
+def register_job_type(job_type, plan, process, setup=None, concurrency=1):
+    """Register a job type; called by the blueprint that owns the operation"""
+    _job_types[job_type] = {'plan': plan, 'process': process, 'setup': setup,
+                            'concurrency': max(1, int(concurrency))}
+
+
+def submit_job(job_type, params=None):
+    """Queue a job and make sure this process has a runner. Returns the job ID."""
+    if job_type not in _job_types:
+        raise ValueError(f'Unknown job type: {job_type}')
+
+    job_id = uuid.uuid4().hex
+    conn = get_jobs_db()
+    conn.execute('''
+        INSERT INTO jobs (id, job_type, params_json) VALUES (?, ?, ?)
+    ''', (job_id, job_type, json.dumps(params or {})))
+    conn.commit()
+    conn.close()
+
+    start_job_runner()
+    print(f"[JOBS] Queued {job_type} job {job_id}")
+    return job_id
+
+
+def _job_to_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job.pop('params_json') or '{}')
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    job['planned'] = bool(job['planned'])
+    total = job['total_items'] or 0
+    done = (job['completed_items'] or 0) + (job['failed_items'] or 0)
+    job['progress'] = round(done * 100.0 / total, 1) if total else (100.0 if job['status'] == 'completed' else 0.0)
+    return job
+
+
+def get_job(job_id, include_items=False, item_limit=200):
+    """Return a job with progress counters (and optionally its item checkpoints)"""
+    conn = get_jobs_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+    row = cursor.fetchone()
+    if not row:
+        conn.close()
+        return None
+
+    job = _job_to_dict(row)
+    if include_items:
+        cursor.execute('''
+            SELECT item_key, status, result_json, error, updated_at FROM job_items
+            WHERE job_id = ? ORDER BY position LIMIT ?
+        ''', (job_id, item_limit))
+        job['items'] = [{
+            'item_key': item['item_key'],
+            'status': item['status'],
+            'result': json.loads(item['result_json']) if item['result_json'] else None,
+            'error': item['error'],
+            'updated_at': item['updated_at']
+        } for item in cursor.fetchall()]
+    conn.close()
+    return job
+
+
+def list_jobs(job_type=None, limit=50):
+    """Most recent jobs first"""
+    conn = get_jobs_db()
+    cursor = conn.cursor()
+    if job_type:
+        cursor.execute('SELECT * FROM jobs WHERE job_type = ? ORDER BY created_at DESC LIMIT ?', (job_type, limit))
+    else:
+        cursor.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,))
+    jobs = [_job_to_dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return jobs
+
+
+def cancel_job(job_id):
+    """Request cancellation; a queued job is cancelled immediately, a running one after its current item"""
+    conn = get_jobs_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND status = 'queued'
+    ''', (job_id,))
+    if cursor.rowcount == 0:
+        cursor.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+    changed = cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+    return changed
+
+
+def resume_job(job_id, retry_failed=True):
+    """Re-queue a cancelled, failed or partly failed job; completed items are not repeated"""
+    conn = get_jobs_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE jobs SET status = 'queued', cancel_requested = 0, error = NULL, finished_at = NULL
+        WHERE id = ? AND status IN ('cancelled', 'failed', 'completed')
+    ''', (job_id,))
+    changed = cursor.rowcount > 0
+    if changed and retry_failed:
+        cursor.execute("UPDATE job_items SET status = 'pending', error = NULL WHERE job_id = ? AND status = 'failed'", (job_id,))
+        cursor.execute('UPDATE jobs SET failed_items = 0 WHERE id = ?', (job_id,))
+    conn.commit()
+    conn.close()
+    if changed:
+        start_job_runner()
+    return changed
+
+
+def _claim_next_job():
+    """
+    Atomically take the oldest queued job, or a running job whose worker
+    stopped heartbeating (crash/restart). Returns the job row or None.
+    Only job types registered in this process are claimed; the others stay
+    queued until a process that knows them picks them up.
+    """
+    job_types = list(_job_types)
+    if not job_types:
+        return None
+    conn = get_jobs_db()
+    cursor = conn.cursor()
+    stale_before = time.time() - STALE_AFTER
+    cursor.execute(f'''
+        SELECT id FROM jobs
+        WHERE (status = 'queued'
+               OR (status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)))
+          AND job_type IN ({', '.join('?' for _ in job_types)})
+        ORDER BY created_at LIMIT 5
+    ''', [stale_before] + job_types)
+    candidates = [row['id'] for row in cursor.fetchall()]
+
+    for job_id in candidates:
+        cursor.execute('''
+            UPDATE jobs
+            SET status = 'running', worker_id = ?, heartbeat_at = ?,
+                started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+            WHERE id = ?
+              AND (status = 'queued'
+                   OR (status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)))
+        ''', (WORKER_ID, time.time(), job_id, stale_before))
+        conn.commit()
+        if cursor.rowcount == 1:
+            cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            conn.close()
+            return row
+
+    conn.close()
+    return None
+
+
+def _plan_job(conn, job, params, handler):
+    """Expand a job into checkpointed items (only once per job)"""
+    items = handler['plan'](params) or []
+    conn.executemany('''
+        INSERT OR IGNORE INTO job_items (job_id, item_key, position, payload_json)
+        VALUES (?, ?, ?, ?)
+    ''', [(job['id'], str(key), position, json.dumps(payload)) for position, (key, payload) in enumerate(items)])
+    conn.execute('UPDATE jobs SET planned = 1, total_items = ? WHERE id = ?', (len(items), job['id']))
+    conn.commit()
+
+
+def _run_job(job):
+    """Process every pending item of a claimed job, checkpointing as it goes"""
+    job_id = job['id']
+    handler = _job_types.get(job['job_type'])
+    conn = get_jobs_db()
+
+    if handler is None:
+        # Not known here (yet): hand it back rather than failing a resumable job
+        conn.execute("UPDATE jobs SET status = 'queued', worker_id = NULL, heartbeat_at = NULL WHERE id = ?",
+                     (job_id,))
+        conn.commit()
+        conn.close()
+        return
+
+    params = json.loads(job['params_json'] or '{}')
+    print(f"[JOBS] {WORKER_ID} running {job['job_type']} job {job_id}")
+    executor = None
+
+    try:
+        if not job['planned']:
+            _plan_job(conn, job, params, handler)
+        else:
+            # Resumed or reclaimed: counters come from the checkpoints, not from the interrupted run
+            conn.execute('''
+                UPDATE jobs SET
+                    completed_items = (SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = 'done'),
+                    failed_items = (SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = 'failed')
+                WHERE id = ?
+            ''', (job_id, job_id, job_id))
+            conn.commit()
+
+        context = handler['setup'](params) if handler['setup'] else None
+        concurrency = handler.get('concurrency', 1)
+        executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+
+        def process_item(item):
+            try:
+                payload = json.loads(item['payload_json']) if item['payload_json'] else None
+                return item, handler['process'](params, context, item['item_key'], payload), None
+            except Exception as e:
+                return item, None, e
+
+        while True:
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return
+            if row['cancel_requested']:
+                conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
+                conn.commit()
+                print(f"[JOBS] Cancelled job {job_id}")
+                return
+
+            items = conn.execute('''
+                SELECT item_key, payload_json FROM job_items
+                WHERE job_id = ? AND status = 'pending'
+                ORDER BY position LIMIT ?
+            ''', (job_id, concurrency)).fetchall()
+            if not items:
+                break
+
+            outcomes = executor.map(process_item, items) if executor else [process_item(items[0])]
+            for item, result, error in outcomes:
+                if error is None:
+                    conn.execute('''
+                        UPDATE job_items SET status = 'done', result_json = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE job_id = ? AND item_key = ?
+                    ''', (json.dumps(result) if result is not None else None, job_id, item['item_key']))
+                    conn.execute('UPDATE jobs SET completed_items = completed_items + 1, heartbeat_at = ? WHERE id = ?',
+                                 (time.time(), job_id))
+                else:
+                    print(f"[JOBS] Item {item['item_key']} of job {job_id} failed: {error}")
+                    conn.execute('''
+                        UPDATE job_items SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+                        WHERE job_id = ? AND item_key = ?
+                    ''', (str(error), job_id, item['item_key']))
+                    conn.execute('UPDATE jobs SET failed_items = failed_items + 1, heartbeat_at = ? WHERE id = ?',
+                                 (time.time(), job_id))
+            conn.commit()
+
+        conn.execute("UPDATE jobs SET status = 'completed', finished_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
+        conn.commit()
+        print(f"[JOBS] Completed job {job_id}")
+    except Exception as e:
+        traceback.print_exc()
+        conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                     (str(e), job_id))
+        conn.commit()
+    finally:
+        if executor:
+            executor.shutdown(wait=False)
+        conn.close()
+
+
+def _heartbeat_loop():
+    """Keep the current job's heartbeat fresh even while one item takes a while"""
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        job_id = _current_job['id']
+        if job_id:
+            try:
+                conn = get_jobs_db()
+                conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                             (time.time(), job_id, WORKER_ID))
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"[JOBS] Heartbeat error: {e}")
+
+
+def _runner_loop():
+    while True:
+        try:
+            job = _claim_next_job()
+        except Exception as e:
+            print(f"[JOBS] Error claiming job: {e}")
+            job = None
+
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        _current_job['id'] = job['id']
+        try:
+            _run_job(job)
+        finally:
+            _current_job['id'] = None
+
+
+def start_job_runner():
+    """Start this process's runner (idempotent). Interrupted jobs are picked up once stale."""
+    global _runner_thread
+    with _runner_lock:
+        if _runner_thread is not None and _runner_thread.is_alive():
+            return
+        _runner_thread = threading.Thread(target=_runner_loop, name='job-runner', daemon=True)
+        _runner_thread.start()
+        threading.Thread(target=_heartbeat_loop, name='job-heartbeat', daemon=True).start()
+        print(f"[JOBS] Runner started on {WORKER_ID}")
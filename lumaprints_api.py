@@ -1,17 +1,44 @@
 """
 Lumaprints API Integration for Fifth Element Photography
 Core functions for connecting to Lumaprints API and handling print orders
+
+Each client keeps one requests.Session with a connection pool, so calls
+reuse TCP/TLS connections (get_lumaprints_client returns the same client
+per environment). Idempotent requests (GETs, pricing, image checks) are
+retried with exponential backoff on connection errors and 429/5xx;
+order submission is only retried on 429, so an order is never sent twice.
 """
 
 import requests
 import base64
 import json
 import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter
+
+# Connections kept open per host (also the useful upper bound for bulk pricing workers)
+POOL_SIZE = 16
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5       # seconds; doubles per attempt (0.5, 1, 2)
+MAX_BACKOFF = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BULK_PRICING_WORKERS = 8
+# File bytes base64-encoded per chunk of a streamed library upload (multiple of 3, so chunks concatenate)
+UPLOAD_CHUNK_SIZE = 3 * 256 * 1024
+
+if os.path.exists('/data'):
+    PRICING_DB_PATH = '/data/print_ordering.db'
+else:
+    PRICING_DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering.db')
 
 class LumaprintsAPI:
-    def __init__(self, api_key: str, api_secret: str, sandbox: bool = True):
+    def __init__(self, api_key: str, api_secret: str, sandbox: bool = True, base_url: Optional[str] = None,
+                 max_retries: int = MAX_RETRIES, backoff_factor: float = BACKOFF_FACTOR):
         """
         Initialize Lumaprints API client
         
@@ -19,6 +46,9 @@ class LumaprintsAPI:
             api_key: Your Lumaprints API key
             api_secret: Your Lumaprints API secret
             sandbox: Use sandbox environment (True) or production (False)
+            base_url: Override the API URL (e.g. a local stub in tests)
+            max_retries: Retries for idempotent requests on connection errors and 429/5xx
+            backoff_factor: First retry delay in seconds (doubles per attempt)
         """
         self.api_key = api_key
         self.api_secret = api_secret
@@ -29,6 +59,10 @@ class LumaprintsAPI:
             self.base_url = "https://us.api-sandbox.lumaprints.com/api/v1"
         else:
             self.base_url = "https://us.api.lumaprints.com/api/v1"
+        if base_url:
+            self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
         
         # Create authentication header
         credentials = f"{api_key}:{api_secret}"
@@ -38,11 +72,27 @@ class LumaprintsAPI:
             "Content-Type": "application/json"
         }
         
+        # Pooled session shared by every call (and every thread) of this client
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
         # Store credentials for reference
         self.api_key_preview = f"{api_key[:20]}..."
         self.api_secret_preview = f"{api_secret[:20]}..."
     
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, timeout: int = 30) -> Dict:
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Backoff before retry `attempt` (0-based), honoring a numeric Retry-After header"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF)
+        return min(self.backoff_factor * (2 ** attempt), MAX_BACKOFF)
+    
+    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, timeout: int = 30,
+                      idempotent: Optional[bool] = None, body: Optional[Any] = None) -> Dict:
         """
         Make authenticated request to Lumaprints API
         
@@ -51,20 +101,49 @@ class LumaprintsAPI:
             endpoint: API endpoint (without base URL)
             data: Request payload for POST requests
             timeout: Request timeout in seconds (default 30)
+            idempotent: Safe to repeat on connection errors/5xx (default: GET only);
+                        non-idempotent requests are only retried on 429
+            body: Callable returning a fresh iterable of bytes, streamed as the JSON
+                  request body instead of `data` (called once per attempt)
             
         Returns:
             API response as dictionary
         """
         url = f"{self.base_url}{endpoint}"
+        method = method.upper()
+        if method not in ("GET", "POST", "DELETE"):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+        if idempotent is None:
+            idempotent = method == "GET"
         
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=self.headers, timeout=timeout)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=self.headers, json=data, timeout=timeout)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+        attempt = 0
+        while True:
+            try:
+                if body is not None:
+                    response = self.session.request(method, url, data=body(), timeout=timeout)
+                else:
+                    response = self.session.request(method, url, json=data if method == "POST" else None,
+                                                    timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if idempotent and attempt < self.max_retries:
+                    delay = self._retry_delay(attempt)
+                    print(f"API request {method} {endpoint} failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                print(f"API request failed: {e}")
+                raise
             
+            retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+            if retryable and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                print(f"API request {method} {endpoint} returned {response.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            break
+        
+        try:
             # For check_image endpoint, return response even on 400/406 errors
             # These contain valuable error details from Lumaprints
             if response.status_code in [200, 400, 406]:
@@ -85,7 +164,7 @@ class LumaprintsAPI:
             response.raise_for_status()
             
             # Return JSON response for successful requests
-            return response.json()
+            return response.json() if response.content else {}
             
         except requests.exceptions.RequestException as e:
             print(f"API request failed: {e}")
@@ -160,31 +239,7 @@ class LumaprintsAPI:
         }
         
         # Use longer timeout for image checking (can take time to download and validate)
-        return self._make_request("POST", "/images/checkImageConfig", data, timeout=60)
-    
-    def submit_order(self, order_data: Dict) -> Dict:
-        """
-        Submit an order to Lumaprints
-        
-        Args:
-            order_data: Complete order payload dictionary
-            
-        Returns:
-            Order submission result dictionary
-        """
-        return self._make_request("POST", "/orders", order_data)
-    
-    def get_order(self, order_id: str) -> Dict:
-        """
-        Get order details by order ID
-        
-        Args:
-            order_id: Lumaprints order ID
-            
-        Returns:
-            Order details dictionary
-        """
-        return self._make_request("GET", f"/orders/{order_id}")
+        return self._make_request("POST", "/images/checkImageConfig", data, timeout=60, idempotent=True)
     
     def get_pricing(self, subcategory_id: int, width: float, height: float, 
                    quantity: int = 1, options: Optional[List[int]] = None) -> Dict:
@@ -211,7 +266,51 @@ class LumaprintsAPI:
         if options:
             data["options"] = options
             
-        return self._make_request("POST", "/pricing", data)
+        return self._make_request("POST", "/pricing", data, idempotent=True)
+    
+    def get_pricing_bulk(self, quotes: List[Dict], max_workers: int = BULK_PRICING_WORKERS) -> List[Dict]:
+        """
+        Fetch many pricing quotes in parallel over the pooled session
+        
+        Args:
+            quotes: Dicts with subcategory_id, width, height and optional options/quantity
+                    (identical quotes are only requested once)
+            max_workers: Concurrent requests (capped at the pool size)
+            
+        Returns:
+            One dict per distinct quote, in input order: the quote fields plus
+            'price' and 'response', or 'error' if that quote failed
+        """
+        distinct = {}
+        for quote in quotes:
+            normalized = {
+                'subcategory_id': int(quote['subcategory_id']),
+                'width': quote['width'],
+                'height': quote['height'],
+                'quantity': int(quote.get('quantity') or 1),
+                'options': sorted(int(option) for option in quote.get('options') or [])
+            }
+            key = (normalized['subcategory_id'], float(normalized['width']), float(normalized['height']),
+                   normalized['quantity'], tuple(normalized['options']))
+            distinct.setdefault(key, normalized)
+        
+        def fetch(quote):
+            result = dict(quote)
+            try:
+                response = self.get_pricing(quote['subcategory_id'], quote['width'], quote['height'],
+                                            quote['quantity'], quote['options'] or None)
+                if isinstance(response, dict) and response.get('_status_code', 200) != 200:
+                    result['error'] = response.get('message') or f"HTTP {response['_status_code']}"
+                else:
+                    result['price'] = response.get('price', 0.0) if isinstance(response, dict) else None
+                    result['response'] = response
+            except Exception as e:
+                result['error'] = str(e)
+            return result
+        
+        workers = max(1, min(max_workers, POOL_SIZE, len(distinct)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(fetch, distinct.values()))
     
     def submit_order(self, order_data: Dict) -> Dict:
         """
@@ -248,6 +347,73 @@ class LumaprintsAPI:
             List of shipment dictionaries
         """
         return self._make_request("GET", f"/orders/{order_number}/shipments")
+    
+    def upload_to_library(self, upload_data: Dict) -> Dict:
+        """
+        Upload an image to Lumaprints library
+        
+        Args:
+            upload_data: Dictionary containing:
+                - fileName: Name of the file
+                - fileData: Base64 encoded image data
+                - description: Optional description
+                - tags: Optional list of tags
+                
+        Returns:
+            Upload result dictionary with libraryId if successful
+        """
+        return self._make_request("POST", "/library/upload", upload_data)
+    
+    def upload_file_to_library(self, path: str, filename: str, description: str = '',
+                               tags: Optional[List[str]] = None, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict:
+        """
+        Upload a file to the Lumaprints library without loading it into memory:
+        the upload_to_library JSON payload is streamed, base64-encoding the
+        file chunk by chunk as it is sent
+        
+        Args:
+            path: Path of the image file
+            filename: fileName sent to Lumaprints
+            description: Optional description
+            tags: Optional list of tags
+            chunk_size: Bytes read per chunk (rounded down to a multiple of 3)
+            
+        Returns:
+            Upload result dictionary with libraryId if successful
+        """
+        chunk_size = max(3, chunk_size - chunk_size % 3)
+        head = json.dumps({"fileName": filename, "description": description, "tags": tags or []})
+        head = (head[:-1] + ', "fileData": "').encode('utf-8')
+        
+        def body():
+            yield head
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    yield base64.b64encode(chunk)
+            yield b'"}'
+        
+        return self._make_request("POST", "/library/upload", timeout=300, body=body)
+    
+    def get_library_images(self) -> List[Dict]:
+        """
+        Get all images from Lumaprints library
+        
+        Returns:
+            List of library image dictionaries
+        """
+        return self._make_request("GET", "/library/images")
+    
+    def delete_from_library(self, library_id: str) -> Dict:
+        """
+        Delete an image from Lumaprints library
+        
+        Args:
+            library_id: ID of the library image to delete
+            
+        Returns:
+            Deletion result dictionary
+        """
+        return self._make_request("DELETE", f"/library/images/{library_id}")
 
 
 class LumaprintsPricingCalculator:
@@ -288,19 +454,9 @@ class LumaprintsPricingCalculator:
             # Extract wholesale price (this may vary based on API response structure)
             wholesale_price = pricing_response.get('price', 0.0)
             
-            # Calculate markup and retail price
-            markup_amount = wholesale_price * (self.markup_percentage / 100.0)
-            retail_price = wholesale_price + markup_amount
-            
-            return {
-                'wholesale_price': wholesale_price,
-                'markup_percentage': self.markup_percentage,
-                'markup_amount': markup_amount,
-                'retail_price': retail_price,
-                'quantity': quantity,
-                'price_per_item': retail_price / quantity if quantity > 0 else 0,
-                'raw_response': pricing_response
-            }
+            result = self._retail_price(wholesale_price, quantity)
+            result['raw_response'] = pricing_response
+            return result
             
         except Exception as e:
             print(f"Error calculating retail price: {e}")
@@ -309,12 +465,122 @@ class LumaprintsPricingCalculator:
                 'wholesale_price': 0.0,
                 'retail_price': 0.0
             }
+    
+    def _retail_price(self, wholesale_price: float, quantity: int) -> Dict:
+        """Markup and retail price for a wholesale price"""
+        markup_amount = wholesale_price * (self.markup_percentage / 100.0)
+        retail_price = wholesale_price + markup_amount
+        return {
+            'wholesale_price': wholesale_price,
+            'markup_percentage': self.markup_percentage,
+            'markup_amount': markup_amount,
+            'retail_price': retail_price,
+            'quantity': quantity,
+            'price_per_item': retail_price / quantity if quantity > 0 else 0
+        }
+    
+    def calculate_retail_prices(self, quotes: List[Dict], max_workers: int = BULK_PRICING_WORKERS) -> List[Dict]:
+        """
+        Retail prices for many configurations, fetched in parallel (see LumaprintsAPI.get_pricing_bulk)
+        
+        Returns:
+            One dict per distinct quote: the quote fields plus the calculate_retail_price fields
+        """
+        results = []
+        for quote in self.api.get_pricing_bulk(quotes, max_workers=max_workers):
+            if 'error' in quote:
+                results.append(dict(quote, wholesale_price=0.0, retail_price=0.0))
+            else:
+                results.append(dict(quote, **self._retail_price(quote['price'] or 0.0, quote['quantity'])))
+        return results
+    
+    def refresh_pricing_db(self, quotes: List[Dict], db_path: str = PRICING_DB_PATH,
+                           max_workers: int = BULK_PRICING_WORKERS) -> Dict:
+        """
+        Fetch wholesale prices for many configurations in parallel and store them in the pricing DB
+        
+        Returns:
+            Counts: requested, fetched, failed, stored, base_prices_updated (plus failed quotes in 'errors')
+        """
+        results = self.api.get_pricing_bulk(quotes, max_workers=max_workers)
+        summary = store_pricing_quotes(results, db_path)
+        summary['errors'] = [quote for quote in results if 'error' in quote]
+        return summary
+
 
+def store_pricing_quotes(results: List[Dict], db_path: str = PRICING_DB_PATH) -> Dict:
+    """
+    Write get_pricing_bulk() results to the pricing DB in one transaction:
+    every successful quote into lumaprints_price_quotes, and single-print
+    quotes without options into base_pricing for sizes listed in print_sizes
+    (existing rows keep their is_available flag).
+    """
+    fetched = [quote for quote in results if 'error' not in quote and quote.get('price') is not None]
+    now = datetime.now().isoformat()
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    base_updated = 0
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lumaprints_price_quotes (
+                subcategory_id INTEGER NOT NULL,
+                width REAL NOT NULL,
+                height REAL NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 1,
+                options TEXT NOT NULL DEFAULT '',
+                wholesale_price REAL NOT NULL,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (subcategory_id, width, height, quantity, options)
+            )
+        ''')
+        cursor.executemany('''
+            INSERT INTO lumaprints_price_quotes
+                (subcategory_id, width, height, quantity, options, wholesale_price, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(subcategory_id, width, height, quantity, options) DO UPDATE SET
+                wholesale_price = excluded.wholesale_price, fetched_at = excluded.fetched_at
+        ''', [(quote['subcategory_id'], float(quote['width']), float(quote['height']), quote['quantity'],
+               ','.join(str(option) for option in quote['options']), float(quote['price']), now)
+              for quote in fetched])
+        
+        has_base_pricing = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name IN ('base_pricing', 'print_sizes')"
+        ).fetchall()
+        if len(has_base_pricing) == 2:
+            for quote in fetched:
+                if quote['options'] or quote['quantity'] != 1:
+                    continue
+                cursor.execute('''
+                    INSERT INTO base_pricing (subcategory_id, size_id, cost_price, is_available, updated_at)
+                    SELECT ?, size_id, ?, 1, CURRENT_TIMESTAMP FROM print_sizes WHERE width = ? AND height = ?
+                    ON CONFLICT(subcategory_id, size_id) DO UPDATE SET
+                        cost_price = excluded.cost_price, updated_at = CURRENT_TIMESTAMP
+                ''', (quote['subcategory_id'], round(float(quote['price']), 2), quote['width'], quote['height']))
+                base_updated += cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    return {
+        'requested': len(results),
+        'fetched': len(fetched),
+        'failed': len(results) - len(fetched),
+        'stored': len(fetched),
+        'base_prices_updated': base_updated
+    }
+
+
+# One client (and so one connection pool) per environment and credentials
+_clients = {}
+_clients_lock = threading.Lock()
 
 # Initialize API client with your credentials
 def get_lumaprints_client(sandbox: bool = True) -> LumaprintsAPI:
     """
-    Get configured Lumaprints API client
+    Get configured Lumaprints API client (shared, so its session's connections are reused)
     
     Args:
         sandbox: Use sandbox environment
@@ -323,11 +589,14 @@ def get_lumaprints_client(sandbox: bool = True) -> LumaprintsAPI:
         Configured API client
     """
     # Load credentials from environment or use defaults
-    import os
     API_KEY = os.getenv('LUMAPRINTS_API_KEY', 'e909ca3adc5026beb5dc306020ffe3068cf0e5962d31303137373136')
     API_SECRET = os.getenv('LUMAPRINTS_API_SECRET', '23ab680f283aeabd077e2d31303137373136')
     
-    return LumaprintsAPI(API_KEY, API_SECRET, sandbox=sandbox)
+    key = (sandbox, API_KEY, API_SECRET)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = LumaprintsAPI(API_KEY, API_SECRET, sandbox=sandbox)
+        return _clients[key]
 
 
 # Initialize pricing calculator with 100% markup (double the wholesale price)
@@ -383,40 +652,3 @@ if __name__ == "__main__":
     # Run test when script is executed directly
     test_api_connection()
 
-    
-    def upload_to_library(self, upload_data: Dict) -> Dict:
-        """
-        Upload an image to Lumaprints library
-        
-        Args:
-            upload_data: Dictionary containing:
-                - fileName: Name of the file
-                - fileData: Base64 encoded image data
-                - description: Optional description
-                - tags: Optional list of tags
-                
-        Returns:
-            Upload result dictionary with libraryId if successful
-        """
-        return self._make_request("POST", "/library/upload", upload_data)
-    
-    def get_library_images(self) -> List[Dict]:
-        """
-        Get all images from Lumaprints library
-        
-        Returns:
-            List of library image dictionaries
-        """
-        return self._make_request("GET", "/library/images")
-    
-    def delete_from_library(self, library_id: str) -> Dict:
-        """
-        Delete an image from Lumaprints library
-        
-        Args:
-            library_id: ID of the library image to delete
-            
-        Returns:
-            Deletion result dictionary
-        """
-        return self._make_request("DELETE", f"/library/images/{library_id}")
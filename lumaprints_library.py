@@ -1,165 +1,280 @@
 """
 Lumaprints Library Manager
 Handles uploading images to Lumaprints library and tracking sync status
+
+Sync state lives in lumaprints_library.db (library_sync: one row per image
+with its content hash, library ID, status and last error), which replaces
+lumaprints_library_mapping.json (imported on first use). An image is
+skipped when its content hash is already synced - under its own name or
+another one, which then shares the library ID - so renaming or touching
+a file doesn't upload it again, and replacing its content does.
+
+bulk_upload_missing_images() queues a lumaprints_library_sync job: one
+checkpointed item per image, LIBRARY_SYNC_WORKERS uploads at a time, each
+streamed from disk (see LumaprintsAPI.upload_file_to_library). A job
+interrupted by a restart resumes with the images it hadn't finished.
 """
 
 import os
 import json
-import requests
-import base64
+import sqlite3
 from datetime import datetime
 from lumaprints_api import get_lumaprints_client
+from job_runner import register_job_type, submit_job
+
+if os.path.exists('/data'):
+    IMAGES_FOLDER = '/data'
+    DB_PATH = '/data/lumaprints_library.db'
+else:
+    IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), 'data')
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'lumaprints_library.db')
+
+LEGACY_MAPPING_FILE = os.path.join(IMAGES_FOLDER, 'lumaprints_library_mapping.json')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+# Uploads running at once in a sync job
+LIBRARY_SYNC_WORKERS = 3
+
+_db_initialized = False
+
+
+def get_db():
+    """Connection to lumaprints_library.db (table created, and the JSON mapping imported, on first use)"""
+    global _db_initialized
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _db_initialized:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS library_sync (
+                filename TEXT PRIMARY KEY,
+                content_hash TEXT,
+                library_id TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                file_size INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                uploaded_at TEXT,
+                updated_at TEXT
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_library_sync_hash ON library_sync(content_hash, status)')
+        _import_legacy_mapping(conn)
+        conn.commit()
+        _db_initialized = True
+    return conn
+
+
+def _import_legacy_mapping(conn):
+    """Synced entries of lumaprints_library_mapping.json, if the table is still empty (hash filled on next sync)"""
+    if conn.execute('SELECT 1 FROM library_sync LIMIT 1').fetchone() or not os.path.exists(LEGACY_MAPPING_FILE):
+        return
+    try:
+        with open(LEGACY_MAPPING_FILE, 'r') as f:
+            mapping = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not import {LEGACY_MAPPING_FILE}: {e}")
+        return
+    conn.executemany('''
+        INSERT OR IGNORE INTO library_sync (filename, library_id, status, file_size, uploaded_at, updated_at)
+        VALUES (?, ?, 'synced', ?, ?, ?)
+    ''', [(filename, entry.get('library_id'), entry.get('file_size'), entry.get('uploaded_at'), datetime.now().isoformat())
+          for filename, entry in mapping.items()
+          if isinstance(entry, dict) and entry.get('status') == 'synced' and entry.get('library_id')])
+
+
+def list_library_images(images_folder=IMAGES_FOLDER):
+    """Image files in the library folder, sorted"""
+    try:
+        with os.scandir(images_folder) as it:
+            return sorted(entry.name for entry in it
+                          if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file())
+    except FileNotFoundError:
+        return []
+
+
+def file_content_hash(path, filename):
+    """SHA-256 of a file, from the data journal's snapshot if it is still current, else computed"""
+    from data_journal import get_snapshot_entry, content_hash
+    stat = os.stat(path)
+    entry = get_snapshot_entry(filename)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['content_hash'], stat.st_size
+    return content_hash(path), stat.st_size
+
+
+def _upsert(conn, filename, **fields):
+    fields['updated_at'] = datetime.now().isoformat()
+    columns = ', '.join(['filename'] + list(fields))
+    placeholders = ', '.join('?' for _ in range(len(fields) + 1))
+    updates = ', '.join(f'{name} = excluded.{name}' for name in fields)
+    conn.execute(f'''
+        INSERT INTO library_sync ({columns}) VALUES ({placeholders})
+        ON CONFLICT(filename) DO UPDATE SET {updates}
+    ''', [filename] + list(fields.values()))
+
+
+def sync_image(filename, api_client=None, images_folder=IMAGES_FOLDER):
+    """
+    Make sure one image's current content is in the Lumaprints library.
+    Returns {'library_id', 'uploaded': bool, 'reason'}; raises on upload failure
+    (recorded as status 'failed').
+    """
+    path = os.path.join(images_folder, filename)
+    digest, size = file_content_hash(path, filename)
+
+    conn = get_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT * FROM library_sync WHERE filename = ?', (filename,)).fetchone()
+        # Imported from the JSON mapping (no hash yet): trust it while the size matches
+        if row and row['status'] == 'synced' and (row['content_hash'] == digest or
+                                                  (row['content_hash'] is None and row['file_size'] == size)):
+            _upsert(conn, filename, content_hash=digest, file_size=size)
+            conn.commit()
+            return {'library_id': row['library_id'], 'uploaded': False, 'reason': 'already synced'}
+
+        same = conn.execute('''
+            SELECT filename, library_id FROM library_sync
+            WHERE content_hash = ? AND status = 'synced' AND filename != ?
+            LIMIT 1
+        ''', (digest, filename)).fetchone()
+        if same:
+            _upsert(conn, filename, content_hash=digest, library_id=same['library_id'], status='synced',
+                    file_size=size, error=None, uploaded_at=datetime.now().isoformat())
+            conn.commit()
+            return {'library_id': same['library_id'], 'uploaded': False, 'reason': f"same content as {same['filename']}"}
+
+        _upsert(conn, filename, content_hash=digest, status='uploading', file_size=size, error=None,
+                attempts=(row['attempts'] if row else 0) + 1)
+        conn.commit()
+    finally:
+        conn.close()
+
+    api_client = api_client or get_lumaprints_client(sandbox=True)
+    try:
+        response = api_client.upload_file_to_library(path, filename, description=f"Gallery image: {filename}",
+                                                      tags=["gallery", "fifth-element-photography"])
+        if not response.get('success'):
+            raise RuntimeError(response.get('error') or response.get('message') or 'Unknown error')
+    except Exception as e:
+        conn = get_db()
+        _upsert(conn, filename, status='failed', error=str(e))
+        conn.commit()
+        conn.close()
+        raise
+
+    library_id = response.get('libraryId')
+    conn = get_db()
+    _upsert(conn, filename, library_id=library_id, status='synced', uploaded_at=datetime.now().isoformat())
+    conn.commit()
+    conn.close()
+    return {'library_id': library_id, 'uploaded': True, 'reason': 'uploaded'}
+
+# Background job: one checkpointed item per image, LIBRARY_SYNC_WORKERS uploads at a time
+
+def _plan_library_sync(params):
+    return [(filename, None) for filename in params.get('filenames') or list_library_images()]
+
+def _setup_library_sync(params):
+    return get_lumaprints_client(sandbox=params.get('sandbox', True))
+
+def _process_library_sync(params, context, item_key, payload):
+    return sync_image(item_key, api_client=context)
+
+register_job_type('lumaprints_library_sync', _plan_library_sync, _process_library_sync,
+                  setup=_setup_library_sync, concurrency=LIBRARY_SYNC_WORKERS)
+
 
 class LumaprintsLibrary:
     def __init__(self):
-        self.library_mapping_file = '/data/lumaprints_library_mapping.json'
         self.api_client = get_lumaprints_client(sandbox=True)
-    
+
     def load_library_mapping(self):
-        """Load mapping of gallery images to Lumaprints library IDs"""
-        try:
-            if os.path.exists(self.library_mapping_file):
-                with open(self.library_mapping_file, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        return {}
-    
-    def save_library_mapping(self, mapping):
-        """Save mapping of gallery images to Lumaprints library IDs"""
-        with open(self.library_mapping_file, 'w') as f:
-            json.dump(mapping, f, indent=2)
-    
+        """Mapping of gallery images to Lumaprints library IDs and sync status"""
+        conn = get_db()
+        rows = conn.execute('SELECT * FROM library_sync').fetchall()
+        conn.close()
+        return {row['filename']: dict(row) for row in rows}
+
     def upload_image_to_lumaprints(self, image_path, filename):
         """
-        Upload an image to Lumaprints library
+        Upload an image to Lumaprints library (skipped if its content is already there)
         Returns: (success, library_id_or_error)
         """
         try:
-            # Read image file
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-            
-            # Encode image as base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            # Prepare upload payload
-            upload_payload = {
-                "fileName": filename,
-                "fileData": image_base64,
-                "description": f"Gallery image: {filename}",
-                "tags": ["gallery", "fifth-element-photography"]
-            }
-            
-            # Upload to Lumaprints library
-            response = self.api_client.upload_to_library(upload_payload)
-            
-            if response.get('success'):
-                library_id = response.get('libraryId')
-                
-                # Update mapping
-                mapping = self.load_library_mapping()
-                mapping[filename] = {
-                    'library_id': library_id,
-                    'uploaded_at': datetime.now().isoformat(),
-                    'status': 'synced',
-                    'file_size': len(image_data)
-                }
-                self.save_library_mapping(mapping)
-                
-                return True, library_id
-            else:
-                return False, response.get('error', 'Unknown error')
-                
+            result = sync_image(filename, self.api_client, images_folder=os.path.dirname(image_path))
+            return True, result['library_id']
         except Exception as e:
             return False, str(e)
-    
+
     def check_sync_status(self, filename):
         """Check if an image is synced with Lumaprints library"""
-        mapping = self.load_library_mapping()
-        return mapping.get(filename, {}).get('status') == 'synced'
-    
+        conn = get_db()
+        row = conn.execute('SELECT status FROM library_sync WHERE filename = ?', (filename,)).fetchone()
+        conn.close()
+        return bool(row) and row['status'] == 'synced'
+
     def get_library_id(self, filename):
         """Get Lumaprints library ID for a gallery image"""
-        mapping = self.load_library_mapping()
-        return mapping.get(filename, {}).get('library_id')
-    
+        conn = get_db()
+        row = conn.execute("SELECT library_id FROM library_sync WHERE filename = ? AND status = 'synced'",
+                           (filename,)).fetchone()
+        conn.close()
+        return row['library_id'] if row else None
+
     def get_sync_status_for_all_images(self):
         """Get sync status for all gallery images"""
-        gallery_images = self.get_gallery_images()
         mapping = self.load_library_mapping()
-        
+
         status_list = []
-        for filename in gallery_images:
+        for filename in self.get_gallery_images():
             image_data = mapping.get(filename, {})
             status_list.append({
                 'filename': filename,
                 'synced': image_data.get('status') == 'synced',
+                'status': image_data.get('status', 'pending'),
                 'library_id': image_data.get('library_id'),
                 'uploaded_at': image_data.get('uploaded_at'),
-                'file_size': image_data.get('file_size')
+                'file_size': image_data.get('file_size'),
+                'error': image_data.get('error')
             })
-        
+
         return status_list
-    
+
     def get_gallery_images(self):
         """Get list of all gallery images"""
-        images = []
-        data_dir = '/data'
-        
-        if os.path.exists(data_dir):
-            for filename in os.listdir(data_dir):
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                    images.append(filename)
-        
-        return sorted(images)
-    
-    def bulk_upload_missing_images(self):
-        """Upload all gallery images that aren't synced to Lumaprints"""
-        gallery_images = self.get_gallery_images()
-        mapping = self.load_library_mapping()
-        
-        results = []
-        for filename in gallery_images:
-            if filename not in mapping or mapping[filename].get('status') != 'synced':
-                image_path = os.path.join('/data', filename)
-                success, result = self.upload_image_to_lumaprints(image_path, filename)
-                
-                results.append({
-                    'filename': filename,
-                    'success': success,
-                    'result': result
-                })
-        
-        return results
-    
+        return list_library_images()
+
+    def bulk_upload_missing_images(self, filenames=None):
+        """Queue a resumable job syncing every gallery image (or just `filenames`); returns the job ID"""
+        return submit_job('lumaprints_library_sync', {'filenames': filenames, 'sandbox': self.api_client.sandbox})
+
     def remove_from_library(self, filename):
         """Remove image from Lumaprints library and update mapping"""
-        mapping = self.load_library_mapping()
-        
-        if filename in mapping:
-            library_id = mapping[filename].get('library_id')
-            
-            # Try to delete from Lumaprints (if API supports it)
-            try:
-                # Note: Check if Lumaprints API has delete endpoint
-                # self.api_client.delete_from_library(library_id)
-                pass
-            except:
-                pass
-            
-            # Remove from local mapping
-            del mapping[filename]
-            self.save_library_mapping(mapping)
-            
-            return True
-        
-        return False
-    
+        conn = get_db()
+        row = conn.execute('SELECT library_id FROM library_sync WHERE filename = ?', (filename,)).fetchone()
+        if not row:
+            conn.close()
+            return False
+
+        # Try to delete from Lumaprints (if API supports it)
+        try:
+            # Note: Check if Lumaprints API has delete endpoint
+            # self.api_client.delete_from_library(row['library_id'])
+            pass
+        except:
+            pass
+
+        # Remove from local mapping
+        conn.execute('DELETE FROM library_sync WHERE filename = ?', (filename,))
+        conn.commit()
+        conn.close()
+        return True
+
     def get_lumaprints_url_for_order(self, filename):
         """Get the Lumaprints library reference for an order"""
         library_id = self.get_library_id(filename)
-        
+
         if library_id:
             return {
                 'type': 'library',
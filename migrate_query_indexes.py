@@ -0,0 +1,101 @@
+"""
+Migration: covering indexes for the hot pricing/ordering queries
+Safe to run on every startup (CREATE INDEX IF NOT EXISTS, missing tables skipped)
+
+print_ordering.db   - database/migrations/add_covering_indexes.sql
+lumaprints_pricing.db - LUMAPRINTS_INDEXES below; the products table has
+                        different columns depending on which importer built
+                        it, so each index is only created when its columns exist
+"""
+
+import os
+import sqlite3
+
+PRINT_ORDERING_MIGRATION = os.path.join(os.path.dirname(__file__), 'database', 'migrations', 'add_covering_indexes.sql')
+
+if os.path.exists('/data'):
+    PRINT_ORDERING_DB_PATH = '/data/print_ordering.db'
+    LUMAPRINTS_DB_PATH = '/data/lumaprints_pricing.db'
+else:
+    PRINT_ORDERING_DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering.db')
+    LUMAPRINTS_DB_PATH = os.path.join(os.path.dirname(__file__), 'lumaprints_pricing.db')
+
+# (index name, table, columns)
+LUMAPRINTS_INDEXES = [
+    # /api/hierarchical/available-sizes
+    ('idx_products_active_type_subcategory', 'products', ['active', 'product_type_id', 'lumaprints_subcategory_id']),
+    ('idx_products_active_type_sub_option', 'products', ['active', 'product_type_id', 'sub_option_1_id']),
+    # /api/hierarchical/sub-options EXISTS probes
+    ('idx_products_type_sub_option_2', 'products', ['product_type_id', 'sub_option_2_id', 'active']),
+    ('idx_sub_options_type_level', 'sub_options', ['product_type_id', 'level', 'active', 'display_order']),
+    # /api/hierarchical/product-types
+    ('idx_product_types_active_order', 'product_types', ['active', 'display_order']),
+]
+
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def apply_print_ordering_indexes(db_path=PRINT_ORDERING_DB_PATH):
+    """Run add_covering_indexes.sql statement by statement; returns the indexes created or already present"""
+    if not os.path.exists(db_path):
+        return []
+
+    # Drop comment lines before splitting so only SQL statements remain
+    with open(PRINT_ORDERING_MIGRATION, 'r') as f:
+        script = '\n'.join(line for line in f if not line.strip().startswith('--'))
+    statements = [s.strip() for s in script.split(';')]
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    applied = []
+    for sql in statements:
+        if not sql:
+            continue
+        try:
+            cursor.execute(sql)
+            applied.append(sql.split()[5])
+        except sqlite3.OperationalError as e:
+            # e.g. shopify_products not created yet on a fresh install
+            print(f"[INDEXES] Skipped on {os.path.basename(db_path)}: {e}")
+    cursor.execute('PRAGMA optimize')
+    conn.commit()
+    conn.close()
+    return applied
+
+
+def apply_lumaprints_indexes(db_path=LUMAPRINTS_DB_PATH):
+    """Create the lumaprints_pricing.db indexes whose columns exist in this copy of the schema"""
+    if not os.path.exists(db_path):
+        return []
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    applied = []
+    columns_by_table = {}
+    for index_name, table, columns in LUMAPRINTS_INDEXES:
+        if table not in columns_by_table:
+            columns_by_table[table] = _table_columns(cursor, table)
+        if not set(columns) <= columns_by_table[table]:
+            continue
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table}({', '.join(columns)})")
+        applied.append(index_name)
+    cursor.execute('PRAGMA optimize')
+    conn.commit()
+    conn.close()
+    return applied
+
+
+def run_index_migrations():
+    """Apply both migrations (called once at app startup)"""
+    try:
+        applied = apply_print_ordering_indexes() + apply_lumaprints_indexes()
+        print(f"[INDEXES] {len(applied)} query indexes in place")
+    except Exception as e:
+        print(f"[INDEXES] Error applying index migrations: {e}")
+
+
+if __name__ == '__main__':
+    run_index_migrations()
@@ -1,48 +1,131 @@
 """
 Navigation Helper Functions
 Provides navigation data for templates
+
+The visible navigation tree (nav items joined to their gallery slugs) and
+the gallery list are read through one connection, with galleries.db
+ATTACHed to navigation.db, and memoized.
+The memo is keyed by a version made of a local counter, bumped by the
+routes/navigation write endpoints via invalidate_navigation(), and the
+mtimes of both database files, so edits made through another worker are
+picked up too.
 """
 
-from navigation_db import get_visible_nav_tree
+import os
+import sqlite3
+import threading
 
-def get_navigation_for_template():
-    """Get navigation structure formatted for template rendering"""
-    nav_tree = get_visible_nav_tree()
-    
-    # Format for template use
+import navigation_db
+import gallery_db
+
+_cache = {'version': None, 'nav_items': None, 'galleries': None}
+_cache_lock = threading.Lock()
+_local_version = 0
+
+
+def invalidate_navigation():
+    """Drop the memoized navigation (called after navigation writes)"""
+    global _local_version
+    with _cache_lock:
+        _local_version += 1
+        _cache['version'] = None
+
+
+def _file_version(path):
+    """mtime of a database file and its WAL, if any (0 when missing)"""
+    version = []
+    for candidate in (path, path + '-wal'):
+        try:
+            version.append(os.stat(candidate).st_mtime_ns)
+        except OSError:
+            version.append(0)
+    return tuple(version)
+
+
+def _current_version():
+    return (_local_version,
+            _file_version(navigation_db.DB_PATH),
+            _file_version(os.path.abspath(gallery_db.DB_PATH)))
+
+
+def _load_navigation():
+    """Visible nav items joined to their gallery slugs, plus the visible galleries, in one connection"""
+    conn = sqlite3.connect(navigation_db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('ATTACH DATABASE ? AS g', (os.path.abspath(gallery_db.DB_PATH),))
+
+    cursor.execute('''
+        SELECT n.id, n.name, n.type, n.parent_id, n.gallery_id, n.url, gal.slug AS gallery_slug
+        FROM nav_items n
+        LEFT JOIN g.galleries gal ON gal.id = n.gallery_id
+        WHERE n.visible = 1
+        ORDER BY n.order_index ASC
+    ''')
+    nav_rows = [dict(row) for row in cursor.fetchall()]
+
+    cursor.execute('SELECT * FROM g.galleries WHERE visible = 1 ORDER BY display_order, name')
+    galleries = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+
+    return _format_navigation(nav_rows), galleries
+
+
+def _format_navigation(nav_rows):
+    """Format top-level items and their gallery/link children for template rendering"""
     formatted_nav = []
-    for category in nav_tree:
-        category_data = {
-            'id': category['id'],
-            'name': category['name'],
-            'type': category['type'],
-            'url': category.get('url', '#'),
-            'children': []
-        }
-        
-        # Add children (galleries and links)
-        for child in category.get('children', []):
-            if child['type'] == 'gallery' and child.get('gallery_id'):
-                # Get gallery slug from gallery_db
-                from gallery_db import get_gallery_by_id
-                gallery = get_gallery_by_id(child['gallery_id'])
-                if gallery:
-                    category_data['children'].append({
-                        'id': child['id'],
-                        'name': child['name'],
-                        'url': f"/gallery/{gallery['slug']}",
-                        'type': 'gallery',
-                        'gallery_id': child['gallery_id']
-                    })
-            elif child['type'] == 'link' and child.get('url'):
-                # Custom page link
-                category_data['children'].append({
-                    'id': child['id'],
-                    'name': child['name'],
-                    'url': child['url'],
-                    'type': 'link'
-                })
-        
-        formatted_nav.append(category_data)
-    
+    children_by_parent = {}
+
+    for row in nav_rows:
+        if row['parent_id'] is None:
+            category_data = {
+                'id': row['id'],
+                'name': row['name'],
+                'type': row['type'],
+                'url': row['url'],
+                'children': []
+            }
+            children_by_parent[row['id']] = category_data['children']
+            formatted_nav.append(category_data)
+
+    for row in nav_rows:
+        children = children_by_parent.get(row['parent_id'])
+        if children is None:
+            continue
+
+        if row['type'] == 'gallery' and row['gallery_id'] and row['gallery_slug']:
+            children.append({
+                'id': row['id'],
+                'name': row['name'],
+                'url': f"/gallery/{row['gallery_slug']}",
+                'type': 'gallery',
+                'gallery_id': row['gallery_id']
+            })
+        elif row['type'] == 'link' and row['url']:
+            # Custom page link
+            children.append({
+                'id': row['id'],
+                'name': row['name'],
+                'url': row['url'],
+                'type': 'link'
+            })
+
     return formatted_nav
+
+
+def get_site_navigation():
+    """(nav_items, galleries) for the public templates, rebuilt only when navigation or galleries change"""
+    version = _current_version()
+    with _cache_lock:
+        if _cache['version'] == version:
+            return _cache['nav_items'], _cache['galleries']
+
+    nav_items, galleries = _load_navigation()
+    with _cache_lock:
+        _cache.update(version=version, nav_items=nav_items, galleries=galleries)
+    return nav_items, galleries
+
+
+def get_navigation_for_template():
+    """Get navigation structure formatted for template rendering"""
+    return get_site_navigation()[0]
@@ -5,10 +5,12 @@ Works directly with the rebuilt Lumaprints database
 
 from flask import jsonify, request, render_template
 import sqlite3
-import os
 from PIL import Image
 import requests
 from io import BytesIO
+from print_compatibility import (
+    RATIO_TOLERANCE, compute_compatible_products, ensure_image_indexed
+)
 
 DB_PATH = '/data/lumaprints_pricing.db'
 
@@ -19,48 +21,44 @@ def get_db_connection():
     return conn
 
 
+# Common print sizes (in inches)
+STANDARD_PRINT_SIZES = [
+    (4, 6), (5, 7), (8, 10), (8, 12), (10, 20), (10, 30),
+    (11, 14), (12, 12), (12, 16), (12, 18), (16, 20), (16, 24),
+    (16, 48), (18, 24), (20, 20), (20, 40), (20, 60),
+    (24, 30), (24, 36), (30, 30), (30, 40), (30, 60),
+    (32, 48), (36, 48), (36, 72), (40, 40), (40, 60)
+]
+
+
 def calculate_compatible_sizes(image_width, image_height, image_ratio, min_dpi=150):
     """
     Calculate which print sizes are compatible with the image
     based on dimensions and minimum DPI requirements
     """
-    compatible_sizes = []
-    
-    # Common print sizes (in inches)
-    standard_sizes = [
-        (4, 6), (5, 7), (8, 10), (8, 12), (10, 20), (10, 30),
-        (11, 14), (12, 12), (12, 16), (12, 18), (16, 20), (16, 24),
-        (16, 48), (18, 24), (20, 20), (20, 40), (20, 60),
-        (24, 30), (24, 36), (30, 30), (30, 40), (30, 60),
-        (32, 48), (36, 48), (36, 72), (40, 40), (40, 60)
-    ]
+    compatible_sizes = {}
+    image_ratio = float(image_ratio)
     
-    for width_inches, height_inches in standard_sizes:
+    for width_inches, height_inches in STANDARD_PRINT_SIZES:
         # Check both orientations
-        for w, h in [(width_inches, height_inches), (height_inches, width_inches)]:
-            # Calculate required DPI
-            dpi_w = image_width / w
-            dpi_h = image_height / h
-            min_dpi_for_size = min(dpi_w, dpi_h)
+        for w, h in ((width_inches, height_inches), (height_inches, width_inches)):
+            min_dpi_for_size = min(image_width / w, image_height / h)
+            if min_dpi_for_size < min_dpi:
+                continue
             
-            # Check if DPI is sufficient
-            if min_dpi_for_size >= min_dpi:
-                # Check if aspect ratio is compatible (within 10% tolerance)
-                size_ratio = w / h
-                ratio_diff = abs(float(image_ratio) - size_ratio) / size_ratio
-                
-                if ratio_diff <= 0.10:  # 10% tolerance
-                    size_str = f"{w}x{h}"
-                    if size_str not in [s['size'] for s in compatible_sizes]:
-                        compatible_sizes.append({
-                            'size': size_str,
-                            'width': w,
-                            'height': h,
-                            'dpi': round(min_dpi_for_size),
-                            'ratio_match': round((1 - ratio_diff) * 100, 1)
-                        })
+            # Aspect ratio must be within 10% tolerance
+            size_ratio = w / h
+            ratio_diff = abs(image_ratio - size_ratio) / size_ratio
+            if ratio_diff <= RATIO_TOLERANCE:
+                compatible_sizes[f"{w}x{h}"] = {
+                    'size': f"{w}x{h}",
+                    'width': w,
+                    'height': h,
+                    'dpi': round(min_dpi_for_size),
+                    'ratio_match': round((1 - ratio_diff) * 100, 1)
+                }
     
-    return compatible_sizes
+    return list(compatible_sizes.values())
 
 
 def get_image_metadata_from_file(image_path):
@@ -69,14 +67,12 @@ def get_image_metadata_from_file(image_path):
     Returns width, height, and calculated DPI
     """
     try:
-        # Open image from local filesystem
-        img = Image.open(image_path)
+        # Open image from local filesystem (header only, pixels aren't decoded)
+        with Image.open(image_path) as img:
+            width, height = img.size
+            dpi = img.info.get('dpi', (300, 300))
         
-        width, height = img.size
         ratio = round(width / height, 2)
-        
-        # Try to get DPI from image metadata
-        dpi = img.info.get('dpi', (300, 300))
         if isinstance(dpi, tuple):
             dpi = dpi[0]
         
@@ -91,49 +87,73 @@ def get_image_metadata_from_file(image_path):
         return None
 
 
-def get_products_for_image(image_data):
+PRODUCT_COLUMNS = '''
+    p.id,
+    p.name,
+    p.size,
+    p.cost_price,
+    p.retail_price,
+    pt.name as product_type,
+    c.name as category,
+    p.lumaprints_subcategory_id,
+    p.lumaprints_options
+'''
+
+
+def _product_from_row(row, dpi, ratio_match):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'size': row['size'],
+        'cost_price': row['cost_price'],
+        'retail_price': row['retail_price'],
+        'product_type': row['product_type'],
+        'category': row['category'],
+        'lumaprints_subcategory_id': row['lumaprints_subcategory_id'],
+        'lumaprints_options': row['lumaprints_options'],
+        'dpi': dpi,
+        'ratio_match': ratio_match
+    }
+
+
+def get_products_for_image(image_data, filename=None):
     """
-    Get ALL products from database (filtering removed for testing)
+    Get the products an image can be printed as.
+    Indexed images are a single join against image_product_compatibility;
+    anything else (e.g. dimensions only known from the frontend) is
+    evaluated on the fly without being stored.
     """
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Query ALL products (no filtering)
-        query = '''
-            SELECT 
-                p.id,
-                p.name,
-                p.size,
-                p.cost_price,
-                p.retail_price,
-                pt.name as product_type,
-                c.name as category,
-                p.lumaprints_subcategory_id,
-                p.lumaprints_options
-            FROM products p
-            JOIN product_types pt ON p.product_type_id = pt.id
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.active = 1
-            ORDER BY pt.display_order, c.display_order, p.size
-        '''
-        
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        products = []
-        for row in rows:
-            products.append({
-                'id': row['id'],
-                'name': row['name'],
-                'size': row['size'],
-                'cost_price': row['cost_price'],
-                'retail_price': row['retail_price'],
-                'product_type': row['product_type'],
-                'category': row['category'],
-                'lumaprints_subcategory_id': row['lumaprints_subcategory_id'],
-                'lumaprints_options': row['lumaprints_options']
-            })
+        if filename:
+            cursor.execute(f'''
+                SELECT {PRODUCT_COLUMNS}, ipc.dpi, ipc.ratio_match
+                FROM image_product_compatibility ipc
+                JOIN products p ON p.id = ipc.product_id
+                JOIN product_types pt ON p.product_type_id = pt.id
+                JOIN categories c ON p.category_id = c.id
+                WHERE ipc.image_filename = ? AND p.active = 1
+                ORDER BY pt.display_order, c.display_order, p.size
+            ''', (filename,))
+            products = [_product_from_row(row, row['dpi'], row['ratio_match']) for row in cursor.fetchall()]
+        else:
+            compatible = {
+                product_id: (dpi, ratio_match)
+                for product_id, dpi, ratio_match in compute_compatible_products(
+                    conn, float(image_data['width']), float(image_data['height']))
+            }
+            cursor.execute(f'''
+                SELECT {PRODUCT_COLUMNS}
+                FROM products p
+                JOIN product_types pt ON p.product_type_id = pt.id
+                JOIN categories c ON p.category_id = c.id
+                WHERE p.active = 1
+                ORDER BY pt.display_order, c.display_order, p.size
+            ''')
+            products = [_product_from_row(row, *compatible[row['id']])
+                        for row in cursor.fetchall() if row['id'] in compatible]
         
         conn.close()
         return products
@@ -168,42 +188,38 @@ def register_order_routes_v3(app):
             image_url = data['url']
             filename = image_url.split('/')[-1]
             
-            # Try to read from local filesystem first
-            # Priority: originals (high-res) > web-optimized
-            # Force update: Check /data/originals/ first for true high-res dimensions
-            local_paths = [
-                f'/data/originals/{filename}',  # High-res originals
-                f'/data/{filename}',             # Web-optimized fallback
-                f'./data/originals/{filename}',
-                f'./data/{filename}'
-            ]
+            # Dimensions and compatible products are computed once per image
+            # (at upload, or here on first request) and stored with the catalog
+            conn = get_db_connection()
+            try:
+                dimensions = ensure_image_indexed(filename, conn)
+            finally:
+                conn.close()
             
-            metadata = None
-            for path in local_paths:
-                if os.path.exists(path):
-                    metadata = get_image_metadata_from_file(path)
-                    if metadata:
-                        print(f"✅ Read image metadata from {path}: {metadata['width']}×{metadata['height']}")
-                        break
+            if dimensions:
+                metadata = {
+                    'width': dimensions['width'],
+                    'height': dimensions['height'],
+                    'ratio': round(dimensions['width'] / dimensions['height'], 2),
+                    'dpi': data.get('dpi', 300)
+                }
+                products = get_products_for_image(metadata, filename=filename)
             
-            # If local read failed, use dimensions from frontend (may be resized)
-            if not metadata:
+            # If the original isn't on disk, use dimensions from frontend (may be resized)
+            elif 'width' in data and 'height' in data:
                 print(f"⚠️  Could not read image from filesystem, using frontend dimensions")
-                if 'width' in data and 'height' in data:
-                    metadata = {
-                        'width': data['width'],
-                        'height': data['height'],
-                        'ratio': data.get('ratio', data['width'] / data['height']),
-                        'dpi': data.get('dpi', 300)
-                    }
-                else:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Could not determine image dimensions'
-                    }), 400
-            
-            # Get compatible products
-            products = get_products_for_image(metadata)
+                metadata = {
+                    'width': data['width'],
+                    'height': data['height'],
+                    'ratio': data.get('ratio', data['width'] / data['height']),
+                    'dpi': data.get('dpi', 300)
+                }
+                products = get_products_for_image(metadata)
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': 'Could not determine image dimensions'
+                }), 400
             
             return jsonify({
                 'success': True,
@@ -0,0 +1,196 @@
+"""
+Per-image print size compatibility index
+Computed once per image (at upload, or on first lookup) and stored next to
+the product catalog in lumaprints_pricing.db, so /api/order/products is a
+single indexed join instead of DPI/ratio math and a Pillow open per request.
+
+A product is compatible with an image when, in either orientation, the image
+still has at least MIN_DPI pixels per inch and the print's aspect ratio is
+within RATIO_TOLERANCE of the image's.
+"""
+
+import os
+import re
+import hashlib
+import sqlite3
+from datetime import datetime
+
+if os.path.exists('/data'):
+    DB_PATH = '/data/lumaprints_pricing.db'
+else:
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'lumaprints_pricing.db')
+
+MIN_DPI = 150
+RATIO_TOLERANCE = 0.10
+
+# Where the high-res original for an ordered image may live (best first)
+ORIGINAL_SEARCH_PATHS = [
+    '/data/originals',
+    '/data',
+    './data/originals',
+    './data'
+]
+
+_SIZE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*[x×X]\s*(\d+(?:\.\d+)?)')
+
+
+def parse_print_size(size):
+    """'12x18', '12×18' or '12" x 18"' -> (12.0, 18.0); None if unparseable"""
+    match = _SIZE_PATTERN.search((size or '').replace('"', ''))
+    if not match:
+        return None
+    width, height = float(match.group(1)), float(match.group(2))
+    if width <= 0 or height <= 0:
+        return None
+    return width, height
+
+
+def evaluate_print_size(image_width, image_height, print_width, print_height, min_dpi=MIN_DPI):
+    """
+    Best orientation of one print size for an image.
+    Returns (dpi, ratio_match_percent, width, height) or None if neither orientation works.
+    """
+    image_ratio = image_width / image_height
+    best = None
+    for w, h in ((print_width, print_height), (print_height, print_width)):
+        dpi = min(image_width / w, image_height / h)
+        if dpi < min_dpi:
+            continue
+        size_ratio = w / h
+        ratio_diff = abs(image_ratio - size_ratio) / size_ratio
+        if ratio_diff > RATIO_TOLERANCE:
+            continue
+        if best is None or dpi > best[0]:
+            best = (dpi, round((1 - ratio_diff) * 100, 1), w, h)
+    return best
+
+
+def get_db():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_compatibility_tables(conn):
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_print_dimensions (
+            image_filename TEXT PRIMARY KEY,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            catalog_version TEXT,
+            updated_at TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_product_compatibility (
+            image_filename TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            dpi INTEGER NOT NULL,
+            ratio_match REAL NOT NULL,
+            PRIMARY KEY (image_filename, product_id)
+        )
+    ''')
+    conn.commit()
+
+
+def get_catalog_version(conn):
+    """
+    Changes whenever products are added, removed, (de)activated or resized:
+    a checksum over (id, size, active) - the columns compatibility depends on
+    """
+    digest = hashlib.sha1()
+    for row in conn.execute('SELECT id, size, active FROM products ORDER BY id'):
+        digest.update(f'{row[0]}:{row[1]}:{row[2]};'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _sizes_to_products(conn):
+    """Group active product IDs by parsed print size so each distinct size is evaluated once"""
+    sizes = {}
+    for row in conn.execute('SELECT id, size FROM products WHERE active = 1'):
+        parsed = parse_print_size(row[1])
+        if parsed:
+            sizes.setdefault(parsed, []).append(row[0])
+    return sizes
+
+
+def compute_compatible_products(conn, image_width, image_height, min_dpi=MIN_DPI):
+    """[(product_id, dpi, ratio_match)] for every active product the image can be printed as"""
+    rows = []
+    for (print_width, print_height), product_ids in _sizes_to_products(conn).items():
+        result = evaluate_print_size(image_width, image_height, print_width, print_height, min_dpi)
+        if result:
+            dpi, ratio_match = round(result[0]), result[1]
+            rows.extend((product_id, dpi, ratio_match) for product_id in product_ids)
+    return rows
+
+
+def index_image(filename, image_width, image_height, conn=None):
+    """(Re)compute and store one image's compatible products in a single transaction"""
+    own_conn = conn is None
+    conn = conn or get_db()
+    try:
+        init_compatibility_tables(conn)
+        rows = compute_compatible_products(conn, image_width, image_height)
+        conn.execute('DELETE FROM image_product_compatibility WHERE image_filename = ?', (filename,))
+        conn.executemany('''
+            INSERT INTO image_product_compatibility (image_filename, product_id, dpi, ratio_match)
+            VALUES (?, ?, ?, ?)
+        ''', [(filename, product_id, dpi, ratio_match) for product_id, dpi, ratio_match in rows])
+        conn.execute('''
+            INSERT OR REPLACE INTO image_print_dimensions (image_filename, width, height, catalog_version, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (filename, image_width, image_height, get_catalog_version(conn), datetime.now().isoformat()))
+        conn.commit()
+        return len(rows)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def find_original(filename):
+    """Path of the highest-resolution local copy of an image, or None"""
+    for folder in ORIGINAL_SEARCH_PATHS:
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def index_image_file(filename, path=None, conn=None):
+    """Read pixel dimensions from the file header (no decode) and index the image"""
+    from PIL import Image
+    path = path or find_original(filename)
+    if not path or (conn is None and not os.path.exists(DB_PATH)):
+        return None
+    with Image.open(path) as img:
+        width, height = img.size
+    return index_image(filename, width, height, conn=conn)
+
+
+def get_image_dimensions(filename, conn=None):
+    own_conn = conn is None
+    conn = conn or get_db()
+    try:
+        init_compatibility_tables(conn)
+        row = conn.execute('SELECT * FROM image_print_dimensions WHERE image_filename = ?', (filename,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def ensure_image_indexed(filename, conn):
+    """
+    Index an image on first lookup, or again if the product catalog changed
+    since it was computed. Returns its stored dimensions or None.
+    """
+    dimensions = get_image_dimensions(filename, conn)
+    if dimensions and dimensions['catalog_version'] == get_catalog_version(conn):
+        return dimensions
+    if dimensions:
+        index_image(filename, dimensions['width'], dimensions['height'], conn=conn)
+    elif index_image_file(filename, conn=conn) is None:
+        return None
+    return get_image_dimensions(filename, conn)
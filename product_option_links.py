@@ -0,0 +1,99 @@
+"""
+Normalized Lumaprints option links for lumaprints_pricing.db
+
+products.lumaprints_options holds a JSON list or object of Lumaprints option
+IDs (e.g. [1, 4] or {"frame_color": 12}). Filtering it with LIKE '%12%'
+can't use an index and also matches 123, so every integer in that JSON is
+exploded into product_option_links(product_id, option_id).
+
+Triggers on products keep the links in sync for every importer that writes
+the table. Importers that DROP and recreate products (which drops the
+triggers too) call install_product_option_links(conn) when they finish.
+"""
+
+import os
+import sqlite3
+
+if os.path.exists('/data'):
+    DB_PATH = '/data/lumaprints_pricing.db'
+else:
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'lumaprints_pricing.db')
+
+# Every integer leaf of the JSON value, in document order (malformed JSON yields no links)
+_EXPLODE_OPTIONS_SQL = """
+    SELECT {product_id}, value, id
+    FROM json_tree(CASE WHEN json_valid({options}) THEN {options} ELSE '[]' END)
+    WHERE type = 'integer'
+"""
+
+
+def _insert_links_sql(product_id, options):
+    return 'INSERT OR IGNORE INTO product_option_links (product_id, option_id, position)' + \
+        _EXPLODE_OPTIONS_SQL.format(product_id=product_id, options=options)
+
+
+def install_product_option_links(conn):
+    """
+    Create the links table, its indexes and the sync triggers, then rebuild
+    every product's links in one transaction. Safe to run repeatedly.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(products)")
+    if 'lumaprints_options' not in {row[1] for row in cursor.fetchall()}:
+        return 0
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS product_option_links (
+            product_id INTEGER NOT NULL,
+            option_id INTEGER NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, option_id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_option_links_option ON product_option_links(option_id, product_id)')
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_products_option_links_insert
+        AFTER INSERT ON products
+        WHEN NEW.lumaprints_options IS NOT NULL
+        BEGIN
+            {_insert_links_sql('NEW.id', 'NEW.lumaprints_options')};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_products_option_links_update
+        AFTER UPDATE OF lumaprints_options ON products
+        BEGIN
+            DELETE FROM product_option_links WHERE product_id = OLD.id;
+            {_insert_links_sql('NEW.id', 'NEW.lumaprints_options')};
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_option_links_delete
+        AFTER DELETE ON products
+        BEGIN
+            DELETE FROM product_option_links WHERE product_id = OLD.id;
+        END
+    ''')
+
+    cursor.execute('DELETE FROM product_option_links')
+    cursor.execute('INSERT OR IGNORE INTO product_option_links (product_id, option_id, position) '
+                   'SELECT p.id, t.value, t.id FROM products p, '
+                   "json_tree(CASE WHEN json_valid(p.lumaprints_options) THEN p.lumaprints_options ELSE '[]' END) t "
+                   "WHERE t.type = 'integer'")
+    link_count = cursor.rowcount
+    conn.commit()
+    return link_count
+
+
+def ensure_product_option_links(db_path=DB_PATH):
+    """Startup hook: install/rebuild the links for the live pricing database"""
+    if not os.path.exists(db_path):
+        return
+    try:
+        conn = sqlite3.connect(db_path)
+        link_count = install_product_option_links(conn)
+        conn.close()
+        print(f"[OPTION LINKS] {link_count} product option links in {os.path.basename(db_path)}")
+    except Exception as e:
+        print(f"[OPTION LINKS] Error building product option links: {e}")
@@ -6,6 +6,8 @@ import json
 import os
 from flask import jsonify
 import traceback
+from product_option_links import install_product_option_links
+from response_cache import invalidate, CATALOG
 
 # Use absolute path for Railway persistent volume
 DB_PATH = '/data/lumaprints_pricing.db'
@@ -111,7 +113,11 @@ def rebuild_database_route():
         # 7. Import Peel & Stick
         stats = import_peel_stick(conn, stats)
         
+        # Products table was recreated, so re-create the option link triggers and rebuild the links
+        stats['option_links'] = install_product_option_links(conn)
+        
         conn.close()
+        invalidate(CATALOG)
         
         return jsonify({
             'success': True,
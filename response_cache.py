@@ -0,0 +1,287 @@
+"""
+Fifth Element Photography - Response Cache for read-only JSON APIs
+Version: 1.0.0
+
+Catalog, navigation, gallery and image listings only change when an admin
+edits them, so their rendered responses are cached per route + query args
+and served with an ETag (a matching If-None-Match gets a 304).
+
+Every cached route belongs to a tag. invalidate(tag) drops all of its
+entries; install_write_invalidation(app) calls it after every successful
+admin write, using WRITE_INVALIDATIONS to decide which tags the write
+touches (unknown write endpoints invalidate everything).
+
+The default store is a SQLite file on /data so all gunicorn workers (and
+offline scripts such as rebuild_lumaprints_db.py) share entries and
+invalidations. RESPONSE_CACHE_BACKEND=memory keeps a per-process cache
+instead; RESPONSE_CACHE_BACKEND=off disables caching.
+
+Usage:
+    @app.route('/api/hero_image')
+    @cached_response('hero')
+    def get_hero_image(): ...
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, make_response
+
+if os.path.exists('/data'):
+    DB_PATH = '/data/response_cache.db'
+else:
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'response_cache.db')
+
+BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'sqlite')
+
+CATALOG = 'catalog'          # /api/hierarchical/* (lumaprints_pricing.db)
+NAVIGATION = 'navigation'    # /api/navigation/items/visible
+GALLERIES = 'galleries'      # /api/galleries
+IMAGES = 'images'            # /api/images
+HERO = 'hero'                # /api/hero_image
+ALL_TAGS = (CATALOG, NAVIGATION, GALLERIES, IMAGES, HERO)
+
+# Safety net for changes made outside the admin (e.g. files copied straight into /data)
+DEFAULT_TTL = 3600
+
+# Successful non-GET requests under these path prefixes invalidate these tags (first match wins).
+# An empty tuple means the write doesn't touch cached data.
+WRITE_INVALIDATIONS = [
+    # Public or unrelated writes
+    ('/contact', ()),
+    ('/submit', ()),
+    ('/admin/login', ()),
+    ('/admin/forgot-password', ()),
+    ('/admin/reset-password', ()),
+    ('/admin/change-password', ()),
+    ('/admin/users', ()),
+    ('/api/order', ()),
+    ('/webhooks', ()),
+    ('/api/print-notifications', ()),
+    ('/api/pricing/calculate', ()),
+    ('/api/jobs', ()),
+    ('/api/watermark', ()),
+    ('/api/shopify', ()),
+    ('/sync-shopify-prices', ()),
+    ('/api/migrate-shopify-table', ()),
+    ('/api/tools/fix-shopify-table', ()),
+    ('/api/lumaprints', ()),
+    ('/backup_system', ()),
+    ('/api/database/backup/create', ()),
+    ('/api/database/backup/delete', ()),
+    ('/api/excel-cleanup', ()),
+    ('/api/settings', ()),
+    ('/admin/api/clean-descriptions', ()),
+    # The data journal's catalog listener invalidates what a scan changed
+    ('/api/data-journal', ()),
+    # Print catalog
+    ('/admin/pricing', (CATALOG,)),
+    ('/admin/setup-pricing', (CATALOG,)),
+    ('/api/admin/', (CATALOG,)),
+    # Site structure
+    ('/api/navigation', (NAVIGATION,)),
+    ('/api/galleries', (GALLERIES, NAVIGATION, IMAGES)),
+    ('/admin/update-image-galleries', (GALLERIES, IMAGES)),
+    ('/set_hero_image', (HERO, IMAGES)),
+    ('/clear_hero_image', (HERO, IMAGES)),
+    ('/admin/randomize_portfolio', (IMAGES,)),
+    ('/admin/reorder_portfolio', (IMAGES,)),
+    ('/admin/reset_portfolio_order', (IMAGES,)),
+]
+
+
+class _SQLiteStore:
+    """Entries shared by every process through one SQLite file"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        if not self._initialized:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    tag TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    mimetype TEXT,
+                    body BLOB NOT NULL,
+                    etag TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_response_cache_tag ON response_cache(tag)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache_generations (
+                    tag TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def generation(self, tag):
+        conn = self._connect()
+        row = conn.execute('SELECT generation FROM response_cache_generations WHERE tag = ?', (tag,)).fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute('''
+            SELECT status, mimetype, body, etag FROM response_cache
+            WHERE cache_key = ? AND expires_at > ?
+        ''', (key, time.time())).fetchone()
+        conn.close()
+        return row
+
+    def set(self, key, tag, generation, status, mimetype, body, etag, ttl):
+        # Only store if no invalidation for this tag happened while the response was being built
+        conn = self._connect()
+        conn.execute('''
+            INSERT OR REPLACE INTO response_cache (cache_key, tag, status, mimetype, body, etag, expires_at)
+            SELECT ?, ?, ?, ?, ?, ?, ?
+            WHERE COALESCE((SELECT generation FROM response_cache_generations WHERE tag = ?), 0) = ?
+        ''', (key, tag, status, mimetype, body, etag, time.time() + ttl, tag, generation))
+        conn.commit()
+        conn.close()
+
+    def invalidate(self, tags):
+        conn = self._connect()
+        for tag in tags:
+            conn.execute('DELETE FROM response_cache WHERE tag = ?', (tag,))
+            conn.execute('''
+                INSERT INTO response_cache_generations (tag, generation) VALUES (?, 1)
+                ON CONFLICT(tag) DO UPDATE SET generation = generation + 1
+            ''', (tag,))
+        conn.commit()
+        conn.close()
+
+
+class _MemoryStore:
+    """Per-process entries (single worker / local development)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.time():
+            return entry[2]
+        return None
+
+    def set(self, key, tag, generation, status, mimetype, body, etag, ttl):
+        with self._lock:
+            if self._generations.get(tag, 0) == generation:
+                self._entries[key] = (tag, time.time() + ttl, (status, mimetype, body, etag))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._entries = {key: entry for key, entry in self._entries.items() if entry[0] not in tags}
+
+
+if BACKEND == 'memory':
+    _store = _MemoryStore()
+elif BACKEND == 'off':
+    _store = None
+else:
+    _store = _SQLiteStore(DB_PATH)
+
+
+def cache_key():
+    """Route plus query args (sorted, so ?a=1&b=2 and ?b=2&a=1 share an entry)"""
+    args = sorted(request.args.items(multi=True))
+    return f"{request.path}?{urlencode(args)}" if args else request.path
+
+
+def _cached(status, mimetype, body, etag):
+    """Build a response from a stored entry, or a 304 if the client already has it"""
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        response = make_response(body, status)
+        response.mimetype = mimetype
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+
+def cached_response(tag, ttl=DEFAULT_TTL):
+    """Cache a GET view's 200 responses under `tag` until it is invalidated or `ttl` expires"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if _store is None or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = cache_key()
+            try:
+                entry = _store.get(key)
+                if entry:
+                    return _cached(*entry)
+                generation = _store.generation(tag)
+            except Exception as e:
+                print(f"[RESPONSE CACHE] Lookup failed for {key}: {e}")
+                return view(*args, **kwargs)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            try:
+                _store.set(key, tag, generation, response.status_code, response.mimetype, body, etag, ttl)
+            except Exception as e:
+                print(f"[RESPONSE CACHE] Store failed for {key}: {e}")
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Cache'] = 'MISS'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    """Drop every cached response for the given tags (all tags if none given)"""
+    if _store is None:
+        return
+    tags = tags or ALL_TAGS
+    try:
+        _store.invalidate(tags)
+    except Exception as e:
+        print(f"[RESPONSE CACHE] Invalidation of {', '.join(tags)} failed: {e}")
+
+
+def tags_for_write(path):
+    for prefix, tags in WRITE_INVALIDATIONS:
+        if path.startswith(prefix):
+            return tags
+    return ALL_TAGS
+
+
+def install_write_invalidation(app):
+    """Invalidate the affected tags after every successful POST/PUT/PATCH/DELETE"""
+    @app.after_request
+    def invalidate_after_write(response):
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+            tags = tags_for_write(request.path)
+            if tags:
+                invalidate(*tags)
+        return response
@@ -4,6 +4,9 @@ import os
 
 add_metal_bp = Blueprint('add_metal', __name__)
 
+# Module-level so test_query_plans.py checks exactly this query
+STANDARD_ASPECT_RATIO_SQL = "SELECT aspect_ratio_id FROM aspect_ratios WHERE display_name = 'Standard'"
+
 @add_metal_bp.route('/api/admin/add-metal-prints', methods=['POST'])
 def add_metal_prints():
     """Migration endpoint to add Metal prints to the database"""
@@ -40,7 +43,7 @@ def add_metal_prints():
         silver_subcategory_id = cursor.lastrowid
         
         # Get aspect ratio IDs by display_name
-        cursor.execute("SELECT aspect_ratio_id FROM aspect_ratios WHERE display_name = 'Standard'")
+        cursor.execute(STANDARD_ASPECT_RATIO_SQL)
         aspect_32_id = cursor.fetchone()[0]
         
         cursor.execute("SELECT aspect_ratio_id FROM aspect_ratios WHERE display_name = 'Square'")
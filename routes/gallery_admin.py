@@ -5,6 +5,7 @@ import os
 from functools import wraps
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from gallery_db import *
+from response_cache import cached_response, GALLERIES
 
 gallery_admin_bp = Blueprint('gallery_admin', __name__)
 
@@ -22,14 +23,10 @@ def gallery_admin_page():
     return render_template('gallery_admin.html')
 
 @gallery_admin_bp.route('/api/galleries', methods=['GET'])
+@cached_response(GALLERIES)
 def api_get_galleries():
-    """Get all galleries"""
-    galleries = get_all_galleries()
-    
-    # Add image count to each gallery
-    for gallery in galleries:
-        gallery['image_count'] = len(get_gallery_images(gallery['id']))
-    
+    """Get all galleries with image counts and hero thumbnails"""
+    galleries = get_gallery_summaries()
     return jsonify({'success': True, 'galleries': galleries})
 
 @gallery_admin_bp.route('/api/galleries', methods=['POST'])
@@ -83,6 +80,49 @@ def api_add_gallery_image(gallery_id):
     success = add_image_to_gallery(gallery_id, image_filename)
     return jsonify({'success': success})
 
+@gallery_admin_bp.route('/api/galleries/<int:gallery_id>/images', methods=['PUT'])
+def api_set_gallery_images(gallery_id):
+    """Replace a gallery's images with an ordered list in one transaction"""
+    data = request.json or {}
+    images = data.get('images')
+    
+    if not isinstance(images, list):
+        return jsonify({'success': False, 'error': 'images list required'}), 400
+    
+    count = set_gallery_images(gallery_id, images)
+    return jsonify({'success': True, 'count': count})
+
+@gallery_admin_bp.route('/api/galleries/<int:gallery_id>/reorder', methods=['POST'])
+def api_reorder_gallery_images(gallery_id):
+    """Rewrite display_order for a gallery from an ordered list of filenames"""
+    data = request.json or {}
+    images = data.get('images')
+    
+    if not isinstance(images, list):
+        return jsonify({'success': False, 'error': 'images list required'}), 400
+    
+    count = reorder_gallery_images(gallery_id, images)
+    return jsonify({'success': True, 'count': count})
+
+@gallery_admin_bp.route('/api/galleries/membership', methods=['POST'])
+def api_bulk_gallery_membership():
+    """
+    Apply many membership changes in one transaction.
+    Body: {"changes": [{"gallery_id": 1, "image_filename": "a.jpg", "action": "add", "display_order": 3}, ...]}
+    """
+    data = request.json or {}
+    changes = data.get('changes')
+    
+    if not isinstance(changes, list):
+        return jsonify({'success': False, 'error': 'changes list required'}), 400
+    for change in changes:
+        if not isinstance(change, dict) or not change.get('gallery_id') or not change.get('image_filename') \
+                or change.get('action', 'add') not in ('add', 'remove'):
+            return jsonify({'success': False, 'error': f'Invalid change: {change}'}), 400
+    
+    result = apply_gallery_membership_changes(changes)
+    return jsonify({'success': True, **result})
+
 @gallery_admin_bp.route('/api/galleries/<int:gallery_id>/images/<image_filename>', methods=['DELETE'])
 def api_remove_gallery_image(gallery_id, image_filename):
     """Remove image from gallery"""
@@ -0,0 +1,67 @@
+"""
+Fifth Element Photography - Background Jobs API
+Submit, monitor, cancel and resume long-running jobs (see job_runner.py)
+Version: 1.0.0
+"""
+
+from flask import Blueprint, request, jsonify, session
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from job_runner import submit_job, get_job, list_jobs, cancel_job, resume_job
+
+jobs_api_bp = Blueprint('jobs_api', __name__)
+
+@jobs_api_bp.before_request
+def require_admin_session():
+    """Jobs run bulk Shopify, Lumaprints and library operations: admins only"""
+    if not session.get('admin_authenticated'):
+        return jsonify({'success': False, 'error': 'Admin authentication required'}), 401
+
+@jobs_api_bp.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    """List recent jobs, optionally filtered by ?type="""
+    try:
+        limit = int(request.args.get('limit', 50))
+        jobs = list_jobs(request.args.get('type'), limit)
+        return jsonify({'success': True, 'jobs': jobs})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_api_bp.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """Queue a job: {"type": "shopify_price_sync", "params": {...}}"""
+    data = request.json or {}
+    job_type = data.get('type')
+    if not job_type:
+        return jsonify({'success': False, 'error': 'Job type required'}), 400
+
+    try:
+        job_id = submit_job(job_type, data.get('params', {}))
+        return jsonify({'success': True, 'job_id': job_id}), 202
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_api_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Job progress; pass ?items=1 for per-item checkpoints"""
+    job = get_job(job_id, include_items=request.args.get('items') in ('1', 'true'))
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@jobs_api_bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """Cancel a queued job, or stop a running one after its current item"""
+    if not cancel_job(job_id):
+        return jsonify({'success': False, 'error': 'Job is not queued or running'}), 409
+    return jsonify({'success': True, 'job': get_job(job_id)})
+
+@jobs_api_bp.route('/api/jobs/<job_id>/resume', methods=['POST'])
+def api_resume_job(job_id):
+    """Re-queue a cancelled or failed job from its last checkpoint"""
+    if not resume_job(job_id):
+        return jsonify({'success': False, 'error': 'Job cannot be resumed'}), 409
+    return jsonify({'success': True, 'job': get_job(job_id)})
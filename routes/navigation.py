@@ -10,6 +10,8 @@ from navigation_db import (
     get_visible_nav_tree
 )
 from gallery_db import get_all_galleries
+from navigation_helpers import invalidate_navigation
+from response_cache import cached_response, NAVIGATION
 
 navigation_bp = Blueprint('navigation', __name__)
 
@@ -23,6 +25,7 @@ def get_nav_items():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @navigation_bp.route('/api/navigation/items/visible', methods=['GET'])
+@cached_response(NAVIGATION)
 def get_visible_items():
     """Get only visible navigation items"""
     try:
@@ -47,6 +50,7 @@ def create_nav_item():
             return jsonify({'success': False, 'error': 'Name is required'}), 400
         
         item_id = add_nav_item(name, item_type, parent_id, gallery_id, url, order_index)
+        invalidate_navigation()
         return jsonify({'success': True, 'id': item_id})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -63,6 +67,7 @@ def update_item(item_id):
         url = data.get('url')
         
         update_nav_item(item_id, name, parent_id, order_index, visible, url)
+        invalidate_navigation()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -72,6 +77,7 @@ def delete_item(item_id):
     """Delete a navigation item"""
     try:
         delete_nav_item(item_id)
+        invalidate_navigation()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -84,6 +90,7 @@ def reorder_items():
         item_orders = data.get('items', [])
         
         reorder_nav_items(item_orders)
+        invalidate_navigation()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -4,7 +4,6 @@ This is useful when the REPLACE tool doesn't properly regenerate the gallery ima
 """
 from flask import jsonify
 import os
-from PIL import Image
 
 def register_regenerate_gallery_image_route(app, require_admin_auth, IMAGES_FOLDER):
     """Register the force regenerate gallery image route"""
@@ -25,45 +24,10 @@ def register_regenerate_gallery_image_route(app, require_admin_auth, IMAGES_FOLD
             if not os.path.exists(original_path):
                 return jsonify({'success': False, 'error': 'Original image not found'}), 404
             
-            # Create gallery-images directory if it doesn't exist
-            os.makedirs('/data/gallery-images', exist_ok=True)
-            gallery_path = os.path.join('/data/gallery-images', filename)
-            
-            print(f"[REGENERATE] Original path: {original_path}")
-            print(f"[REGENERATE] Gallery path: {gallery_path}")
-            
-            # Delete existing gallery image if it exists
-            if os.path.exists(gallery_path):
-                os.remove(gallery_path)
-                print(f"[REGENERATE] Deleted existing gallery image")
-            
-            # Open and process original image
-            with Image.open(original_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Get original dimensions
-                orig_width, orig_height = img.size
-                print(f"[REGENERATE] Original dimensions: {orig_width}x{orig_height}")
-                
-                # Calculate new dimensions (max 1200px on longest side)
-                max_dimension = 1200
-                if orig_width > orig_height:
-                    new_width = max_dimension
-                    new_height = int((max_dimension / orig_width) * orig_height)
-                else:
-                    new_height = max_dimension
-                    new_width = int((max_dimension / orig_height) * orig_width)
-                
-                print(f"[REGENERATE] New dimensions: {new_width}x{new_height}")
-                
-                # Resize image with high quality
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Save gallery image with good quality
-                img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-                print(f"[REGENERATE] ✓ Successfully saved gallery image")
+            # Rebuild it from the original, re-applying the image's saved watermark settings
+            import gallery_renditions
+            gallery_path = gallery_renditions.regenerate_gallery_image(filename, images_folder=IMAGES_FOLDER)
+            print(f"[REGENERATE] ✓ Successfully saved gallery image")
             
             # Verify the file was created
             if os.path.exists(gallery_path):
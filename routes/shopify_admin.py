@@ -12,6 +12,9 @@ from functools import wraps
 
 shopify_admin_bp = Blueprint('shopify_admin', __name__, url_prefix='/admin')
 
+# Module-level so test_query_plans.py checks exactly this query
+PRODUCT_MAPPINGS_SQL = 'SELECT category, shopify_product_id FROM shopify_products WHERE image_filename = ?'
+
 PRODUCT_CATEGORIES = [
     'Metal',
     'Canvas',
@@ -140,7 +143,7 @@ def save_shopify_mapping():
     
     try:
         # Get existing mappings to preserve shopify_product_id
-        cursor.execute('SELECT category, shopify_product_id FROM shopify_products WHERE image_filename = ?', (image_filename,))
+        cursor.execute(PRODUCT_MAPPINGS_SQL, (image_filename,))
         existing_rows = cursor.fetchall()
         existing_ids = {row['category']: row['shopify_product_id'] for row in existing_rows}
         
@@ -7,18 +7,17 @@ Version: 1.0.0
 from flask import Blueprint, request, jsonify
 import sqlite3
 import os
-import requests
+from shopify_client import get_shopify_client
+from shopify_media import get_product_image
+from job_runner import register_job_type, submit_job
 import json
-import base64
+from shopify_catalog import (
+    ensure_catalog_snapshot, refresh_catalog_snapshot, get_catalog_products,
+    get_catalog_product, update_catalog_variant_price, upsert_catalog_product
+)
 
 shopify_api_creator_bp = Blueprint('shopify_api_creator', __name__)
 
-# Shopify API credentials from environment
-SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'fifth-element-photography.myshopify.com')
-SHOPIFY_API_KEY = os.environ.get('SHOPIFY_API_KEY', '')
-SHOPIFY_API_SECRET = os.environ.get('SHOPIFY_API_SECRET', '')
-SHOPIFY_API_VERSION = '2024-01'
-
 # Database path
 if os.path.exists('/data'):
     DB_PATH = '/data/print_ordering.db'
@@ -27,6 +26,61 @@ else:
     DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'database', 'print_ordering.db')
     IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'static', 'images')
 
+# Pricing queries (module-level so test_query_plans.py checks exactly these)
+GLOBAL_MARKUP_SQL = """
+SELECT markup_value FROM markup_rules
+WHERE rule_type = 'global' AND is_active = TRUE
+LIMIT 1
+"""
+
+UNFRAMED_PRICING_SQL = """
+SELECT
+    ps.display_name as product_type,
+    pz.size_name,
+    bp.cost_price,
+    NULL as frame_option
+FROM base_pricing bp
+JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
+JOIN product_categories pc ON ps.category_id = pc.category_id
+JOIN print_sizes pz ON bp.size_id = pz.size_id
+JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
+WHERE bp.is_available = TRUE
+AND ar.display_name = ?
+AND pc.display_name IN ('Canvas', 'Fine Art Paper', 'Foam-mounted Fine Art Paper', 'Metal')
+ORDER BY
+    CASE pc.display_name
+        WHEN 'Fine Art Paper' THEN 1
+        WHEN 'Canvas' THEN 2
+        WHEN 'Foam-mounted Fine Art Paper' THEN 3
+        WHEN 'Metal' THEN 4
+    END,
+    ps.display_order,
+    pz.width,
+    pz.height
+"""
+
+FRAMED_PRICING_SQL = """
+SELECT
+    ps.display_name as product_type,
+    pz.size_name,
+    bp.cost_price
+FROM base_pricing bp
+JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
+JOIN print_sizes pz ON bp.size_id = pz.size_id
+JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
+WHERE bp.is_available = TRUE
+AND ar.display_name = ?
+AND ps.display_name = ?
+ORDER BY pz.width, pz.height
+"""
+
+FRAME_PRICE_SQL = """
+SELECT op.cost_price
+FROM option_pricing op
+JOIN product_options po ON op.option_id = po.option_id
+WHERE po.option_name = ?
+"""
+
 def ensure_shopify_products_table():
     """Ensure shopify_products table exists"""
     conn = sqlite3.connect(DB_PATH)
@@ -131,9 +185,314 @@ def detect_aspect_ratio(image_filename):
         print(f"Error detecting aspect ratio for {image_filename}: {e}")
         return 'Standard'
 
+_storefront_publication_id = None
+
+def get_storefront_publication_id():
+    """Look up the Storefront API publication (app_id 580111) once per process"""
+    global _storefront_publication_id
+    if _storefront_publication_id is None:
+        pub_response = get_shopify_client().get('publications.json')
+        if pub_response.status_code == 200:
+            publications = pub_response.json().get('publications', [])
+            storefront_pub = next((p for p in publications if p.get('app_id') == 580111), None)
+            if storefront_pub:
+                _storefront_publication_id = storefront_pub['id']
+    return _storefront_publication_id
+
+def get_markup_multiplier(cursor):
+    """Global markup rule as a price multiplier (100% markup if none is active)"""
+    cursor.execute(GLOBAL_MARKUP_SQL)
+    markup_row = cursor.fetchone()
+    global_markup = markup_row[0] if markup_row else 100.0
+    return 1 + (global_markup / 100)
+
+def create_products_for_image(conn, filename, image_titles, image_descriptions, markup_multiplier,
+                              created_products, errors, skip_mapped=False):
+    """
+    Create one Shopify product per category for a single image.
+    Appends created titles / error messages to the given lists.
+    With skip_mapped, categories that already have a product in shopify_products
+    are left alone, so re-running after a partial failure only creates the rest.
+    """
+    cursor = conn.cursor()
+    
+    # Use saved title from database, or generate from filename
+    if filename in image_titles:
+        title = image_titles[filename]
+    else:
+        # Generate clean title from filename as fallback
+        title = filename.replace('-', ' ').replace('_', ' ')
+        title = os.path.splitext(title)[0]
+        title = ' '.join(word.capitalize() for word in title.split())
+    handle = slugify(title)
+    
+    # Load description for this image
+    description = image_descriptions.get(filename, '')
+    
+    aspect_ratio = detect_aspect_ratio(filename)
+    
+    # Query pricing for unframed products
+    cursor.execute(UNFRAMED_PRICING_SQL, (aspect_ratio,))
+    
+    pricing_data = list(cursor.fetchall())
+    
+    # Add framed canvas options with flattened frame colors
+    framed_canvas_config = [
+        ('0.75" Framed Canvas', [
+            ('Black', 'black_floating_075'),
+            ('White', 'white_floating_075'),
+            ('Silver', 'silver_floating_075'),
+            ('Gold', 'gold_plein_air'),
+        ]),
+        ('1.25" Framed Canvas', [
+            ('Black', 'black_floating_125'),
+            ('Natural Oak', 'oak_floating_125'),
+            ('Walnut', 'walnut_floating_125'),
+        ]),
+        ('1.50" Framed Canvas', [
+            ('Black', 'black_floating_150'),
+            ('White', 'white_floating_150'),
+            ('Oak', 'oak_floating_150'),
+        ]),
+    ]
+    
+    for canvas_type, frame_colors in framed_canvas_config:
+        # Get base pricing for this framed canvas type
+        cursor.execute(FRAMED_PRICING_SQL, (aspect_ratio, canvas_type))
+        
+        base_framed_pricing = cursor.fetchall()
+        
+        # For each frame color, add variants with the frame color in the name
+        for color_name, option_name in frame_colors:
+            # Get frame price adjustment (if any)
+            cursor.execute(FRAME_PRICE_SQL, (option_name,))
+            
+            frame_row = cursor.fetchone()
+            frame_adjustment = float(frame_row[0]) if frame_row and frame_row[0] else 0.0
+            
+            # Add pricing data with flattened frame color name
+            for row in base_framed_pricing:
+                pricing_data.append({
+                    'product_type': f"{canvas_type} {color_name}",
+                    'size_name': row['size_name'],
+                    'cost_price': row['cost_price'] + frame_adjustment,
+                    'frame_option': color_name
+                })
+    
+    if not pricing_data:
+        errors.append(f"{filename}: No pricing data found")
+        return
+    
+    # Group pricing data by category
+    categories = {
+        'Canvas': [],
+        'Framed Canvas': [],
+        'Fine Art Paper': [],
+        'Foam-mounted Print': [],
+        'Metal': []
+    }
+    
+    for row in pricing_data:
+        db_prod_type = row['product_type']
+        
+        # Determine category
+        if 'Framed Canvas' in db_prod_type:
+            category = 'Framed Canvas'
+        elif 'Canvas' in db_prod_type:
+            category = 'Canvas'
+        elif 'Fine Art Paper' in db_prod_type:
+            category = 'Fine Art Paper'
+        elif 'Foam-mounted' in db_prod_type:
+            category = 'Foam-mounted Print'
+        elif 'Metal' in db_prod_type:
+            category = 'Metal'
+        else:
+            continue
+        
+        categories[category].append(row)
+    
+    # Prepare image for upload
+    image_path = os.path.join(IMAGES_FOLDER, filename)
+    
+    # Check if image exists and is under 20MB
+    if os.path.exists(image_path):
+        file_size_mb = os.path.getsize(image_path) / (1024 * 1024)
+        if file_size_mb <= 20:
+            # Uploaded once (cached per content hash) and shared by every category product
+            image_attachment = get_product_image(filename, image_path, alt=title)
+        else:
+            errors.append(f"{filename}: Image size ({file_size_mb:.1f}MB) exceeds 20MB limit")
+            return
+    else:
+        errors.append(f"{filename}: Image file not found")
+        return
+    
+    mapped = set()
+    if skip_mapped:
+        cursor.execute('SELECT category FROM shopify_products WHERE image_filename = ?', (filename,))
+        mapped = {row[0] for row in cursor.fetchall()}
+    
+    # Create separate products for each category
+    for category_name, category_data in categories.items():
+        if not category_data:
+            continue  # Skip empty categories
+        if category_name in mapped:
+            print(f"{filename}: {category_name} product already exists, skipping")
+            continue
+        
+        # Build variants for this category
+        variants = []
+        product_types = set()
+        sizes = set()
+        
+        for row in category_data:
+            db_prod_type = row['product_type']
+            shopify_prod_type = map_product_type_to_shopify(db_prod_type)
+            
+            if shopify_prod_type is None:
+                shopify_prod_type = db_prod_type  # Use as-is if no mapping
+            
+            size = row['size_name'].strip('"')
+            price = round(row['cost_price'] * markup_multiplier, 2)
+            
+            # Remove quotes from product type names
+            shopify_prod_type_clean = shopify_prod_type.replace('"', '')
+            
+            product_types.add(shopify_prod_type_clean)
+            sizes.add(size)
+            
+            variants.append({
+                'option1': f'Printed Product - {shopify_prod_type_clean}',
+                'option2': f'Size - {size}',
+                'price': str(price),
+                'inventory_quantity': 10,
+                'inventory_management': 'shopify'
+            })
+        
+        # Create product title and handle for this category
+        category_title = f"{title} - {category_name}"
+        category_handle = f"{handle}-{slugify(category_name)}"
+        
+        # Create product via Shopify API
+        product_data = {
+            'product': {
+                'title': category_title,
+                'body_html': description,  # Use image description
+                'handle': category_handle,
+                'vendor': 'Lumaprints',
+                'product_type': 'Prints',  # Set category to Prints
+                'status': 'active',
+                'options': [
+                    {'name': 'Printed Product', 'values': sorted([f'Printed Product - {pt}' for pt in product_types])},
+                    {'name': 'Size', 'values': sorted([f'Size - {s}' for s in sizes])}
+                ],
+                'variants': variants,
+                'images': [image_attachment] if image_attachment else []
+            }
+        }
+        
+        # Make API request
+        client = get_shopify_client()
+        response = client.post('products.json', json=product_data, timeout=120)
+        
+        print(f"Shopify API Response Status: {response.status_code}")
+        print(f"Shopify API Response: {response.text}")
+        
+        if response.status_code == 201:
+            created_products.append(category_title)
+            
+            # Extract Shopify product ID and handle from response
+            response_data = response.json()
+            shopify_product_id = str(response_data['product']['id'])
+            actual_handle = response_data['product']['handle']  # Use actual handle from Shopify
+            
+            # Publish product to Storefront API sales channel
+            try:
+                storefront_pub_id = get_storefront_publication_id()
+                
+                if storefront_pub_id:
+                    # Publish product to Storefront API channel
+                    publish_data = {
+                        'resource_publication': {
+                            'resource_id': shopify_product_id,
+                            'resource_type': 'Product',
+                            'published': True
+                        }
+                    }
+                    publish_response = client.post(f'publications/{storefront_pub_id}/resource_publications.json', json=publish_data)
+                    if publish_response.status_code in [200, 201]:
+                        print(f"✓ Published {category_title} to Storefront API")
+                    else:
+                        print(f"⚠ Failed to publish {category_title} to Storefront API: {publish_response.text}")
+                else:
+                    print(f"⚠ Storefront API publication not found")
+            except Exception as pub_error:
+                print(f"⚠ Error publishing to Storefront API: {pub_error}")
+                # Don't fail the whole operation if publishing fails
+            
+            # Save to database for tracking with category column
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO shopify_products (image_filename, category, shopify_product_id, shopify_handle)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(image_filename, category) DO UPDATE SET
+                    shopify_product_id = excluded.shopify_product_id,
+                    shopify_handle = excluded.shopify_handle,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (filename, category_name, shopify_product_id, actual_handle))
+            conn.commit()
+            
+            # Add it to the catalog snapshot so price sync and cleanup see it before the next export
+            try:
+                upsert_catalog_product(response_data['product'])
+            except Exception as snapshot_error:
+                print(f"⚠ Could not add {category_title} to the catalog snapshot: {snapshot_error}")
+        else:
+            error_msg = f"{category_title}: HTTP {response.status_code} - {response.text}"
+            print(f"ERROR: {error_msg}")
+            errors.append(error_msg)
+
+# Background job: one checkpointed item per image, so a restart never recreates finished images.
+# An image with any failed category fails its item; retrying it only creates the missing categories.
+
+def _plan_create_products(params):
+    return [(filename, None) for filename in dict.fromkeys(params.get('filenames', []))]
+
+def _setup_create_products(params):
+    conn = get_db()
+    try:
+        markup_multiplier = get_markup_multiplier(conn.cursor())
+    finally:
+        conn.close()
+    return {
+        'image_titles': load_image_titles(),
+        'image_descriptions': load_image_descriptions(),
+        'markup_multiplier': markup_multiplier
+    }
+
+def _process_create_products(params, context, item_key, payload):
+    created_products = []
+    errors = []
+    conn = get_db()
+    try:
+        create_products_for_image(conn, item_key, context['image_titles'], context['image_descriptions'],
+                                  context['markup_multiplier'], created_products, errors, skip_mapped=True)
+    finally:
+        conn.close()
+    if errors:
+        created = f" (created: {', '.join(created_products)})" if created_products else ''
+        raise RuntimeError(('; '.join(errors) + created)[:1000])
+    return {'created': created_products, 'errors': errors}
+
+register_job_type('shopify_create_products', _plan_create_products, _process_create_products,
+                  setup=_setup_create_products)
+
 @shopify_api_creator_bp.route('/api/shopify/create-product', methods=['POST'])
 def create_shopify_product():
-    """Create Shopify product directly via API"""
+    """
+    Create Shopify product directly via API.
+    Send "background": true to create them as a resumable job (one item per image).
+    """
     try:
         data = request.json
         images = data.get('images', [])
@@ -141,6 +500,11 @@ def create_shopify_product():
         if not images:
             return jsonify({'success': False, 'error': 'No images selected'}), 400
         
+        if data.get('background'):
+            filenames = [image.get('filename') for image in images if image.get('filename')]
+            job_id = submit_job('shopify_create_products', {'filenames': filenames})
+            return jsonify({'success': True, 'job_id': job_id}), 202
+        
         conn = get_db()
         cursor = conn.cursor()
         
@@ -149,302 +513,14 @@ def create_shopify_product():
         image_descriptions = load_image_descriptions()
         
         # Get global markup
-        cursor.execute("""
-            SELECT markup_value FROM markup_rules 
-            WHERE rule_type = 'global' AND is_active = TRUE 
-            LIMIT 1
-        """)
-        markup_row = cursor.fetchone()
-        global_markup = markup_row[0] if markup_row else 100.0
-        markup_multiplier = 1 + (global_markup / 100)
+        markup_multiplier = get_markup_multiplier(cursor)
         
         created_products = []
         errors = []
         
         for image in images:
-            filename = image.get('filename')
-            # Use saved title from database, or generate from filename
-            if filename in image_titles:
-                title = image_titles[filename]
-            else:
-                # Generate clean title from filename as fallback
-                title = filename.replace('-', ' ').replace('_', ' ')
-                title = os.path.splitext(title)[0]
-                title = ' '.join(word.capitalize() for word in title.split())
-            handle = slugify(title)
-            
-            # Load description for this image
-            description = image_descriptions.get(filename, '')
-            
-            aspect_ratio = detect_aspect_ratio(filename)
-            
-            # Query pricing for unframed products
-            cursor.execute("""
-                SELECT 
-                    ps.display_name as product_type,
-                    pz.size_name,
-                    bp.cost_price,
-                    NULL as frame_option
-                FROM base_pricing bp
-                JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
-                JOIN product_categories pc ON ps.category_id = pc.category_id
-                JOIN print_sizes pz ON bp.size_id = pz.size_id
-                JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
-                WHERE bp.is_available = TRUE
-                AND ar.display_name = ?
-                AND pc.display_name IN ('Canvas', 'Fine Art Paper', 'Foam-mounted Fine Art Paper', 'Metal')
-                ORDER BY 
-                    CASE pc.display_name 
-                        WHEN 'Fine Art Paper' THEN 1 
-                        WHEN 'Canvas' THEN 2 
-                        WHEN 'Foam-mounted Fine Art Paper' THEN 3
-                        WHEN 'Metal' THEN 4
-                    END,
-                    ps.display_order, 
-                    pz.width, 
-                    pz.height
-            """, (aspect_ratio,))
-            
-            pricing_data = list(cursor.fetchall())
-            
-            # Add framed canvas options with flattened frame colors
-            framed_canvas_config = [
-                ('0.75" Framed Canvas', [
-                    ('Black', 'black_floating_075'),
-                    ('White', 'white_floating_075'),
-                    ('Silver', 'silver_floating_075'),
-                    ('Gold', 'gold_plein_air'),
-                ]),
-                ('1.25" Framed Canvas', [
-                    ('Black', 'black_floating_125'),
-                    ('Natural Oak', 'oak_floating_125'),
-                    ('Walnut', 'walnut_floating_125'),
-                ]),
-                ('1.50" Framed Canvas', [
-                    ('Black', 'black_floating_150'),
-                    ('White', 'white_floating_150'),
-                    ('Oak', 'oak_floating_150'),
-                ]),
-            ]
-            
-            for canvas_type, frame_colors in framed_canvas_config:
-                # Get base pricing for this framed canvas type
-                cursor.execute("""
-                    SELECT 
-                        ps.display_name as product_type,
-                        pz.size_name,
-                        bp.cost_price
-                    FROM base_pricing bp
-                    JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
-                    JOIN print_sizes pz ON bp.size_id = pz.size_id
-                    JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
-                    WHERE bp.is_available = TRUE
-                    AND ar.display_name = ?
-                    AND ps.display_name = ?
-                    ORDER BY pz.width, pz.height
-                """, (aspect_ratio, canvas_type))
-                
-                base_framed_pricing = cursor.fetchall()
-                
-                # For each frame color, add variants with the frame color in the name
-                for color_name, option_name in frame_colors:
-                    # Get frame price adjustment (if any)
-                    cursor.execute("""
-                        SELECT op.cost_price
-                        FROM option_pricing op
-                        JOIN product_options po ON op.option_id = po.option_id
-                        WHERE po.option_name = ?
-                    """, (option_name,))
-                    
-                    frame_row = cursor.fetchone()
-                    frame_adjustment = float(frame_row[0]) if frame_row and frame_row[0] else 0.0
-                    
-                    # Add pricing data with flattened frame color name
-                    for row in base_framed_pricing:
-                        pricing_data.append({
-                            'product_type': f"{canvas_type} {color_name}",
-                            'size_name': row['size_name'],
-                            'cost_price': row['cost_price'] + frame_adjustment,
-                            'frame_option': color_name
-                        })
-            
-            if not pricing_data:
-                errors.append(f"{filename}: No pricing data found")
-                continue
-            
-            # Group pricing data by category
-            categories = {
-                'Canvas': [],
-                'Framed Canvas': [],
-                'Fine Art Paper': [],
-                'Foam-mounted Print': [],
-                'Metal': []
-            }
-            
-            for row in pricing_data:
-                db_prod_type = row['product_type']
-                
-                # Determine category
-                if 'Framed Canvas' in db_prod_type:
-                    category = 'Framed Canvas'
-                elif 'Canvas' in db_prod_type:
-                    category = 'Canvas'
-                elif 'Fine Art Paper' in db_prod_type:
-                    category = 'Fine Art Paper'
-                elif 'Foam-mounted' in db_prod_type:
-                    category = 'Foam-mounted Print'
-                elif 'Metal' in db_prod_type:
-                    category = 'Metal'
-                else:
-                    continue
-                
-                categories[category].append(row)
-            
-            # Prepare image for upload
-            image_path = os.path.join(IMAGES_FOLDER, filename)
-            image_attachment = None
-            
-            # Check if image exists and is under 20MB
-            if os.path.exists(image_path):
-                file_size_mb = os.path.getsize(image_path) / (1024 * 1024)
-                if file_size_mb <= 20:
-                    # Read image and encode as base64
-                    with open(image_path, 'rb') as img_file:
-                        image_data = base64.b64encode(img_file.read()).decode('utf-8')
-                        image_attachment = {
-                            'attachment': image_data,
-                            'filename': filename
-                        }
-                else:
-                    errors.append(f"{filename}: Image size ({file_size_mb:.1f}MB) exceeds 20MB limit")
-                    continue
-            else:
-                errors.append(f"{filename}: Image file not found")
-                continue
-            
-            # Create separate products for each category
-            for category_name, category_data in categories.items():
-                if not category_data:
-                    continue  # Skip empty categories
-                
-                # Build variants for this category
-                variants = []
-                product_types = set()
-                sizes = set()
-                
-                for row in category_data:
-                    db_prod_type = row['product_type']
-                    shopify_prod_type = map_product_type_to_shopify(db_prod_type)
-                    
-                    if shopify_prod_type is None:
-                        shopify_prod_type = db_prod_type  # Use as-is if no mapping
-                    
-                    size = row['size_name'].strip('"')
-                    price = round(row['cost_price'] * markup_multiplier, 2)
-                    
-                    # Remove quotes from product type names
-                    shopify_prod_type_clean = shopify_prod_type.replace('"', '')
-                    
-                    product_types.add(shopify_prod_type_clean)
-                    sizes.add(size)
-                    
-                    variants.append({
-                        'option1': f'Printed Product - {shopify_prod_type_clean}',
-                        'option2': f'Size - {size}',
-                        'price': str(price),
-                        'inventory_quantity': 10,
-                        'inventory_management': 'shopify'
-                    })
-                
-                # Create product title and handle for this category
-                category_title = f"{title} - {category_name}"
-                category_handle = f"{handle}-{slugify(category_name)}"
-                
-                # Create product via Shopify API
-                product_data = {
-                    'product': {
-                        'title': category_title,
-                        'body_html': description,  # Use image description
-                        'handle': category_handle,
-                        'vendor': 'Lumaprints',
-                        'product_type': 'Prints',  # Set category to Prints
-                        'status': 'active',
-                        'options': [
-                            {'name': 'Printed Product', 'values': sorted([f'Printed Product - {pt}' for pt in product_types])},
-                            {'name': 'Size', 'values': sorted([f'Size - {s}' for s in sizes])}
-                        ],
-                        'variants': variants,
-                        'images': [image_attachment] if image_attachment else []
-                    }
-                }
-                
-                # Make API request
-                url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products.json'
-                headers = {
-                    'Content-Type': 'application/json',
-                    'X-Shopify-Access-Token': SHOPIFY_API_SECRET
-                }
-                
-                response = requests.post(url, headers=headers, json=product_data)
-                
-                print(f"Shopify API Response Status: {response.status_code}")
-                print(f"Shopify API Response: {response.text}")
-                
-                if response.status_code == 201:
-                    created_products.append(category_title)
-                    
-                    # Extract Shopify product ID and handle from response
-                    response_data = response.json()
-                    shopify_product_id = str(response_data['product']['id'])
-                    actual_handle = response_data['product']['handle']  # Use actual handle from Shopify
-                    
-                    # Publish product to Storefront API sales channel
-                    try:
-                        # Get the publication ID for the Storefront API channel
-                        publications_url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/publications.json'
-                        pub_response = requests.get(publications_url, headers=headers)
-                        
-                        if pub_response.status_code == 200:
-                            publications = pub_response.json().get('publications', [])
-                            # Find the Storefront API publication (app_id: 580111)
-                            storefront_pub = next((p for p in publications if p.get('app_id') == 580111), None)
-                            
-                            if storefront_pub:
-                                # Publish product to Storefront API channel
-                                publish_url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/publications/{storefront_pub["id"]}/resource_publications.json'
-                                publish_data = {
-                                    'resource_publication': {
-                                        'resource_id': shopify_product_id,
-                                        'resource_type': 'Product',
-                                        'published': True
-                                    }
-                                }
-                                publish_response = requests.post(publish_url, headers=headers, json=publish_data)
-                                if publish_response.status_code in [200, 201]:
-                                    print(f"✓ Published {category_title} to Storefront API")
-                                else:
-                                    print(f"⚠ Failed to publish {category_title} to Storefront API: {publish_response.text}")
-                            else:
-                                print(f"⚠ Storefront API publication not found")
-                    except Exception as pub_error:
-                        print(f"⚠ Error publishing to Storefront API: {pub_error}")
-                        # Don't fail the whole operation if publishing fails
-                    
-                    # Save to database for tracking with category column
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        INSERT INTO shopify_products (image_filename, category, shopify_product_id, shopify_handle)
-                        VALUES (?, ?, ?, ?)
-                        ON CONFLICT(image_filename, category) DO UPDATE SET
-                            shopify_product_id = excluded.shopify_product_id,
-                            shopify_handle = excluded.shopify_handle,
-                            updated_at = CURRENT_TIMESTAMP
-                    """, (filename, category_name, shopify_product_id, actual_handle))
-                    conn.commit()
-                else:
-                    error_msg = f"{category_title}: HTTP {response.status_code} - {response.text}"
-                    print(f"ERROR: {error_msg}")
-                    errors.append(error_msg)
+            create_products_for_image(conn, image.get('filename'), image_titles, image_descriptions,
+                                      markup_multiplier, created_products, errors)
         
         conn.close()
         
@@ -485,6 +561,8 @@ def sync_shopify_prices():
         if not shopify_products:
             return jsonify({'success': False, 'error': 'No Shopify products found in database'})
         
+        ensure_catalog_snapshot()
+        
         updated_count = 0
         skipped_count = 0
         errors = []
@@ -567,30 +645,12 @@ def sync_shopify_prices():
                 ]
                 
                 for canvas_type, frame_colors in framed_canvas_config:
-                    cursor.execute("""
-                        SELECT 
-                            ps.display_name as product_type,
-                            pz.size_name,
-                            bp.cost_price
-                        FROM base_pricing bp
-                        JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
-                        JOIN print_sizes pz ON bp.size_id = pz.size_id
-                        JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
-                        WHERE bp.is_available = TRUE
-                        AND ar.display_name = ?
-                        AND ps.display_name = ?
-                        ORDER BY pz.width, pz.height
-                    """, (aspect_ratio, canvas_type))
+                    cursor.execute(FRAMED_PRICING_SQL, (aspect_ratio, canvas_type))
                     
                     base_framed_pricing = cursor.fetchall()
                     
                     for color_name, option_name in frame_colors:
-                        cursor.execute("""
-                            SELECT op.cost_price
-                            FROM option_pricing op
-                            JOIN product_options po ON op.option_id = po.option_id
-                            WHERE po.option_name = ?
-                        """, (option_name,))
+                        cursor.execute(FRAME_PRICE_SQL, (option_name,))
                         
                         frame_row = cursor.fetchone()
                         frame_adjustment = float(frame_row[0]) if frame_row and frame_row[0] else 0.0
@@ -602,23 +662,18 @@ def sync_shopify_prices():
                                 'cost_price': row['cost_price'] + frame_adjustment
                             })
                 
-                # Get Shopify product variants
-                url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products/{shopify_product_id}.json'
-                headers = {
-                    'X-Shopify-Access-Token': SHOPIFY_API_SECRET
-                }
+                # Get Shopify product variants from the local catalog snapshot
+                shopify_product = get_catalog_product(shopify_product_id)
                 
-                response = requests.get(url, headers=headers)
-                
-                if response.status_code != 200:
-                    errors.append(f"{image_filename}: Failed to fetch from Shopify (HTTP {response.status_code})")
+                if not shopify_product:
+                    errors.append(f"{image_filename}: Product {shopify_product_id} not in catalog snapshot")
                     skipped_count += 1
                     continue
                 
-                shopify_product = response.json()['product']
                 variants = shopify_product.get('variants', [])
                 
-                # Update each variant's price
+                # Match each variant's price, then update them on the shared client's worker pool
+                pending_updates = []
                 for variant in variants:
                     variant_id = variant['id']
                     option1 = variant.get('option1', '')  # Product type
@@ -641,19 +696,27 @@ def sync_shopify_prices():
                     if matching_price is None:
                         continue  # Skip variants with no matching price
                     
-                    # Update variant price via API
-                    update_url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/variants/{variant_id}.json'
+                    pending_updates.append((variant_id, matching_price))
+                
+                client = get_shopify_client()
+                
+                def update_variant_price(pending):
+                    variant_id, matching_price = pending
                     update_data = {
                         'variant': {
                             'id': variant_id,
                             'price': str(matching_price)
                         }
                     }
-                    
-                    update_response = requests.put(update_url, headers=headers, json=update_data)
-                    
-                    if update_response.status_code == 200:
+                    return client.put(f'variants/{variant_id}.json', json=update_data)
+                
+                results = client.map_concurrent(update_variant_price, pending_updates)
+                for (variant_id, matching_price), update_response in zip(pending_updates, results):
+                    if isinstance(update_response, Exception):
+                        errors.append(f"{image_filename} variant {variant_id}: {update_response}")
+                    elif update_response.status_code == 200:
                         updated_count += 1
+                        update_catalog_variant_price(variant_id, matching_price)
                     else:
                         errors.append(f"{image_filename} variant {variant_id}: HTTP {update_response.status_code}")
                 
@@ -726,31 +789,9 @@ def sync_shopify_products():
     This refreshes the LIVE status badges in the admin panel
     """
     try:
-        # Fetch all products from Shopify
-        url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products.json?limit=250'
-        auth = (SHOPIFY_API_KEY, SHOPIFY_API_SECRET)
-        
-        all_products = []
-        while url:
-            response = requests.get(url, auth=auth)
-            if response.status_code != 200:
-                return jsonify({
-                    'success': False,
-                    'error': f'Shopify API error: {response.status_code}'
-                }), 500
-            
-            data = response.json()
-            all_products.extend(data.get('products', []))
-            
-            # Check for pagination
-            link_header = response.headers.get('Link', '')
-            url = None
-            if 'rel="next"' in link_header:
-                # Extract next URL from Link header
-                for link in link_header.split(','):
-                    if 'rel="next"' in link:
-                        url = link.split(';')[0].strip('<> ')
-                        break
+        # Fetch all products from the catalog snapshot (refreshed via bulk export)
+        refresh_catalog_snapshot()
+        all_products = get_catalog_products()
         
         # Clear existing shopify_products table
         conn = sqlite3.connect(DB_PATH)
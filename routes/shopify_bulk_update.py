@@ -1,13 +1,91 @@
-from flask import Blueprint, jsonify, render_template
-import requests
-import time
-import os
+from flask import Blueprint, request, jsonify, render_template
+from shopify_client import get_shopify_client
+from shopify_catalog import ensure_catalog_snapshot, iter_catalog_products, get_catalog_product, update_catalog_product_options
+from job_runner import register_job_type, submit_job
 
 shopify_bulk_update_bp = Blueprint('shopify_bulk_update', __name__, url_prefix='/admin')
 
-SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'fifth-element-photography.myshopify.com')
-SHOPIFY_API_SECRET = os.environ.get('SHOPIFY_API_SECRET', '')
-SHOPIFY_API_VERSION = '2024-01'
+def build_quote_removal(product):
+    """Return (product_id, title, updated_options, updated_variants) if the product has quoted option values, else None"""
+    product_id = product['id']
+    product_title = product['title']
+    needs_update = False
+
+    # Check if any option values contain quotes
+    updated_options = []
+    for option in product.get('options', []):
+        option_values = option.get('values', [])
+        updated_values = []
+
+        for value in option_values:
+            if '"' in value:
+                needs_update = True
+                updated_values.append(value.replace('"', ''))
+            else:
+                updated_values.append(value)
+
+        updated_options.append({
+            'id': option['id'],
+            'name': option['name'],
+            'values': updated_values
+        })
+
+    if not needs_update:
+        return None
+
+    # Also update variant option values
+    updated_variants = []
+    for variant in product.get('variants', []):
+        updated_variant = {
+            'id': variant['id']
+        }
+
+        # Update option values for this variant
+        if variant.get('option1'):
+            updated_variant['option1'] = variant['option1'].replace('"', '')
+        if variant.get('option2'):
+            updated_variant['option2'] = variant['option2'].replace('"', '')
+        if variant.get('option3'):
+            updated_variant['option3'] = variant['option3'].replace('"', '')
+
+        updated_variants.append(updated_variant)
+
+    return (product_id, product_title, updated_options, updated_variants)
+
+def push_quote_removal(pending):
+    """PUT one product's cleaned options/variants"""
+    product_id, _, updated_options, updated_variants = pending
+    update_data = {
+        'product': {
+            'id': product_id,
+            'options': updated_options,
+            'variants': updated_variants
+        }
+    }
+    return get_shopify_client().put(f'products/{product_id}.json', json=update_data)
+
+# Background job: one checkpointed item per product that still has quotes
+
+def _plan_remove_quotes(params):
+    ensure_catalog_snapshot()
+    return [(str(product['id']), None) for product in iter_catalog_products()
+            if build_quote_removal(product) is not None]
+
+def _process_remove_quotes(params, context, item_key, payload):
+    product = get_catalog_product(int(item_key))
+    pending = build_quote_removal(product) if product else None
+    if pending is None:
+        return {'skipped': 'no quoted option values'}
+
+    update_response = push_quote_removal(pending)
+    if update_response.status_code != 200:
+        raise RuntimeError(f'HTTP {update_response.status_code}: {update_response.text[:200]}')
+
+    product_id, product_title, updated_options, updated_variants = pending
+    update_catalog_product_options(product_id, updated_options, updated_variants)
+    return {'title': product_title}
+
+register_job_type('shopify_remove_quotes', _plan_remove_quotes, _process_remove_quotes)
 
 @shopify_bulk_update_bp.route('/shopify/bulk-remove-quotes', methods=['GET'])
 def bulk_remove_quotes_page():
@@ -16,114 +94,45 @@ def bulk_remove_quotes_page():
 
 @shopify_bulk_update_bp.route('/api/shopify/bulk-remove-quotes', methods=['POST'])
 def bulk_remove_quotes():
-    """Bulk update all Shopify products to remove quotes from option values"""
+    """
+    Bulk update all Shopify products to remove quotes from option values.
+    Pass ?background=1 to run it as a resumable job instead.
+    """
     try:
+        if request.args.get('background') in ('1', 'true'):
+            job_id = submit_job('shopify_remove_quotes')
+            return jsonify({'success': True, 'job_id': job_id}), 202
+
         updated_products = []
         errors = []
-        
-        # Fetch all products (paginated)
-        url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products.json'
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Shopify-Access-Token': SHOPIFY_API_SECRET
-        }
-        
-        params = {'limit': 250}  # Max per page
-        
-        while url:
-            response = requests.get(url, headers=headers, params=params)
-            
-            if response.status_code != 200:
-                return jsonify({
-                    'success': False,
-                    'error': f'Failed to fetch products: {response.text}'
-                }), 500
-            
-            products = response.json().get('products', [])
-            
-            for product in products:
-                product_id = product['id']
-                product_title = product['title']
-                needs_update = False
-                
-                # Check if any option values contain quotes
-                updated_options = []
-                for option in product.get('options', []):
-                    option_values = option.get('values', [])
-                    updated_values = []
-                    
-                    for value in option_values:
-                        if '"' in value:
-                            needs_update = True
-                            updated_values.append(value.replace('"', ''))
-                        else:
-                            updated_values.append(value)
-                    
-                    updated_options.append({
-                        'id': option['id'],
-                        'name': option['name'],
-                        'values': updated_values
-                    })
-                
-                # Update product if needed
-                if needs_update:
-                    # Also update variant option values
-                    updated_variants = []
-                    for variant in product.get('variants', []):
-                        updated_variant = {
-                            'id': variant['id']
-                        }
-                        
-                        # Update option values for this variant
-                        if variant.get('option1'):
-                            updated_variant['option1'] = variant['option1'].replace('"', '')
-                        if variant.get('option2'):
-                            updated_variant['option2'] = variant['option2'].replace('"', '')
-                        if variant.get('option3'):
-                            updated_variant['option3'] = variant['option3'].replace('"', '')
-                        
-                        updated_variants.append(updated_variant)
-                    
-                    update_data = {
-                        'product': {
-                            'id': product_id,
-                            'options': updated_options,
-                            'variants': updated_variants
-                        }
-                    }
-                    
-                    # Update via API
-                    update_url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products/{product_id}.json'
-                    update_response = requests.put(update_url, headers=headers, json=update_data)
-                    
-                    if update_response.status_code == 200:
-                        updated_products.append(product_title)
-                    else:
-                        errors.append(f'{product_title}: {update_response.text}')
-                    
-                    # Rate limiting: Shopify allows 2 requests per second
-                    time.sleep(0.5)
-            
-            # Check for next page
-            link_header = response.headers.get('Link', '')
-            if 'rel="next"' in link_header:
-                # Extract next page URL from Link header
-                next_link = [l.strip() for l in link_header.split(',') if 'rel="next"' in l]
-                if next_link:
-                    url = next_link[0].split(';')[0].strip('<>')
-                    params = None  # URL already contains params
-                else:
-                    url = None
+
+        # Scan the local catalog snapshot instead of paging the whole store
+        ensure_catalog_snapshot()
+
+        pending_updates = []
+        for product in iter_catalog_products():
+            pending = build_quote_removal(product)
+            if pending is not None:
+                pending_updates.append(pending)
+
+        # Update via API on the shared client's worker pool (rate limited by the call-limit header)
+        results = get_shopify_client().map_concurrent(push_quote_removal, pending_updates)
+        for (product_id, product_title, updated_options, updated_variants), update_response in zip(pending_updates, results):
+            if isinstance(update_response, Exception):
+                errors.append(f'{product_title}: {update_response}')
+            elif update_response.status_code == 200:
+                updated_products.append(product_title)
+                update_catalog_product_options(product_id, updated_options, updated_variants)
             else:
-                url = None
-        
+                errors.append(f'{product_title}: {update_response.text}')
+
         return jsonify({
             'success': True,
             'updated': len(updated_products),
             'products': updated_products,
             'errors': errors
         })
-        
+
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,46 @@
+"""
+Fifth Element Photography - Shopify Catalog Snapshot API
+Starts and monitors the bulk export that feeds the local product snapshot
+Version: 1.0.0
+"""
+
+from flask import Blueprint, request, jsonify
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from shopify_catalog import (
+    start_bulk_export, poll_bulk_export, refresh_catalog_snapshot,
+    get_latest_snapshot, get_catalog_product_count
+)
+
+shopify_catalog_api_bp = Blueprint('shopify_catalog_api', __name__)
+
+@shopify_catalog_api_bp.route('/api/shopify/catalog/refresh', methods=['POST'])
+def refresh_catalog():
+    """
+    Start a bulk export of all Shopify products.
+    Pass ?wait=1 to block until the snapshot has been imported.
+    """
+    try:
+        if request.args.get('wait') in ('1', 'true'):
+            result = refresh_catalog_snapshot()
+            return jsonify({'success': True, **result})
+
+        bulk_operation_id = start_bulk_export()
+        return jsonify({'success': True, 'bulk_operation_id': bulk_operation_id, 'status': 'CREATED'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@shopify_catalog_api_bp.route('/api/shopify/catalog/status', methods=['GET'])
+def catalog_status():
+    """Poll the running export (importing it once complete) and report the snapshot"""
+    try:
+        operation = poll_bulk_export(request.args.get('bulk_operation_id'))
+        return jsonify({
+            'success': True,
+            'operation': operation,
+            'snapshot': get_latest_snapshot(),
+            'product_count': get_catalog_product_count()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -2,14 +2,15 @@
 """
 Fifth Element Photography - Shopify CSV Generator
 Automatically generates Shopify product CSVs with pricing from database
-Version: 1.1.0
+Version: 1.2.0
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import sqlite3
 import csv
 import io
 import os
+import json
 from datetime import datetime
 
 shopify_csv_bp = Blueprint('shopify_csv', __name__)
@@ -22,6 +23,40 @@ else:
     DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'database', 'print_ordering.db')
     IMAGES_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'static', 'images')
 
+# Pricing queries (module-level so test_query_plans.py checks exactly these)
+GLOBAL_MARKUP_SQL = """
+SELECT markup_value FROM markup_rules
+WHERE rule_type = 'global' AND is_active = TRUE
+LIMIT 1
+"""
+
+ASPECT_RATIO_PRICING_SQL = """
+SELECT
+    ps.display_name as product_type,
+    pz.size_name,
+    bp.cost_price,
+    pc.display_name as category_name
+FROM base_pricing bp
+JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
+JOIN product_categories pc ON ps.category_id = pc.category_id
+JOIN print_sizes pz ON bp.size_id = pz.size_id
+JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
+WHERE bp.is_available = TRUE
+AND ar.display_name = ?
+ORDER BY
+    pc.display_name,
+    ps.display_order,
+    pz.width,
+    pz.height
+"""
+
+FRAME_OPTIONS_125_SQL = """
+SELECT DISTINCT fo.frame_name
+FROM frame_options fo
+JOIN product_subcategories ps ON fo.subcategory_id = ps.subcategory_id
+WHERE ps.display_name = '1.25" Framed Canvas' AND fo.is_available = TRUE
+"""
+
 def get_db():
     """Get database connection"""
     conn = sqlite3.connect(DB_PATH)
@@ -50,31 +85,103 @@ def map_product_type_to_shopify(db_product_type):
     }
     return mapping.get(db_product_type, db_product_type)
 
-def detect_aspect_ratio(image_filename):
-    """Detect aspect ratio from image file"""
-    from PIL import Image
+# Image dimensions cached by the main app (get_image_info), so export doesn't open every file.
+# get_image_info stores this placeholder when it can't read an image, so it isn't a real size.
+PLACEHOLDER_DIMENSIONS = (400, 300)
+
+if os.path.exists('/data'):
+    DIMENSIONS_CACHE_FILE = '/data/image_dimensions_cache.json'
+else:
+    DIMENSIONS_CACHE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'image_dimensions_cache.json')
+
+def load_dimensions_cache():
+    """
+    Known {filename: {'width', 'height'}} dimensions: image_exif.db (read from
+    the files themselves) first, then the JSON cache minus placeholder entries
+    """
+    dimensions = {}
+    try:
+        if os.path.exists(DIMENSIONS_CACHE_FILE):
+            with open(DIMENSIONS_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+            dimensions = {filename: entry for filename, entry in cached.items()
+                          if isinstance(entry, dict) and (entry.get('width'), entry.get('height')) != PLACEHOLDER_DIMENSIONS}
+    except Exception as e:
+        print(f"Error loading image dimensions cache: {e}")
+    
+    from exif_db_helper import get_image_dimensions_from_db
+    dimensions.update(get_image_dimensions_from_db())
+    return dimensions
+
+def aspect_ratio_from_size(width, height):
+    """Map pixel dimensions to an aspect ratio category"""
+    ratio = width / height
+    
+    # Determine aspect ratio category
+    if 0.95 <= ratio <= 1.05:  # Square (1:1)
+        return 'Square'
+    elif 1.45 <= ratio <= 1.55:  # Standard (3:2)
+        return 'Standard'
+    elif 0.65 <= ratio <= 0.70:  # Portrait (2:3)
+        return 'Standard'  # Use same sizes as 3:2
+    else:
+        return 'Standard'  # Default to standard
+
+def detect_aspect_ratio(image_filename, dimensions_cache=None):
+    """
+    Detect aspect ratio from known dimensions (see load_dimensions_cache), opening
+    the image only on a miss. Returns None when the dimensions can't be determined.
+    """
+    if not image_filename:
+        return None
     try:
+        cached = (dimensions_cache or {}).get(image_filename)
+        if cached and cached.get('width') and cached.get('height'):
+            return aspect_ratio_from_size(cached['width'], cached['height'])
+        
+        from PIL import Image
         image_path = os.path.join(IMAGES_FOLDER, image_filename)
         with Image.open(image_path) as img:
             width, height = img.size
-            ratio = width / height
-            
-            # Determine aspect ratio category
-            if 0.95 <= ratio <= 1.05:  # Square (1:1)
-                return 'Square'
-            elif 1.45 <= ratio <= 1.55:  # Standard (3:2)
-                return 'Standard'
-            elif 0.65 <= ratio <= 0.70:  # Portrait (2:3)
-                return 'Standard'  # Use same sizes as 3:2
-            else:
-                return 'Standard'  # Default to standard
+            return aspect_ratio_from_size(width, height)
     except Exception as e:
         print(f"Error detecting aspect ratio for {image_filename}: {e}")
-        return 'Standard'  # Default
+        return None
+
+def load_pricing_for_aspect_ratio(cursor, aspect_ratio):
+    """Pricing rows for one aspect ratio (queried once per export, not per image)"""
+    cursor.execute(ASPECT_RATIO_PRICING_SQL, (aspect_ratio,))
+    return [dict(row) for row in cursor.fetchall()]
+
+def iter_image_rows(handle, title, description, image_url, pricing_data, markup_multiplier, frame_options_125):
+    """Yield the product row and variant rows for one image"""
+    first_row = True
+    for row in pricing_data:
+        db_prod_type = row['product_type']
+        size = row['size_name'].strip('\'')
+        cost = row['cost_price']
+        price = round(cost * markup_multiplier, 2)
+        category = row['category_name']
+
+        # Special handling for Framed Canvas
+        if "Framed Canvas" in db_prod_type:
+            if db_prod_type == '1.25" Framed Canvas':
+                for frame in frame_options_125:
+                    if first_row:
+                        yield get_product_row(handle, title, description, image_url, 'Framed Canvas', size, price, frame, True)
+                        first_row = False
+                    else:
+                        yield get_variant_row(handle, 'Framed Canvas', size, price, frame)
+        else:
+            if first_row:
+                yield get_product_row(handle, title, description, image_url, category, size, price, None, True)
+                first_row = False
+            else:
+                yield get_variant_row(handle, category, size, price, None)
 
 @shopify_csv_bp.route('/api/shopify/generate-csv', methods=['POST'])
 def generate_shopify_csv():
-    """Generate Shopify product CSV for selected images"""
+    """Generate Shopify product CSV for selected images (streamed, one image at a time)"""
     try:
         data = request.json
         images = data.get('images', [])
@@ -86,118 +193,85 @@ def generate_shopify_csv():
         cursor = conn.cursor()
         
         # Get global markup
-        cursor.execute("""
-            SELECT markup_value FROM markup_rules 
-            WHERE rule_type = 'global' AND is_active = TRUE 
-            LIMIT 1
-        """)
+        cursor.execute(GLOBAL_MARKUP_SQL)
         markup_row = cursor.fetchone()
         global_markup = markup_row[0] if markup_row else 100.0
         markup_multiplier = 1 + (global_markup / 100)
         
-        # Prepare CSV data
-        csv_rows = []
+        # Get available frame options for 1.25" Framed Canvas (same for every image)
+        cursor.execute(FRAME_OPTIONS_125_SQL)
+        frame_options_125 = [row['frame_name'] for row in cursor.fetchall()]
+        
+        # Resolve every image's aspect ratio up front, then price each ratio once
+        dimensions_cache = load_dimensions_cache()
+        image_ratios = [(image, detect_aspect_ratio(image.get('filename'), dimensions_cache)) for image in images]
+        pricing_by_ratio = {}
+        for _, aspect_ratio in image_ratios:
+            if aspect_ratio and aspect_ratio not in pricing_by_ratio:
+                pricing_by_ratio[aspect_ratio] = load_pricing_for_aspect_ratio(cursor, aspect_ratio)
         
-        for image in images:
-            filename = image.get('filename')
-            title = image.get('title', filename)
-            description = image.get('description', '')
-            # Leave image_url blank - user will add images manually in Shopify
-            image_url = ''
-            
-            # Detect aspect ratio
-            aspect_ratio = detect_aspect_ratio(filename)
-            
-            # Generate product handle
-            handle = slugify(title)
-
-            # Get available frame options for 1.25" Framed Canvas
-            cursor.execute("""
-                SELECT DISTINCT fo.frame_name 
-                FROM frame_options fo
-                JOIN product_subcategories ps ON fo.subcategory_id = ps.subcategory_id
-                WHERE ps.display_name = '1.25" Framed Canvas' AND fo.is_available = TRUE
-            """)
-            frame_options_125 = [row['frame_name'] for row in cursor.fetchall()]
-
-            # Query pricing for all product types
-            cursor.execute("""
-                SELECT 
-                    ps.display_name as product_type,
-                    pz.size_name,
-                    bp.cost_price,
-                    pc.display_name as category_name
-                FROM base_pricing bp
-                JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
-                JOIN product_categories pc ON ps.category_id = pc.category_id
-                JOIN print_sizes pz ON bp.size_id = pz.size_id
-                JOIN aspect_ratios ar ON pz.aspect_ratio_id = ar.aspect_ratio_id
-                WHERE bp.is_available = TRUE
-                AND ar.display_name = ?
-                ORDER BY 
-                    pc.display_name, 
-                    ps.display_order, 
-                    pz.width, 
-                    pz.height
-            """, (aspect_ratio,))
-            
-            pricing_data = cursor.fetchall()
-            
-            if not pricing_data:
-                continue
-
-            # Generate CSV rows
-            first_row = True
-            for row in pricing_data:
-                db_prod_type = row['product_type']
-                size = row['size_name'].strip('\'')
-                cost = row['cost_price']
-                price = round(cost * markup_multiplier, 2)
-                category = row['category_name']
-
-                # Special handling for Framed Canvas
-                if "Framed Canvas" in db_prod_type:
-                    if db_prod_type == '1.25" Framed Canvas':
-                        for frame in frame_options_125:
-                            if first_row:
-                                csv_rows.append(get_product_row(handle, title, description, image_url, 'Framed Canvas', size, price, frame, True))
-                                first_row = False
-                            else:
-                                csv_rows.append(get_variant_row(handle, 'Framed Canvas', size, price, frame))
-                else:
-                    if first_row:
-                        csv_rows.append(get_product_row(handle, title, description, image_url, category, size, price, None, True))
-                        first_row = False
-                    else:
-                        csv_rows.append(get_variant_row(handle, category, size, price, None))
-
         conn.close()
         
-        if not csv_rows:
-            return jsonify({'success': False, 'error': 'No pricing data found for selected images'}), 400
+        # Decide which images produce rows before streaming, so an export with none is still an error
+        exportable = []
+        skipped = []
+        for image, aspect_ratio in image_ratios:
+            filename = image.get('filename')
+            if not aspect_ratio:
+                skipped.append({'filename': filename, 'reason': 'Image dimensions unknown'})
+            elif not any(True for _ in iter_image_rows('', '', '', '', pricing_by_ratio[aspect_ratio],
+                                                        markup_multiplier, frame_options_125)):
+                skipped.append({'filename': filename, 'reason': f'No pricing data for {aspect_ratio} aspect ratio'})
+            else:
+                exportable.append((image, aspect_ratio))
+        
+        if not exportable:
+            return jsonify({'success': False, 'error': 'No pricing data found for selected images',
+                            'skipped': skipped}), 400
+        
+        for entry in skipped:
+            print(f"Skipping {entry['filename']} in Shopify CSV: {entry['reason']}")
         
-        # Generate CSV file
-        output = io.StringIO()
-        fieldnames = list(csv_rows[0].keys())
-        writer = csv.DictWriter(output, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
-        writer.writerows(csv_rows)
+        fieldnames = list(get_variant_row('', '', '', 0, None).keys())
         
-        # Convert to bytes for download with UTF-8 BOM for proper Excel compatibility
-        csv_content = output.getvalue()
-        csv_bytes = io.BytesIO()
-        csv_bytes.write('\ufeff'.encode('utf-8'))  # UTF-8 BOM
-        csv_bytes.write(csv_content.encode('utf-8'))
-        csv_bytes.seek(0)
+        def generate():
+            # UTF-8 BOM for proper Excel compatibility
+            buffer = io.StringIO()
+            buffer.write('\ufeff')
+            writer = csv.DictWriter(buffer, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
+            writer.writeheader()
+            
+            for image, aspect_ratio in exportable:
+                pricing_data = pricing_by_ratio[aspect_ratio]
+                
+                filename = image.get('filename')
+                title = image.get('title', filename)
+                description = image.get('description', '')
+                # Leave image_url blank - user will add images manually in Shopify
+                image_url = ''
+                
+                # Generate product handle
+                handle = slugify(title)
+                
+                writer.writerows(iter_image_rows(handle, title, description, image_url,
+                                                 pricing_data, markup_multiplier, frame_options_125))
+                
+                # Flush one image's rows per chunk
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+            
+            remaining = buffer.getvalue()
+            if remaining:
+                yield remaining.encode('utf-8')
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'shopify_products_{timestamp}.csv'
         
-        return send_file(
-            csv_bytes,
+        return Response(
+            stream_with_context(generate()),
             mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
@@ -1,15 +1,54 @@
 from flask import Blueprint, request, jsonify
 import os
 import sqlite3
-import requests
 import time
+from shopify_client import get_shopify_client
+from shopify_catalog import (
+    ensure_catalog_snapshot, get_catalog_products, get_catalog_product,
+    get_catalog_product_count, iter_catalog_products, update_catalog_variant_price
+)
+from job_runner import register_job_type, submit_job
 
 shopify_price_sync_bp = Blueprint('shopify_price_sync_api', __name__)
 
-# Shopify configuration
-SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'fifth-element-photography.myshopify.com')
-SHOPIFY_ACCESS_TOKEN = os.environ.get('SHOPIFY_API_SECRET', '')
-SHOPIFY_API_VERSION = '2024-01'
+# Pricing queries (module-level so test_query_plans.py checks exactly these)
+GLOBAL_MARKUP_SQL = """
+SELECT markup_value FROM markup_rules
+WHERE rule_type = 'global' AND is_active = TRUE
+LIMIT 1
+"""
+
+BASE_PRICING_SQL = """
+SELECT
+    ps.display_name as product_type,
+    pz.size_name,
+    bp.cost_price
+FROM base_pricing bp
+JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
+JOIN print_sizes pz ON bp.size_id = pz.size_id
+WHERE bp.is_available = TRUE
+ORDER BY pz.width, pz.height
+"""
+
+FRAMED_PRICING_SQL = """
+SELECT
+    ps.display_name as product_type,
+    pz.size_name,
+    bp.cost_price
+FROM base_pricing bp
+JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
+JOIN print_sizes pz ON bp.size_id = pz.size_id
+WHERE bp.is_available = TRUE
+AND ps.display_name = ?
+ORDER BY pz.width, pz.height
+"""
+
+FRAME_PRICE_SQL = """
+SELECT op.cost_price
+FROM option_pricing op
+JOIN product_options po ON op.option_id = po.option_id
+WHERE po.option_name = ?
+"""
 
 def get_db_connection():
     """Get database connection with proper path handling for Railway"""
@@ -50,12 +89,187 @@ def map_product_type_to_shopify(db_product_type):
     }
     return mapping.get(db_product_type, db_product_type)
 
+def load_sync_pricing(cursor):
+    """
+    Load the global markup multiplier and every sellable (product type, size)
+    cost once, so each batch or job item only has to match variants.
+    """
+    cursor.execute(GLOBAL_MARKUP_SQL)
+    markup_row = cursor.fetchone()
+    global_markup = markup_row[0] if markup_row else 100.0
+    markup_multiplier = 1 + (global_markup / 100)
+    
+    # Get ALL pricing data once (for all aspect ratios)
+    pricing_data = []
+    
+    # Get base pricing for all categories and aspect ratios
+    cursor.execute(BASE_PRICING_SQL)
+    
+    base_pricing = cursor.fetchall()
+    
+    for row in base_pricing:
+        pricing_data.append({
+            'product_type': row['product_type'],
+            'size_name': row['size_name'],
+            'cost_price': row['cost_price']
+        })
+    
+    # Add framed canvas variants with colors
+    framed_canvas_config = [
+        ('0.75" Framed Canvas', [
+            ('Black', 'black_floating_075'),
+            ('White', 'white_floating_075'),
+            ('Silver', 'silver_floating_075'),
+            ('Gold', 'gold_floating_075'),
+        ]),
+        ('1.25" Framed Canvas', [
+            ('Black', 'black_floating_125'),
+            ('White', 'white_floating_125'),
+            ('Oak', 'oak_floating_125'),
+        ]),
+        ('1.50" Framed Canvas', [
+            ('Black', 'black_floating_150'),
+            ('White', 'white_floating_150'),
+            ('Oak', 'oak_floating_150'),
+        ]),
+    ]
+    
+    for canvas_type, frame_colors in framed_canvas_config:
+        cursor.execute(FRAMED_PRICING_SQL, (canvas_type,))
+        
+        base_framed_pricing = cursor.fetchall()
+        
+        for color_name, option_name in frame_colors:
+            cursor.execute(FRAME_PRICE_SQL, (option_name,))
+            
+            frame_row = cursor.fetchone()
+            frame_adjustment = float(frame_row[0]) if frame_row and frame_row[0] else 0.0
+            
+            for row in base_framed_pricing:
+                pricing_data.append({
+                    'product_type': f"{canvas_type} {color_name}",
+                    'size_name': row['size_name'],
+                    'cost_price': row['cost_price'] + frame_adjustment
+                })
+    
+    return markup_multiplier, pricing_data
+
+def match_variant_prices(products, markup_multiplier, pricing_data, errors):
+    """Return (product_id, title, variant_id, option1, option2, price) for every variant with a known price"""
+    pending_updates = []
+    for product in products:
+        product_title = product.get('title', '')
+        
+        for variant in product.get('variants', []):
+            variant_id = variant.get('id')
+            option1_raw = variant.get('option1')  # Product type
+            option2_raw = variant.get('option2')  # Size
+            
+            if not option1_raw or not option2_raw:
+                continue
+            
+            # Strip prefixes from Shopify option values
+            # e.g., "Printed Product - 0.75 Stretched Canvas" -> "0.75 Stretched Canvas"
+            # e.g., "Size - 8×12" -> "8×12"
+            option1 = option1_raw.replace('Printed Product - ', '').strip()
+            option2 = option2_raw.replace('Size - ', '').strip()
+            
+            # Find matching price in database
+            matching_price = None
+            for price_row in pricing_data:
+                db_prod_type = price_row['product_type']
+                shopify_prod_type = map_product_type_to_shopify(db_prod_type)
+                if shopify_prod_type is None:
+                    shopify_prod_type = db_prod_type
+                
+                db_size = price_row['size_name'].strip('"').strip()
+                
+                if shopify_prod_type == option1 and db_size == option2:
+                    matching_price = round(price_row['cost_price'] * markup_multiplier, 2)
+                    break
+            
+            if matching_price is None:
+                errors.append(f"{product_title} - {option1} / {option2}: No matching price found")
+                continue
+            
+            pending_updates.append((product['id'], product_title, variant_id, option1, option2, matching_price))
+    
+    return pending_updates
+
+def push_variant_prices(pending_updates, errors):
+    """
+    Update variant prices via API (worker pool, rate limited by the call-limit header).
+    Returns (variants_updated, updated_product_ids).
+    """
+    client = get_shopify_client()
+    
+    def update_variant_price(pending):
+        _, _, variant_id, _, _, matching_price = pending
+        update_data = {
+            'variant': {
+                'id': variant_id,
+                'price': str(matching_price)
+            }
+        }
+        return client.put(f'variants/{variant_id}.json', json=update_data)
+    
+    variants_updated = 0
+    updated_product_ids = set()
+    results = client.map_concurrent(update_variant_price, pending_updates)
+    for (product_id, product_title, variant_id, option1, option2, matching_price), update_response in zip(pending_updates, results):
+        if isinstance(update_response, Exception):
+            errors.append(f"{product_title} - {option1} / {option2}: Failed to update ({update_response})")
+        elif update_response.status_code == 200:
+            variants_updated += 1
+            updated_product_ids.add(product_id)
+            update_catalog_variant_price(variant_id, matching_price)
+        else:
+            errors.append(f"{product_title} - {option1} / {option2}: Failed to update (HTTP {update_response.status_code})")
+    
+    return variants_updated, updated_product_ids
+
+# Background job: one checkpointed item per Shopify product
+
+def _plan_price_sync(params):
+    ensure_catalog_snapshot()
+    return [(str(product['id']), None) for product in iter_catalog_products()]
+
+def _setup_price_sync(params):
+    conn = get_db_connection()
+    try:
+        return load_sync_pricing(conn.cursor())
+    finally:
+        conn.close()
+
+def _process_price_sync(params, context, item_key, payload):
+    markup_multiplier, pricing_data = context
+    product = get_catalog_product(int(item_key))
+    if product is None:
+        return {'skipped': 'not in catalog snapshot'}
+    
+    errors = []
+    pending_updates = match_variant_prices([product], markup_multiplier, pricing_data, errors)
+    variants_updated, _ = push_variant_prices(pending_updates, errors)
+    if pending_updates and variants_updated == 0:
+        raise RuntimeError('; '.join(errors[:5]))
+    return {'variants_updated': variants_updated, 'errors': errors[:20]}
+
+register_job_type('shopify_price_sync', _plan_price_sync, _process_price_sync, setup=_setup_price_sync)
+
 @shopify_price_sync_bp.route('/api/shopify/sync-prices', methods=['POST'])
 def sync_shopify_prices():
     """
     Sync prices in batches of 10 products.
     Accepts optional 'page' parameter to process specific batch.
+    Pass ?background=1 to sync the whole catalog as a resumable job instead.
     """
+    if request.args.get('background') in ('1', 'true'):
+        try:
+            job_id = submit_job('shopify_price_sync')
+            return jsonify({'success': True, 'job_id': job_id}), 202
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
     page = int(request.args.get('page', 1))
     start_time = time.time()
     print(f"[SYNC] Starting sync at {start_time}")
@@ -66,220 +280,28 @@ def sync_shopify_prices():
         cursor = conn.cursor()
         print("[SYNC] Database connected")
         
-        # Get global markup multiplier
-        print("[SYNC] Fetching markup multiplier...")
-        cursor.execute("""
-            SELECT markup_value FROM markup_rules 
-            WHERE rule_type = 'global' AND is_active = TRUE 
-            LIMIT 1
-        """)
-        markup_row = cursor.fetchone()
-        global_markup = markup_row[0] if markup_row else 100.0
-        markup_multiplier = 1 + (global_markup / 100)
+        # Get global markup multiplier and ALL pricing data once (for all aspect ratios)
+        markup_multiplier, pricing_data = load_sync_pricing(cursor)
+        conn.close()
         
-        # Fetch Shopify products (BATCH: 10 products per page)
-        all_products = []
-        limit = 10
-        url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products.json?limit={limit}'
-        headers = {'X-Shopify-Access-Token': SHOPIFY_ACCESS_TOKEN}
-        print(f"[SYNC] Fetching page {page} (limit={limit}) from Shopify: {url}")
+        # Read this batch from the local catalog snapshot (no re-paging pages 1..N-1)
+        limit = int(request.args.get('limit', 10))
+        offset = (page - 1) * limit
+        print(f"[SYNC] Loading page {page} (limit={limit}) from catalog snapshot")
         
-        # Fetch pages until we reach the requested page
-        current_page = 1
-        next_page_link = None
-        while url and current_page <= page:
-            try:
-                print(f"[SYNC] Making request to: {url[:80]}...")
-                response = requests.get(url, headers=headers, timeout=30)
-                print(f"[SYNC] Got response: {response.status_code}")
-            except requests.exceptions.Timeout:
-                return jsonify({
-                    'success': False,
-                    'error': 'Request to Shopify timed out after 30 seconds'
-                }), 500
-            except requests.exceptions.RequestException as req_err:
-                return jsonify({
-                    'success': False,
-                    'error': f'Request error: {str(req_err)}'
-                }), 500
-            
-            if response.status_code != 200:
-                error_detail = f'HTTP {response.status_code}: {response.text[:500]}'
-                print(f'Shopify API Error: {error_detail}')
-                return jsonify({
-                    'success': False,
-                    'error': error_detail
-                }), 500
-            
-            data = response.json()
-            link_header = response.headers.get('Link', '')
-            
-            # If this is the page we want, save products and check for next page
-            if current_page == page:
-                all_products.extend(data.get('products', []))
-                # Check if there's a next page link
-                if 'rel="next"' in link_header:
-                    next_links = [l.split(';')[0].strip('<> ') for l in link_header.split(',') if 'rel="next"' in l]
-                    next_page_link = next_links[0] if next_links else None
-                url = None
-            else:
-                # Skip this page, move to next
-                if 'rel="next"' in link_header:
-                    next_link = [l.split(';')[0].strip('<> ') for l in link_header.split(',') if 'rel="next"' in l]
-                    url = next_link[0] if next_link else None
-                    current_page += 1
-                else:
-                    url = None
+        ensure_catalog_snapshot()
+        all_products = get_catalog_products(offset=offset, limit=limit)
+        has_more = offset + limit < get_catalog_product_count()
         
-        products_updated = 0
-        variants_updated = 0
         errors = []
         
-        # Get ALL pricing data once (for all aspect ratios)
-        pricing_data = []
-        
-        # Get base pricing for all categories and aspect ratios
-        cursor.execute("""
-            SELECT 
-                ps.display_name as product_type,
-                pz.size_name,
-                bp.cost_price
-            FROM base_pricing bp
-            JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
-            JOIN print_sizes pz ON bp.size_id = pz.size_id
-            WHERE bp.is_available = TRUE
-            ORDER BY pz.width, pz.height
-        """)
-        
-        base_pricing = cursor.fetchall()
-        
-        for row in base_pricing:
-            pricing_data.append({
-                'product_type': row['product_type'],
-                'size_name': row['size_name'],
-                'cost_price': row['cost_price']
-            })
-        
-        # Add framed canvas variants with colors
-        framed_canvas_config = [
-            ('0.75" Framed Canvas', [
-                ('Black', 'black_floating_075'),
-                ('White', 'white_floating_075'),
-                ('Silver', 'silver_floating_075'),
-                ('Gold', 'gold_floating_075'),
-            ]),
-            ('1.25" Framed Canvas', [
-                ('Black', 'black_floating_125'),
-                ('White', 'white_floating_125'),
-                ('Oak', 'oak_floating_125'),
-            ]),
-            ('1.50" Framed Canvas', [
-                ('Black', 'black_floating_150'),
-                ('White', 'white_floating_150'),
-                ('Oak', 'oak_floating_150'),
-            ]),
-        ]
-        
-        for canvas_type, frame_colors in framed_canvas_config:
-            cursor.execute("""
-                SELECT 
-                    ps.display_name as product_type,
-                    pz.size_name,
-                    bp.cost_price
-                FROM base_pricing bp
-                JOIN product_subcategories ps ON bp.subcategory_id = ps.subcategory_id
-                JOIN print_sizes pz ON bp.size_id = pz.size_id
-                WHERE bp.is_available = TRUE
-                AND ps.display_name = ?
-                ORDER BY pz.width, pz.height
-            """, (canvas_type,))
-            
-            base_framed_pricing = cursor.fetchall()
-            
-            for color_name, option_name in frame_colors:
-                cursor.execute("""
-                    SELECT op.cost_price
-                    FROM option_pricing op
-                    JOIN product_options po ON op.option_id = po.option_id
-                    WHERE po.option_name = ?
-                """, (option_name,))
-                
-                frame_row = cursor.fetchone()
-                frame_adjustment = float(frame_row[0]) if frame_row and frame_row[0] else 0.0
-                
-                for row in base_framed_pricing:
-                    pricing_data.append({
-                        'product_type': f"{canvas_type} {color_name}",
-                        'size_name': row['size_name'],
-                        'cost_price': row['cost_price'] + frame_adjustment
-                    })
-        
-        # Now update variants for all products (BATCH: 20 products)
-        for product in all_products:
-            product_title = product.get('title', '')
-            
-            product_updated = False
-            for variant in product.get('variants', []):
-                variant_id = variant.get('id')
-                option1_raw = variant.get('option1')  # Product type
-                option2_raw = variant.get('option2')  # Size
-                
-                if not option1_raw or not option2_raw:
-                    continue
-                
-                # Strip prefixes from Shopify option values
-                # e.g., "Printed Product - 0.75 Stretched Canvas" -> "0.75 Stretched Canvas"
-                # e.g., "Size - 8×12" -> "8×12"
-                option1 = option1_raw.replace('Printed Product - ', '').strip()
-                option2 = option2_raw.replace('Size - ', '').strip()
-                
-                # Find matching price in database
-                matching_price = None
-                for price_row in pricing_data:
-                    db_prod_type = price_row['product_type']
-                    shopify_prod_type = map_product_type_to_shopify(db_prod_type)
-                    if shopify_prod_type is None:
-                        shopify_prod_type = db_prod_type
-                    
-                    db_size = price_row['size_name'].strip('"').strip()
-                    
-                    if shopify_prod_type == option1 and db_size == option2:
-                        matching_price = round(price_row['cost_price'] * markup_multiplier, 2)
-                        break
-                
-                if matching_price is None:
-                    errors.append(f"{product_title} - {option1} / {option2}: No matching price found")
-                    continue
-                
-                # Update variant price via API
-                update_url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/variants/{variant_id}.json'
-                update_data = {
-                    'variant': {
-                        'id': variant_id,
-                        'price': str(matching_price)
-                    }
-                }
-                
-                update_response = requests.put(update_url, headers=headers, json=update_data, timeout=30)
-                
-                if update_response.status_code == 200:
-                    variants_updated += 1
-                    product_updated = True
-                else:
-                    errors.append(f"{product_title} - {option1} / {option2}: Failed to update (HTTP {update_response.status_code})")
-                
-                time.sleep(0.1)  # Rate limiting (Shopify allows 2 req/sec)
-            
-            if product_updated:
-                products_updated += 1
-        
-        conn.close()
+        # Match every variant first, then push price updates through the shared client
+        pending_updates = match_variant_prices(all_products, markup_multiplier, pricing_data, errors)
+        variants_updated, updated_product_ids = push_variant_prices(pending_updates, errors)
+        products_updated = len(updated_product_ids)
         
         duration = round((time.time() - start_time) / 60, 2)
         
-        # Check if there are more pages based on Link header from current page
-        has_more = next_page_link is not None
-        
         return jsonify({
             'success': True,
             'products_updated': products_updated,
@@ -4,9 +4,12 @@ Returns image list with Shopify product status for filtering
 Version: 1.0.0
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 import sqlite3
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from job_runner import register_job_type, submit_job
 
 shopify_status_api_bp = Blueprint('shopify_status_api', __name__)
 
@@ -50,71 +53,97 @@ def get_gallery_db():
     conn.row_factory = sqlite3.Row
     return conn
 
-@shopify_status_api_bp.route('/api/shopify/sync-products', methods=['POST'])
-def sync_shopify_products():
-    """Sync existing Shopify products into database"""
-    import requests
+def index_images_by_stem():
+    """Index image files once instead of probing every extension per product"""
+    extension_priority = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
+    images_by_stem = {}
+    if os.path.exists(IMAGES_FOLDER):
+        for filename in sorted(os.listdir(IMAGES_FOLDER),
+                               key=lambda f: extension_priority.index(os.path.splitext(f)[1])
+                               if os.path.splitext(f)[1] in extension_priority else len(extension_priority)):
+            stem, ext = os.path.splitext(filename)
+            if ext in extension_priority:
+                images_by_stem.setdefault(stem, filename)
+    return images_by_stem
+
+def sync_products_from_catalog():
+    """Match catalog snapshot products to image files and save them. Returns (synced, total)."""
+    from shopify_catalog import iter_catalog_products
     
-    SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'fifth-element-photography.myshopify.com')
-    SHOPIFY_API_SECRET = os.environ.get('SHOPIFY_API_SECRET', '')
-    SHOPIFY_API_VERSION = '2024-01'
+    images_by_stem = index_images_by_stem()
     
-    try:
-        # Fetch all products from Shopify
-        url = f'https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/products.json?limit=250'
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Shopify-Access-Token': SHOPIFY_API_SECRET
-        }
-        
-        response = requests.get(url, headers=headers, timeout=30)
-        
-        if response.status_code != 200:
-            error_detail = f'Status: {response.status_code}, Response: {response.text[:500]}'
-            print(f'Shopify API Error: {error_detail}')
-            return jsonify({'success': False, 'error': error_detail}), 500
+    # Save to database
+    conn = get_pricing_db()
+    cursor = conn.cursor()
+    synced_count = 0
+    total_products = 0
+    
+    for product in iter_catalog_products():
+        total_products += 1
+        product_id = str(product['id'])
+        handle = product['handle']
+        title = product['title']
         
-        try:
-            products = response.json().get('products', [])
-        except Exception as json_error:
-            error_detail = f'JSON parse error: {str(json_error)}, Response: {response.text[:500]}'
-            print(f'Shopify Response Parse Error: {error_detail}')
-            return jsonify({'success': False, 'error': error_detail}), 500
+        # Try to match title to filename (title should be the image name without extension)
+        image_filename = images_by_stem.get(title)
         
-        # Save to database
-        conn = get_pricing_db()
-        cursor = conn.cursor()
-        synced_count = 0
+        if image_filename:
+            cursor.execute("""
+                INSERT OR REPLACE INTO shopify_products (image_filename, shopify_product_id, shopify_handle)
+                VALUES (?, ?, ?)
+            """, (image_filename, product_id, handle))
+            synced_count += 1
+    
+    conn.commit()
+    conn.close()
+    return synced_count, total_products
+
+# Background job: two checkpointed steps so a restart after the export doesn't re-export
+
+def _plan_sync_products(params):
+    steps = [('match_products', None)]
+    if params.get('refresh'):
+        steps.insert(0, ('refresh_snapshot', None))
+    return steps
+
+def _process_sync_products(params, context, item_key, payload):
+    from shopify_catalog import ensure_catalog_snapshot, refresh_catalog_snapshot
+    if item_key == 'refresh_snapshot':
+        return refresh_catalog_snapshot()
+    
+    ensure_catalog_snapshot()
+    synced_count, total_products = sync_products_from_catalog()
+    return {'synced': synced_count, 'total_shopify_products': total_products}
+
+register_job_type('shopify_sync_products', _plan_sync_products, _process_sync_products)
+
+@shopify_status_api_bp.route('/api/shopify/sync-products', methods=['POST'])
+def sync_shopify_products():
+    """
+    Sync existing Shopify products into database (reads the local catalog snapshot).
+    Pass ?background=1 to run it as a resumable job instead.
+    """
+    from shopify_catalog import ensure_catalog_snapshot
+    
+    refresh = request.args.get('refresh') in ('1', 'true')
+    try:
+        if request.args.get('background') in ('1', 'true'):
+            job_id = submit_job('shopify_sync_products', {'refresh': refresh})
+            return jsonify({'success': True, 'job_id': job_id}), 202
         
-        for product in products:
-            product_id = str(product['id'])
-            handle = product['handle']
-            title = product['title']
-            
-            # Try to match title to filename (title should be the image name without extension)
-            # Look for matching image file
-            image_filename = None
-            if os.path.exists(IMAGES_FOLDER):
-                for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                    potential_file = title + ext
-                    if os.path.exists(os.path.join(IMAGES_FOLDER, potential_file)):
-                        image_filename = potential_file
-                        break
-            
-            if image_filename:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO shopify_products (image_filename, shopify_product_id, shopify_handle)
-                    VALUES (?, ?, ?)
-                """, (image_filename, product_id, handle))
-                synced_count += 1
+        # Full catalog comes from the bulk-export snapshot instead of one 250-product page
+        if refresh:
+            from shopify_catalog import refresh_catalog_snapshot
+            refresh_catalog_snapshot()
+        else:
+            ensure_catalog_snapshot()
         
-        conn.commit()
-        conn.close()
+        synced_count, total_products = sync_products_from_catalog()
         
         return jsonify({
             'success': True,
             'synced': synced_count,
-            'total_shopify_products': len(products)
+            'total_shopify_products': total_products
         })
         
     except Exception as e:
@@ -1,94 +1,79 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, session
 import os
-import shutil
-from watermark_helper import apply_watermark
+from gallery_renditions import (ensure_gallery_image, regenerate_gallery_image, set_watermark_settings,
+                                clear_watermark_settings, get_watermark_settings, normalize_watermark_settings, IMAGES_FOLDER)
+from job_runner import register_job_type, submit_job
 
 watermark_bp = Blueprint('watermark_bp', __name__)
 
+@watermark_bp.before_request
+def require_admin_session():
+    """Every watermark route changes (or exposes) the image library: admins only"""
+    if not session.get('admin_authenticated'):
+        return jsonify({'success': False, 'error': 'Admin authentication required'}), 401
+
+# Images rendered at once by a batch watermark job
+WATERMARK_WORKERS = 4
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+def _watermark_one(filename, settings, images_folder=IMAGES_FOLDER):
+    """
+    Save (or clear, if settings is None) an image's watermark settings. That
+    switches which cached rendition is served; one is only rendered if that
+    variant doesn't exist yet. Clearing an image that has no settings row was
+    watermarked before renditions existed (gallery-images/<filename> itself is
+    watermarked), so its clean rendition is re-rendered from the original.
+    """
+    if not filename or filename != os.path.basename(filename):
+        raise ValueError(f'Invalid filename: {filename}')
+    if not os.path.exists(os.path.join(images_folder, filename)):
+        raise FileNotFoundError(f'Original image not found: {filename}')
+    if settings is None:
+        if get_watermark_settings(filename) is None:
+            return regenerate_gallery_image(filename, images_folder=images_folder)
+        clear_watermark_settings([filename])
+    else:
+        set_watermark_settings([filename], settings)
+    return ensure_gallery_image(filename, images_folder=images_folder)
+
+# Background job: one checkpointed item per image, WATERMARK_WORKERS rendered in parallel
+
+def _plan_watermark_batch(params):
+    if params.get('filenames'):
+        filenames = params['filenames']
+    elif params.get('gallery_id'):
+        from gallery_db import get_gallery_images
+        filenames = get_gallery_images(int(params['gallery_id']))
+    else:
+        filenames = sorted(name for name in os.listdir(IMAGES_FOLDER) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [(filename, None) for filename in dict.fromkeys(filenames)]
+
+def _process_watermark_batch(params, context, item_key, payload):
+    settings = None if params.get('action') == 'remove' else params['settings']
+    _watermark_one(item_key, settings)
+    return {'watermarked': settings is not None}
+
+register_job_type('watermark_batch', _plan_watermark_batch, _process_watermark_batch,
+                  concurrency=WATERMARK_WORKERS)
+
 @watermark_bp.route('/api/watermark/apply', methods=['POST'])
 def apply_watermark_route():
-    """Apply watermark to a specific image"""
-    data = request.json
+    """Watermark one image: save its settings, which selects (or renders) that watermarked rendition"""
+    data = request.json or {}
     filename = data.get('filename')
-    position = data.get('position', 'bottom-right')
-    size = data.get('size', 'medium')
-    color = data.get('color', 'auto')
     
     if not filename:
         return jsonify({'success': False, 'error': 'Filename required'}), 400
         
-    # Paths
-    # Original is in /data/filename
-    # Gallery version is in /data/gallery-images/filename
-    
-    images_folder = current_app.config.get('IMAGES_FOLDER', '/data')
-    gallery_folder = '/data/gallery-images'
-    
-    # Ensure gallery folder exists
-    os.makedirs(gallery_folder, exist_ok=True)
-    
-    original_path = os.path.join(images_folder, filename)
-    gallery_path = os.path.join(gallery_folder, filename)
-    
-    # Verify original exists
-    if not os.path.exists(original_path):
-        return jsonify({'success': False, 'error': f'Original image not found at {original_path}'}), 404
-        
     try:
-        # Step 1: Create fresh gallery copy from ORIGINAL
-        from PIL import Image
-        with Image.open(original_path) as img:
-            # Resize logic (match existing gallery logic)
-            # Max dimension 1200
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-                
-            orig_width, orig_height = img.size
-            max_dimension = 1200
-            
-            if orig_width > orig_height:
-                new_width = max_dimension
-                new_height = int((max_dimension / orig_width) * orig_height)
-            else:
-                new_height = max_dimension
-                new_width = int((max_dimension / orig_height) * orig_width)
-                
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save to gallery path (clean slate)
-            img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-                
-        # Step 2: Apply Watermark to the NEW gallery image
-        success = apply_watermark(
-            gallery_path, 
-            gallery_path, 
-            position=position, 
-            size=size, 
-            color_mode=color
-        )
-        
-        if success:
-            # Step 3: Regenerate Thumbnail so Admin UI updates
-            try:
-                from thumbnail_helper import generate_thumbnail_for_image
-                # Force regeneration of thumbnail from the NEW watermarked gallery image
-                # Note: thumbnail_helper might default to reading from /data/filename (original)
-                # We need to ensure it reads from gallery_path if we want the watermark to show
-                
-                # Actually, let's just manually generate the thumbnail here to be safe
-                # Or rely on the helper if it's smart enough. 
-                # Let's call the helper but pass the gallery path if possible?
-                # The helper usually takes just filename.
-                
-                generate_thumbnail_for_image(filename, force=True)
-                print(f"DEBUG: Regenerated thumbnail for {filename}")
-            except Exception as e:
-                print(f"DEBUG: Failed to regenerate thumbnail: {e}")
-                
-            return jsonify({'success': True, 'message': 'Watermark applied successfully'})
-        else:
-            return jsonify({'success': False, 'error': 'Failed to apply watermark'}), 500
-            
+        settings = normalize_watermark_settings(data)
+        _watermark_one(filename, settings, current_app.config.get('IMAGES_FOLDER', IMAGES_FOLDER))
+        return jsonify({'success': True, 'message': 'Watermark applied successfully', 'settings': settings})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
     except Exception as e:
         print(f"Error in watermark route: {e}")
         import traceback
@@ -97,56 +82,55 @@ def apply_watermark_route():
 
 @watermark_bp.route('/api/watermark/remove', methods=['POST'])
 def remove_watermark_route():
-    """Remove watermark (by regenerating from original)"""
-    data = request.json
+    """Remove watermark: clear its settings so the clean rendition is served again"""
+    data = request.json or {}
     filename = data.get('filename')
     
     if not filename:
         return jsonify({'success': False, 'error': 'Filename required'}), 400
         
-    images_folder = current_app.config.get('IMAGES_FOLDER', '/data')
-    gallery_folder = '/data/gallery-images'
-    
-    original_path = os.path.join(images_folder, filename)
-    gallery_path = os.path.join(gallery_folder, filename)
-    
-    if not os.path.exists(original_path):
-        return jsonify({'success': False, 'error': 'Original image not found. Cannot restore.'}), 404
-        
     try:
-        # Restore from ORIGINAL (just like apply, but skip the watermark step)
-        from PIL import Image
-        with Image.open(original_path) as img:
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-                
-            orig_width, orig_height = img.size
-            max_dimension = 1200
-            
-            if orig_width > orig_height:
-                new_width = max_dimension
-                new_height = int((max_dimension / orig_width) * orig_height)
-            else:
-                new_height = max_dimension
-                new_width = int((max_dimension / orig_height) * orig_width)
-                
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Save clean version to gallery path
-            img.save(gallery_path, 'JPEG', quality=90, optimize=True)
-        
-        # Regenerate thumbnail (clean)
-        try:
-            from thumbnail_helper import generate_thumbnail_for_image
-            generate_thumbnail_for_image(filename, force=True)
-        except Exception as e:
-            print(f"DEBUG: Failed to regenerate thumbnail: {e}")
-                
-        return jsonify({'success': True, 'message': 'Watermark removed (image reset)'})
-        
+        _watermark_one(filename, None, current_app.config.get('IMAGES_FOLDER', IMAGES_FOLDER))
+        return jsonify({'success': True, 'message': 'Watermark removed'})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'success': False, 'error': 'Original image not found. Cannot restore.'}), 404
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@watermark_bp.route('/api/watermark/settings/<path:filename>', methods=['GET'])
+def get_watermark_settings_route(filename):
+    """Saved watermark settings for an image (null if not watermarked)"""
+    return jsonify({'success': True, 'filename': filename, 'settings': get_watermark_settings(filename)})
+
+@watermark_bp.route('/api/watermark/batch', methods=['POST'])
+def batch_watermark_route():
+    """
+    Queue a background job that watermarks (or, with action=remove, un-watermarks)
+    many images: {"gallery_id": 3} or {"filenames": [...]} or {"all": true},
+    plus position/size/color/opacity. Returns the job ID.
+    """
+    data = request.json or {}
+    action = data.get('action', 'apply')
+    if action not in ('apply', 'remove'):
+        return jsonify({'success': False, 'error': 'action must be apply or remove'}), 400
+    if not (data.get('gallery_id') or data.get('filenames') or data.get('all')):
+        return jsonify({'success': False, 'error': 'gallery_id, filenames or all required'}), 400
+        
+    try:
+        params = {
+            'action': action,
+            'settings': normalize_watermark_settings(data) if action == 'apply' else None,
+            'gallery_id': data.get('gallery_id'),
+            'filenames': data.get('filenames') or None
+        }
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    job_id = submit_job('watermark_batch', params)
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
 @watermark_bp.route('/api/watermark/debug', methods=['GET'])
 def debug_watermark_route():
     """Debug endpoint to check paths"""
@@ -0,0 +1,617 @@
+"""
+Fifth Element Photography - Shopify Catalog Snapshot
+Keeps a local copy of every Shopify product and variant, refreshed through a
+Shopify bulk operation (JSONL export) instead of paging the REST API.
+Version: 1.0.0
+
+Read-heavy admin tools (status sync, price sync, quote cleanup) query the
+snapshot tables here; only writes go to the live API. Products created
+through the API are written into the snapshot as they are created. After
+each export import, mapped products the export didn't include are fetched
+live; ids Shopify answers 404 for are remembered in shopify_catalog_missing
+so they are not fetched again.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import requests
+from shopify_client import get_shopify_client
+
+# Snapshot lives next to shopify_products in the print ordering database
+if os.path.exists('/data'):
+    DB_PATH = '/data/print_ordering.db'
+else:
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering.db')
+
+# Rows are written in batches while the JSONL result is streamed
+IMPORT_BATCH_SIZE = 500
+
+BULK_PRODUCTS_QUERY = '''
+{
+  products {
+    edges {
+      node {
+        id
+        legacyResourceId
+        handle
+        title
+        status
+        productType
+        options { id name values }
+        variants {
+          edges {
+            node {
+              id
+              legacyResourceId
+              title
+              price
+              sku
+              selectedOptions { name value }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+def init_catalog_db():
+    """Create snapshot tables if they don't exist"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shopify_catalog_products (
+            product_id TEXT PRIMARY KEY,
+            handle TEXT NOT NULL,
+            title TEXT NOT NULL,
+            status TEXT,
+            product_type TEXT,
+            options_json TEXT NOT NULL DEFAULT '[]',
+            snapshot_id INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shopify_catalog_variants (
+            variant_id TEXT PRIMARY KEY,
+            product_id TEXT NOT NULL,
+            title TEXT,
+            option1 TEXT,
+            option2 TEXT,
+            option3 TEXT,
+            price TEXT,
+            sku TEXT,
+            position INTEGER DEFAULT 0,
+            FOREIGN KEY (product_id) REFERENCES shopify_catalog_products(product_id) ON DELETE CASCADE
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shopify_catalog_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bulk_operation_id TEXT,
+            status TEXT NOT NULL,
+            product_count INTEGER DEFAULT 0,
+            variant_count INTEGER DEFAULT 0,
+            error TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+    ''')
+
+    # Product ids Shopify returned 404 for (mapped locally, deleted in Shopify)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shopify_catalog_missing (
+            product_id TEXT PRIMARY KEY,
+            missing_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalog_products_title ON shopify_catalog_products(title)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalog_variants_product ON shopify_catalog_variants(product_id, position)')
+
+    conn.commit()
+    conn.close()
+
+
+def get_catalog_db():
+    """Get snapshot database connection"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _graphql(query, variables=None):
+    """Run a GraphQL Admin API request through the shared client"""
+    return get_shopify_client().graphql(query, variables)
+
+
+def _legacy_id(gid):
+    """gid://shopify/Product/123 -> '123'"""
+    if gid is None:
+        return None
+    return str(gid).rsplit('/', 1)[-1]
+
+
+def start_bulk_export():
+    """
+    Start a bulk operation that exports all products and variants.
+    Returns the bulk operation ID.
+    """
+    mutation = '''
+        mutation runExport($query: String!) {
+          bulkOperationRunQuery(query: $query) {
+            bulkOperation { id status }
+            userErrors { field message }
+          }
+        }
+    '''
+    data = _graphql(mutation, {'query': BULK_PRODUCTS_QUERY})
+    result = data.get('bulkOperationRunQuery') or {}
+    user_errors = result.get('userErrors') or []
+    if user_errors:
+        raise RuntimeError(f'Bulk operation rejected: {user_errors}')
+
+    operation = result['bulkOperation']
+    init_catalog_db()
+    conn = get_catalog_db()
+    conn.execute('''
+        INSERT INTO shopify_catalog_snapshots (bulk_operation_id, status)
+        VALUES (?, ?)
+    ''', (operation['id'], operation['status']))
+    conn.commit()
+    conn.close()
+
+    print(f"[CATALOG] Started bulk export {operation['id']}")
+    return operation['id']
+
+
+def get_current_bulk_operation():
+    """Return Shopify's view of the current bulk query operation (or None)"""
+    query = '''
+        {
+          currentBulkOperation(type: QUERY) {
+            id status errorCode objectCount url partialDataUrl
+          }
+        }
+    '''
+    return _graphql(query).get('currentBulkOperation')
+
+
+def _iter_jsonl(url):
+    """Stream a bulk operation result file line by line"""
+    with requests.get(url, stream=True, timeout=(10, 300)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def import_bulk_result(url, bulk_operation_id=None):
+    """
+    Stream a bulk operation JSONL file into the snapshot tables.
+
+    Parent rows always precede their children in Shopify's export, so
+    variants can be resolved against product option names as they arrive.
+    The whole import runs in one transaction: readers keep seeing the
+    previous snapshot until the new one is committed.
+    """
+    init_catalog_db()
+    conn = get_catalog_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT id FROM shopify_catalog_snapshots WHERE bulk_operation_id = ? ORDER BY id DESC LIMIT 1',
+                   (bulk_operation_id,))
+    row = cursor.fetchone()
+    snapshot_id = row['id'] if row else None
+
+    option_names = {}  # product gid -> [option names in position order]
+    variant_positions = {}
+    product_rows = []
+    variant_rows = []
+    product_count = 0
+    variant_count = 0
+
+    def flush():
+        if product_rows:
+            cursor.executemany('''
+                INSERT INTO shopify_catalog_products
+                (product_id, handle, title, status, product_type, options_json, snapshot_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', product_rows)
+            product_rows.clear()
+        if variant_rows:
+            cursor.executemany('''
+                INSERT INTO shopify_catalog_variants
+                (variant_id, product_id, title, option1, option2, option3, price, sku, position)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', variant_rows)
+            variant_rows.clear()
+
+    try:
+        cursor.execute('BEGIN')
+        cursor.execute('DELETE FROM shopify_catalog_variants')
+        cursor.execute('DELETE FROM shopify_catalog_products')
+
+        for record in _iter_jsonl(url):
+            parent_gid = record.get('__parentId')
+
+            if parent_gid is None:
+                options = [{
+                    'id': _legacy_id(option.get('id')),
+                    'name': option.get('name'),
+                    'values': option.get('values') or []
+                } for option in record.get('options') or []]
+                option_names[record['id']] = [option['name'] for option in options]
+
+                product_rows.append((
+                    record.get('legacyResourceId') or _legacy_id(record['id']),
+                    record.get('handle', ''),
+                    record.get('title', ''),
+                    record.get('status'),
+                    record.get('productType'),
+                    json.dumps(options),
+                    snapshot_id
+                ))
+                product_count += 1
+            else:
+                names = option_names.get(parent_gid, [])
+                values = [None, None, None]
+                for selected in record.get('selectedOptions') or []:
+                    if selected.get('name') in names:
+                        index = names.index(selected['name'])
+                        if index < 3:
+                            values[index] = selected.get('value')
+
+                position = variant_positions.get(parent_gid, 0) + 1
+                variant_positions[parent_gid] = position
+
+                variant_rows.append((
+                    record.get('legacyResourceId') or _legacy_id(record['id']),
+                    _legacy_id(parent_gid),
+                    record.get('title'),
+                    values[0],
+                    values[1],
+                    values[2],
+                    record.get('price'),
+                    record.get('sku'),
+                    position
+                ))
+                variant_count += 1
+
+            if len(product_rows) + len(variant_rows) >= IMPORT_BATCH_SIZE:
+                flush()
+
+        flush()
+        cursor.execute('''
+            DELETE FROM shopify_catalog_missing
+            WHERE product_id IN (SELECT product_id FROM shopify_catalog_products)
+        ''')
+        cursor.execute('''
+            UPDATE shopify_catalog_snapshots
+            SET status = 'IMPORTED', product_count = ?, variant_count = ?, completed_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (product_count, variant_count, snapshot_id))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        if snapshot_id:
+            conn.execute("UPDATE shopify_catalog_snapshots SET status = 'FAILED', error = ? WHERE id = ?",
+                         (str(e), snapshot_id))
+            conn.commit()
+        conn.close()
+        raise
+
+    conn.close()
+    print(f"[CATALOG] Imported {product_count} products / {variant_count} variants")
+    return {'products': product_count, 'variants': variant_count}
+
+
+def import_bulk_result_empty(bulk_operation_id):
+    """Record a completed export that returned no rows"""
+    conn = get_catalog_db()
+    conn.execute('DELETE FROM shopify_catalog_variants')
+    conn.execute('DELETE FROM shopify_catalog_products')
+    conn.execute('''
+        UPDATE shopify_catalog_snapshots
+        SET status = 'IMPORTED', product_count = 0, variant_count = 0, completed_at = CURRENT_TIMESTAMP
+        WHERE bulk_operation_id = ?
+    ''', (bulk_operation_id,))
+    conn.commit()
+    conn.close()
+
+
+def poll_bulk_export(bulk_operation_id=None):
+    """
+    Check the running export once; import the result if it has finished.
+    Returns a status dict suitable for the admin API.
+    """
+    operation = get_current_bulk_operation()
+    if not operation or (bulk_operation_id and operation['id'] != bulk_operation_id):
+        return {'status': 'NOT_FOUND'}
+
+    status = {
+        'bulk_operation_id': operation['id'],
+        'status': operation['status'],
+        'object_count': int(operation.get('objectCount') or 0)
+    }
+
+    if operation['status'] == 'COMPLETED':
+        conn = get_catalog_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT status FROM shopify_catalog_snapshots WHERE bulk_operation_id = ? ORDER BY id DESC LIMIT 1',
+                       (operation['id'],))
+        row = cursor.fetchone()
+        conn.close()
+
+        if row and row['status'] == 'IMPORTED':
+            status['status'] = 'IMPORTED'
+        elif operation.get('url'):
+            status.update(import_bulk_result(operation['url'], operation['id']))
+            status['status'] = 'IMPORTED'
+            status['backfilled'] = backfill_mapped_products()
+        else:
+            # Completed with no url means the store has no products
+            import_bulk_result_empty(operation['id'])
+            status['status'] = 'IMPORTED'
+            status['backfilled'] = backfill_mapped_products()
+    elif operation['status'] in ('FAILED', 'CANCELED', 'EXPIRED'):
+        status['error'] = operation.get('errorCode')
+        conn = get_catalog_db()
+        conn.execute('UPDATE shopify_catalog_snapshots SET status = ?, error = ? WHERE bulk_operation_id = ?',
+                     (operation['status'], operation.get('errorCode'), operation['id']))
+        conn.commit()
+        conn.close()
+
+    return status
+
+
+def refresh_catalog_snapshot(timeout=300, poll_interval=3):
+    """Run a full export and block until it has been imported"""
+    bulk_operation_id = start_bulk_export()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = poll_bulk_export(bulk_operation_id)
+        if status['status'] == 'IMPORTED':
+            return status
+        if status['status'] in ('FAILED', 'CANCELED', 'EXPIRED', 'NOT_FOUND'):
+            raise RuntimeError(f"Bulk export {bulk_operation_id} ended with {status['status']}: {status.get('error')}")
+        time.sleep(poll_interval)
+    raise TimeoutError(f'Bulk export {bulk_operation_id} still running after {timeout}s')
+
+
+def get_latest_snapshot():
+    """Return the most recently imported snapshot record (or None)"""
+    init_catalog_db()
+    conn = get_catalog_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM shopify_catalog_snapshots
+        WHERE status = 'IMPORTED'
+        ORDER BY id DESC LIMIT 1
+    ''')
+    row = cursor.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def ensure_catalog_snapshot(timeout=300):
+    """Refresh the snapshot if none has been imported yet"""
+    if get_latest_snapshot() is None:
+        refresh_catalog_snapshot(timeout=timeout)
+
+
+def upsert_catalog_product(product):
+    """Write one REST product payload (with its variants) into the snapshot, replacing its old rows"""
+    init_catalog_db()
+    options = [{
+        'id': option.get('id'),
+        'name': option.get('name'),
+        'values': option.get('values') or []
+    } for option in product.get('options') or []]
+    product_id = str(product['id'])
+    conn = get_catalog_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN')
+        cursor.execute('''
+            INSERT INTO shopify_catalog_products
+            (product_id, handle, title, status, product_type, options_json, snapshot_id, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, NULL, CURRENT_TIMESTAMP)
+            ON CONFLICT(product_id) DO UPDATE SET
+                handle = excluded.handle, title = excluded.title, status = excluded.status,
+                product_type = excluded.product_type, options_json = excluded.options_json,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (product_id, product.get('handle', ''), product.get('title', ''),
+              (product.get('status') or '').upper() or None, product.get('product_type'), json.dumps(options)))
+        cursor.execute('DELETE FROM shopify_catalog_missing WHERE product_id = ?', (product_id,))
+        cursor.execute('DELETE FROM shopify_catalog_variants WHERE product_id = ?', (product_id,))
+        cursor.executemany('''
+            INSERT INTO shopify_catalog_variants
+            (variant_id, product_id, title, option1, option2, option3, price, sku, position)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(str(variant['id']), product_id, variant.get('title'), variant.get('option1'), variant.get('option2'),
+               variant.get('option3'), variant.get('price'), variant.get('sku'), variant.get('position') or index + 1)
+              for index, variant in enumerate(product.get('variants') or [])])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def fetch_catalog_product(product_id):
+    """Fetch one product from the live API into the snapshot; None (and remembered) if Shopify doesn't have it"""
+    response = get_shopify_client().get(f'products/{product_id}.json', timeout=30)
+    if response.status_code == 404:
+        conn = get_catalog_db()
+        conn.execute('INSERT OR IGNORE INTO shopify_catalog_missing (product_id) VALUES (?)', (str(product_id),))
+        conn.commit()
+        conn.close()
+        return None
+    response.raise_for_status()
+    upsert_catalog_product(response.json()['product'])
+    return get_catalog_product(product_id, fetch_missing=False)
+
+
+def backfill_mapped_products():
+    """
+    Live-fetch products listed in shopify_products but missing from the
+    snapshot (run after each export import; known-missing ids are skipped).
+    Returns how many were added.
+    """
+    init_catalog_db()
+    conn = get_catalog_db()
+    try:
+        rows = conn.execute('''
+            SELECT DISTINCT sp.shopify_product_id FROM shopify_products sp
+            LEFT JOIN shopify_catalog_products cp ON cp.product_id = sp.shopify_product_id
+            LEFT JOIN shopify_catalog_missing cm ON cm.product_id = sp.shopify_product_id
+            WHERE cp.product_id IS NULL AND cm.product_id IS NULL
+        ''').fetchall()
+    except sqlite3.OperationalError:
+        rows = []   # shopify_products not created yet
+    finally:
+        conn.close()
+
+    added = 0
+    for row in rows:
+        try:
+            if fetch_catalog_product(row[0]):
+                added += 1
+        except Exception as e:
+            print(f"[CATALOG] Could not fetch product {row[0]}: {e}")
+    if added:
+        print(f"[CATALOG] Added {added} products created since the last export")
+    return added
+
+
+def get_catalog_product_count():
+    """Number of products in the snapshot"""
+    init_catalog_db()
+    conn = get_catalog_db()
+    count = conn.execute('SELECT COUNT(*) FROM shopify_catalog_products').fetchone()[0]
+    conn.close()
+    return count
+
+
+def _rows_to_products(cursor, product_rows):
+    """Shape snapshot rows like REST product payloads (id/handle/title/options/variants)"""
+    products = []
+    by_id = {}
+    for row in product_rows:
+        product = {
+            'id': int(row['product_id']) if row['product_id'].isdigit() else row['product_id'],
+            'handle': row['handle'],
+            'title': row['title'],
+            'status': row['status'],
+            'product_type': row['product_type'],
+            'options': json.loads(row['options_json'] or '[]'),
+            'variants': []
+        }
+        for option in product['options']:
+            if option.get('id') and str(option['id']).isdigit():
+                option['id'] = int(option['id'])
+        products.append(product)
+        by_id[row['product_id']] = product
+
+    if not by_id:
+        return products
+
+    placeholders = ','.join('?' * len(by_id))
+    cursor.execute(f'''
+        SELECT * FROM shopify_catalog_variants
+        WHERE product_id IN ({placeholders})
+        ORDER BY product_id, position
+    ''', list(by_id.keys()))
+    for row in cursor.fetchall():
+        by_id[row['product_id']]['variants'].append({
+            'id': int(row['variant_id']) if row['variant_id'].isdigit() else row['variant_id'],
+            'product_id': by_id[row['product_id']]['id'],
+            'title': row['title'],
+            'option1': row['option1'],
+            'option2': row['option2'],
+            'option3': row['option3'],
+            'price': row['price'],
+            'sku': row['sku']
+        })
+    return products
+
+
+def get_catalog_products(offset=0, limit=None):
+    """Return products (with variants) from the snapshot, ordered by product ID"""
+    init_catalog_db()
+    conn = get_catalog_db()
+    cursor = conn.cursor()
+    if limit is None:
+        cursor.execute('SELECT * FROM shopify_catalog_products ORDER BY CAST(product_id AS INTEGER)')
+    else:
+        cursor.execute('SELECT * FROM shopify_catalog_products ORDER BY CAST(product_id AS INTEGER) LIMIT ? OFFSET ?',
+                       (limit, offset))
+    products = _rows_to_products(cursor, cursor.fetchall())
+    conn.close()
+    return products
+
+
+def get_catalog_product(product_id, fetch_missing=True):
+    """Return one product (with variants) from the snapshot - fetched live on a miss, unless known missing - or None"""
+    init_catalog_db()
+    conn = get_catalog_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM shopify_catalog_products WHERE product_id = ?', (str(product_id),))
+    products = _rows_to_products(cursor, cursor.fetchall())
+    known_missing = cursor.execute('SELECT 1 FROM shopify_catalog_missing WHERE product_id = ?',
+                                   (str(product_id),)).fetchone()
+    conn.close()
+    if products:
+        return products[0]
+    if fetch_missing and not known_missing:
+        try:
+            return fetch_catalog_product(product_id)
+        except Exception as e:
+            print(f"[CATALOG] Could not fetch product {product_id}: {e}")
+    return None
+
+
+def iter_catalog_products(batch_size=250):
+    """Yield every snapshot product without loading the whole catalog at once"""
+    offset = 0
+    while True:
+        batch = get_catalog_products(offset=offset, limit=batch_size)
+        if not batch:
+            break
+        for product in batch:
+            yield product
+        offset += batch_size
+
+
+def update_catalog_variant_price(variant_id, price):
+    """Keep the snapshot in step after a successful REST price update"""
+    conn = get_catalog_db()
+    conn.execute('UPDATE shopify_catalog_variants SET price = ? WHERE variant_id = ?', (str(price), str(variant_id)))
+    conn.commit()
+    conn.close()
+
+
+def update_catalog_product_options(product_id, options, variants):
+    """Keep the snapshot in step after a successful REST option update"""
+    conn = get_catalog_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE shopify_catalog_products SET options_json = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE product_id = ?
+    ''', (json.dumps(options), str(product_id)))
+    cursor.executemany('''
+        UPDATE shopify_catalog_variants
+        SET option1 = COALESCE(?, option1), option2 = COALESCE(?, option2), option3 = COALESCE(?, option3)
+        WHERE variant_id = ?
+    ''', [(v.get('option1'), v.get('option2'), v.get('option3'), str(v['id'])) for v in variants])
+    conn.commit()
+    conn.close()
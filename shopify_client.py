@@ -0,0 +1,232 @@
+"""
+Fifth Element Photography - Shared Shopify API Client
+Pooled keep-alive session, leaky-bucket rate limiting driven by the
+X-Shopify-Shop-Api-Call-Limit header, 429 retry with backoff (plus 5xx and
+connection-error retry for idempotent requests) and a bounded worker pool
+for concurrent calls.
+Version: 1.0.0
+
+Usage:
+    from shopify_client import get_shopify_client
+    client = get_shopify_client()
+    response = client.get('products/123.json')
+    client.put(f'variants/{variant_id}.json', json={...})
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+SHOPIFY_STORE = os.environ.get('SHOPIFY_STORE', 'fifth-element-photography.myshopify.com')
+SHOPIFY_API_SECRET = os.environ.get('SHOPIFY_API_SECRET', '')
+SHOPIFY_API_VERSION = '2024-01'
+
+# Standard plan: 40-call bucket that leaks 2 calls/second
+DEFAULT_BUCKET_SIZE = 40
+DEFAULT_LEAK_RATE = 2.0
+DEFAULT_TIMEOUT = 30
+MAX_RETRIES = 5
+MAX_WORKERS = 4
+
+
+class LeakyBucket:
+    """
+    Client-side mirror of Shopify's REST leaky bucket.
+
+    Each call reserves one slot; the estimate drains at leak_rate per second
+    and is re-synced from X-Shopify-Shop-Api-Call-Limit ("used/size") on
+    every response, so several workers share one budget.
+    """
+
+    def __init__(self, size=DEFAULT_BUCKET_SIZE, leak_rate=DEFAULT_LEAK_RATE, headroom=2):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _drain(self, now):
+        self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a call fits in the bucket, then reserve it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._drain(now)
+                if self.level + 1 <= self.size - self.headroom:
+                    self.level += 1
+                    return
+                wait = (self.level + 1 - (self.size - self.headroom)) / self.leak_rate
+            time.sleep(wait)
+
+    def update_from_header(self, header_value):
+        """Sync with the server's view, e.g. '32/40'"""
+        if not header_value:
+            return
+        try:
+            used, size = header_value.split('/')
+            used, size = float(used), int(size)
+        except ValueError:
+            return
+        with self.lock:
+            self._drain(time.monotonic())
+            self.size = size
+            # Our own in-flight reservations may not be counted yet; keep the larger view
+            self.level = max(self.level, used)
+
+    def penalize(self):
+        """A 429 means the bucket is full whatever our estimate says"""
+        with self.lock:
+            self.level = float(self.size)
+            self.updated = time.monotonic()
+
+
+class ShopifyClient:
+    """Thread-safe Shopify Admin API client shared by all Shopify blueprints"""
+
+    def __init__(self, store=SHOPIFY_STORE, access_token=SHOPIFY_API_SECRET,
+                 api_version=SHOPIFY_API_VERSION, max_workers=MAX_WORKERS):
+        self.store = store
+        self.access_token = access_token
+        self.api_version = api_version
+        self.max_workers = max_workers
+        self.bucket = LeakyBucket()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(max_workers, 10))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'X-Shopify-Access-Token': access_token
+        })
+
+    @property
+    def base_url(self):
+        return f'https://{self.store}/admin/api/{self.api_version}'
+
+    def url(self, path):
+        """Accept either a full URL (e.g. a Link header page) or a path like 'products.json'"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def request(self, method, path, max_retries=MAX_RETRIES, idempotent=None, **kwargs):
+        """
+        Send one rate-limited request. 429 responses are always retried with
+        Retry-After or exponential backoff; connection errors, timeouts and
+        502/503/504 only for idempotent requests (default: GET, PUT, DELETE),
+        since Shopify may already have committed a POST that timed out. The
+        final response is returned either way so callers keep their
+        status-code handling.
+        """
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+        url = self.url(path)
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in ('GET', 'PUT', 'DELETE')
+
+        for attempt in range(max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not idempotent or attempt >= max_retries:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            self.bucket.update_from_header(response.headers.get('X-Shopify-Shop-Api-Call-Limit'))
+
+            if response.status_code == 429 or (idempotent and response.status_code in (502, 503, 504)):
+                if attempt >= max_retries:
+                    return response
+                if response.status_code == 429:
+                    self.bucket.penalize()
+                retry_after = response.headers.get('Retry-After')
+                try:
+                    delay = float(retry_after) if retry_after else 2 ** attempt
+                except ValueError:
+                    delay = 2 ** attempt
+                print(f"[SHOPIFY] HTTP {response.status_code} on {method} {url[:80]}, retrying in {delay}s")
+                time.sleep(min(delay, 30))
+                continue
+
+            return response
+
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def graphql(self, query, variables=None):
+        """Run a GraphQL Admin API request and return the data payload (queries are retried like GETs)"""
+        idempotent = not query.lstrip().startswith('mutation')
+        response = self.post('graphql.json', json={'query': query, 'variables': variables or {}},
+                             idempotent=idempotent)
+        if response.status_code != 200:
+            raise RuntimeError(f'Shopify GraphQL HTTP {response.status_code}: {response.text[:500]}')
+
+        payload = response.json()
+        if payload.get('errors'):
+            raise RuntimeError(f'Shopify GraphQL error: {payload["errors"]}')
+        return payload.get('data', {})
+
+    def map_concurrent(self, func, items, max_workers=None):
+        """
+        Run func(item) for every item on a bounded worker pool.
+        Returns results in input order; exceptions are returned in place
+        of results so one failure doesn't abort the batch.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def run(item):
+            try:
+                return func(item)
+            except Exception as e:
+                return e
+
+        workers = min(max_workers or self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run, items))
+
+
+def next_page_url(response):
+    """Extract the rel="next" URL from a REST Link header (or None)"""
+    link_header = response.headers.get('Link', '')
+    for link in link_header.split(','):
+        if 'rel="next"' in link:
+            return link.split(';')[0].strip('<> ')
+    return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_shopify_client():
+    """Process-wide client so every blueprint shares one pool and one bucket"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ShopifyClient()
+    return _client
@@ -5,7 +5,7 @@ Version: 1.0.0
 """
 
 import os
-import requests
+from shopify_client import get_shopify_client
 import json
 from datetime import datetime
 
@@ -40,11 +40,10 @@ def check_customer_exists(email):
         dict: Customer data if exists, None otherwise
     """
     try:
-        url = f"https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/customers/search.json"
         params = {'query': f'email:{email}'}
         headers = get_shopify_headers()
         
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = get_shopify_client().get('customers/search.json', headers=headers, params=params, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -93,7 +92,6 @@ def create_shopify_customer(first_name, last_name, email, tags=None):
             }
         
         # Create new customer
-        url = f"https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/customers.json"
         headers = get_shopify_headers()
         
         # Prepare customer data
@@ -114,7 +112,7 @@ def create_shopify_customer(first_name, last_name, email, tags=None):
             }
         }
         
-        response = requests.post(url, headers=headers, json=customer_data, timeout=10)
+        response = get_shopify_client().post('customers.json', headers=headers, json=customer_data, timeout=10)
         
         if response.status_code == 201:
             data = response.json()
@@ -176,7 +174,6 @@ def update_customer_tags(customer_id, new_tags, existing_tags_str=''):
         dict: Response with success status
     """
     try:
-        url = f"https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/customers/{customer_id}.json"
         headers = get_shopify_headers()
         
         # Parse existing tags
@@ -193,7 +190,7 @@ def update_customer_tags(customer_id, new_tags, existing_tags_str=''):
             }
         }
         
-        response = requests.put(url, headers=headers, json=update_data, timeout=10)
+        response = get_shopify_client().put(f'customers/{customer_id}.json', headers=headers, json=update_data, timeout=10)
         
         if response.status_code == 200:
             return {
@@ -226,10 +223,9 @@ def get_customer_by_id(customer_id):
         dict: Customer data or None
     """
     try:
-        url = f"https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_API_VERSION}/customers/{customer_id}.json"
         headers = get_shopify_headers()
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_shopify_client().get(f'customers/{customer_id}.json', headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
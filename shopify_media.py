@@ -0,0 +1,192 @@
+"""
+Fifth Element Photography - Shopify Product Image Uploads
+Uploads each gallery image to Shopify once (staged upload, streamed from
+disk) and caches the resulting file per content hash, so every category
+product for the image references the same hosted copy instead of carrying
+its own base64 attachment.
+Version: 1.0.0
+
+Usage:
+    from shopify_media import get_product_image
+    image = get_product_image(filename, image_path)   # {'src': ..., 'alt': ...}
+    product_data['product']['images'] = [image]
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import mimetypes
+from urllib.parse import quote
+import requests
+from shopify_client import get_shopify_client
+
+if os.path.exists('/data'):
+    DB_PATH = '/data/print_ordering.db'
+else:
+    DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering.db')
+
+# Fallback when the staged upload fails: Shopify fetches the image from our own site
+PUBLIC_SITE_URL = os.environ.get('PUBLIC_SITE_URL', 'https://fifthelement.photos')
+
+HASH_CHUNK_SIZE = 1024 * 1024
+FILE_READY_TIMEOUT = 60
+FILE_POLL_INTERVAL = 2
+
+STAGED_UPLOAD_MUTATION = '''
+mutation stagedUploadsCreate($input: [StagedUploadInput!]!) {
+  stagedUploadsCreate(input: $input) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+'''
+
+FILE_CREATE_MUTATION = '''
+mutation fileCreate($files: [FileCreateInput!]!) {
+  fileCreate(files: $files) {
+    files { id fileStatus ... on MediaImage { image { url } } }
+    userErrors { field message }
+  }
+}
+'''
+
+FILE_STATUS_QUERY = '''
+query fileStatus($id: ID!) {
+  node(id: $id) { ... on MediaImage { id fileStatus image { url } } }
+}
+'''
+
+
+def init_media_db():
+    """Create the upload cache table if it doesn't exist"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS shopify_media_cache (
+            image_hash TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            image_url TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def file_sha256(path):
+    """Hash a file in chunks (never holds the whole image in memory)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cached_media(image_hash):
+    init_media_db()
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute('SELECT * FROM shopify_media_cache WHERE image_hash = ?', (image_hash,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def save_cached_media(image_hash, filename, file_id, image_url):
+    init_media_db()
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute('''
+        INSERT INTO shopify_media_cache (image_hash, filename, file_id, image_url)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(image_hash) DO UPDATE SET
+            filename = excluded.filename,
+            file_id = excluded.file_id,
+            image_url = excluded.image_url
+    ''', (image_hash, filename, file_id, image_url))
+    conn.commit()
+    conn.close()
+
+
+def staged_upload(image_path, filename):
+    """
+    Reserve a staged upload target and stream the file to it.
+    Returns the resourceUrl Shopify uses to create the file.
+    """
+    mime_type = mimetypes.guess_type(filename)[0] or 'image/jpeg'
+    data = get_shopify_client().graphql(STAGED_UPLOAD_MUTATION, {'input': [{
+        'resource': 'IMAGE',
+        'filename': filename,
+        'mimeType': mime_type,
+        'httpMethod': 'PUT',
+        'fileSize': str(os.path.getsize(image_path))
+    }]})
+    result = data.get('stagedUploadsCreate') or {}
+    if result.get('userErrors'):
+        raise RuntimeError(f"stagedUploadsCreate: {result['userErrors']}")
+    target = result['stagedTargets'][0]
+
+    headers = {param['name']: param['value'] for param in target.get('parameters', [])}
+    headers.setdefault('Content-Type', mime_type)
+
+    # Plain requests (not the Shopify session) so the admin token never goes to the storage host;
+    # passing the open file streams it instead of reading it into memory
+    with open(image_path, 'rb') as f:
+        response = requests.put(target['url'], data=f, headers=headers, timeout=300)
+    if response.status_code not in (200, 201, 204):
+        raise RuntimeError(f'Staged upload HTTP {response.status_code}: {response.text[:200]}')
+
+    return target['resourceUrl']
+
+
+def create_shopify_file(resource_url, alt):
+    """Turn a staged upload into a Shopify file and wait until it has a CDN URL"""
+    client = get_shopify_client()
+    data = client.graphql(FILE_CREATE_MUTATION, {'files': [{
+        'originalSource': resource_url,
+        'contentType': 'IMAGE',
+        'alt': alt
+    }]})
+    result = data.get('fileCreate') or {}
+    if result.get('userErrors'):
+        raise RuntimeError(f"fileCreate: {result['userErrors']}")
+    created = result['files'][0]
+    file_id = created['id']
+
+    deadline = time.time() + FILE_READY_TIMEOUT
+    node = created
+    while True:
+        if node.get('fileStatus') == 'FAILED':
+            raise RuntimeError(f'Shopify could not process file {file_id}')
+        image_url = (node.get('image') or {}).get('url')
+        if image_url:
+            return file_id, image_url
+        if time.time() > deadline:
+            raise RuntimeError(f'Timed out waiting for file {file_id}')
+        time.sleep(FILE_POLL_INTERVAL)
+        node = client.graphql(FILE_STATUS_QUERY, {'id': file_id}).get('node') or {}
+
+
+def public_gallery_image_url(filename):
+    return f"{PUBLIC_SITE_URL.rstrip('/')}/gallery-image/{quote(filename)}"
+
+
+def get_product_image(filename, image_path, alt=''):
+    """
+    Image reference for a product-create payload.
+    Uploads the file at most once per content hash; if the staged upload
+    fails, falls back to our public /gallery-image URL as the src.
+    """
+    try:
+        image_hash = file_sha256(image_path)
+        cached = get_cached_media(image_hash)
+        if cached:
+            return {'src': cached['image_url'], 'alt': alt}
+
+        resource_url = staged_upload(image_path, filename)
+        file_id, image_url = create_shopify_file(resource_url, alt)
+        save_cached_media(image_hash, filename, file_id, image_url)
+        print(f"[SHOPIFY MEDIA] Uploaded {filename} once as {file_id}")
+        return {'src': image_url, 'alt': alt}
+    except Exception as e:
+        print(f"[SHOPIFY MEDIA] Staged upload failed for {filename}, using gallery URL: {e}")
+        return {'src': public_gallery_image_url(filename), 'alt': alt}
@@ -51,8 +51,8 @@ function sortShopifyImages() {
         const dateA = a.dataset.date;
         const dateB = b.dataset.date;
         
-        const hasShopifyA = a.querySelector('.fa-check') !== null;
-        const hasShopifyB = b.querySelector('.fa-check') !== null;
+        const hasShopifyA = a.dataset.live === '1';
+        const hasShopifyB = b.dataset.live === '1';
         
         switch(sortBy) {
             case 'a-z':
@@ -77,16 +77,85 @@ function sortShopifyImages() {
     items.forEach(item => grid.appendChild(item));
 }
 
-// Sort on page load (newest first by default)
+// Lazy-load the Shopify tab's image list from the admin image index (first time the tab opens)
+let shopifyImagesLoaded = false;
+
+function createShopifyImageItem(image) {
+    const item = document.createElement('div');
+    item.className = 'shopify-image-item';
+    item.style.cssText = 'position: relative; background: #2a2a2a; border-radius: 8px; padding: 10px; cursor: pointer;';
+    item.dataset.filename = image.filename;
+    item.dataset.date = image.date_added || '';
+    item.dataset.live = image.has_shopify_products ? '1' : '0';
+    
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.className = 'image-checkbox';
+    checkbox.value = image.filename;
+    checkbox.style.cssText = 'position: absolute; top: 15px; left: 15px; width: 20px; height: 20px; cursor: pointer; z-index: 10;';
+    item.appendChild(checkbox);
+    
+    const frame = document.createElement('div');
+    frame.style.cssText = 'width: 100%; aspect-ratio: 1; overflow: hidden; border-radius: 4px; margin-bottom: 8px; position: relative;';
+    const img = document.createElement('img');
+    img.src = '/thumbnail/' + encodeURIComponent(image.filename);
+    img.alt = image.title || image.filename;
+    img.loading = 'lazy';
+    img.style.cssText = 'width: 100%; height: 100%; object-fit: cover;';
+    frame.appendChild(img);
+    item.appendChild(frame);
+    
+    const label = document.createElement('div');
+    label.style.cssText = 'font-size: 12px; color: #ccc; text-align: center; word-break: break-word;';
+    label.textContent = image.filename;
+    item.appendChild(label);
+    return item;
+}
+
+async function loadShopifyImages() {
+    const grid = document.getElementById('shopifyImageGrid');
+    if (!grid || shopifyImagesLoaded) return;
+    shopifyImagesLoaded = true;
+    
+    const status = document.getElementById('shopifyImageGridStatus');
+    let cursor = null;
+    try {
+        do {
+            const params = new URLSearchParams({ sort: 'date-new', limit: '200' });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch('/api/admin/images?' + params.toString());
+            const data = await response.json();
+            if (!data.success) throw new Error(data.error);
+            
+            const fragment = document.createDocumentFragment();
+            data.images.forEach(image => fragment.appendChild(createShopifyImageItem(image)));
+            grid.appendChild(fragment);
+            cursor = data.next_cursor;
+        } while (cursor);
+        
+        if (status) status.remove();
+        sortShopifyImages();
+    } catch (error) {
+        console.error('Error loading Shopify images:', error);
+        shopifyImagesLoaded = false;
+        if (status) status.textContent = 'Could not load images: ' + error.message;
+    }
+}
+
 document.addEventListener('DOMContentLoaded', function() {
-    // Wait a bit for the tab to be ready
-    setTimeout(() => {
-        const grid = document.getElementById('shopifyImageGrid');
-        if (grid) {
-            sortShopifyImages();
-        }
-    }, 500);
+    const shopifyTabButton = document.querySelector('.admin-tab-button[data-tab="shopify"]');
+    if (shopifyTabButton) {
+        shopifyTabButton.addEventListener('click', loadShopifyImages);
+    }
+    
+    // The tab may already be open (restored from localStorage)
+    const shopifyTab = document.getElementById('tab-shopify');
+    if (shopifyTab && shopifyTab.classList.contains('active')) {
+        loadShopifyImages();
+    }
 });
 
+window.loadShopifyImages = loadShopifyImages;
+
 // Expose function globally
 window.sortShopifyImages = sortShopifyImages;
@@ -0,0 +1,270 @@
+"""
+Lumaprints client tests against a local HTTP stub (no network access needed).
+
+Covers connection reuse, retry/backoff rules (idempotent requests retried on
+5xx, order submission only on 429), bulk pricing (dedupe, parallelism, errors)
+and writing quotes into the pricing DB.
+
+Run: python -m pytest test_lumaprints_client.py   (or: python test_lumaprints_client.py)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from lumaprints_api import LumaprintsAPI, LumaprintsPricingCalculator, store_pricing_quotes
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering_schema.sql')
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.client_ports = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.scripts = {}       # (method, path) -> list of status codes to return before 200
+        self.pricing_delay = 0.0
+
+    def hit(self, key, port):
+        with self.lock:
+            self.hits[key] = self.hits.get(key, 0) + 1
+            self.client_ports.add(port)
+            script = self.scripts.get(key)
+            return script.pop(0) if script else 200
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive, so connection reuse is observable
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length)) if length else None
+        path = self.path.replace('/api/v1', '', 1)
+        status = state.hit((method, path), self.client_address[1])
+        if status != 200:
+            return self._send(status, {'message': 'stub error'}, {'Retry-After': '0'} if status == 429 else None)
+
+        if path == '/products/categories':
+            return self._send(200, [{'id': 101, 'name': 'Canvas'}])
+        if path == '/orders':
+            return self._send(200, {'orderNumber': 5001})
+        if path == '/pricing':
+            with state.lock:
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                time.sleep(state.pricing_delay)
+                if data['subcategoryId'] == 999:
+                    return self._send(400, {'message': 'Unknown subcategory'})
+                price = round(data['width'] * data['height'] * 0.1 + 2 * len(data.get('options') or []), 2)
+                return self._send(200, {'price': price})
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+        return self._send(404, {'message': 'not found'})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_client(server, **kwargs):
+    kwargs.setdefault('backoff_factor', 0)
+    return LumaprintsAPI('key', 'secret', base_url=f'http://127.0.0.1:{server.server_port}/api/v1', **kwargs)
+
+
+def make_pricing_db():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_FILE) as f:
+        conn.executescript(f.read())
+    conn.executemany('INSERT INTO print_sizes (aspect_ratio_id, width, height, size_name) VALUES (1, ?, ?, ?)',
+                     [(8, 10, '8×10'), (12, 18, '12×18')])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_requests_reuse_one_connection():
+    server = start_stub()
+    try:
+        api = make_client(server)
+        for _ in range(5):
+            assert api.get_categories() == [{'id': 101, 'name': 'Canvas'}]
+        assert server.state.hits[('GET', '/products/categories')] == 5
+        assert len(server.state.client_ports) == 1
+    finally:
+        server.shutdown()
+
+
+def test_get_is_retried_on_server_errors():
+    server = start_stub()
+    try:
+        server.state.scripts[('GET', '/products/categories')] = [503, 502]
+        api = make_client(server)
+        assert api.get_categories() == [{'id': 101, 'name': 'Canvas'}]
+        assert server.state.hits[('GET', '/products/categories')] == 3
+    finally:
+        server.shutdown()
+
+
+def test_get_gives_up_after_max_retries():
+    server = start_stub()
+    try:
+        server.state.scripts[('GET', '/products/categories')] = [503] * 10
+        api = make_client(server, max_retries=2)
+        try:
+            api.get_categories()
+            assert False, 'expected HTTPError'
+        except requests.exceptions.HTTPError:
+            pass
+        assert server.state.hits[('GET', '/products/categories')] == 3
+    finally:
+        server.shutdown()
+
+
+def test_order_submission_is_not_retried_on_server_errors():
+    server = start_stub()
+    try:
+        server.state.scripts[('POST', '/orders')] = [502]
+        api = make_client(server)
+        try:
+            api.submit_order({'externalId': 'A1'})
+            assert False, 'expected HTTPError'
+        except requests.exceptions.HTTPError:
+            pass
+        assert server.state.hits[('POST', '/orders')] == 1
+    finally:
+        server.shutdown()
+
+
+def test_order_submission_is_retried_when_rate_limited():
+    server = start_stub()
+    try:
+        server.state.scripts[('POST', '/orders')] = [429]
+        api = make_client(server)
+        assert api.submit_order({'externalId': 'A1'})['orderNumber'] == 5001
+        assert server.state.hits[('POST', '/orders')] == 2
+    finally:
+        server.shutdown()
+
+
+def test_bulk_pricing_dedupes_and_runs_in_parallel():
+    server = start_stub()
+    try:
+        server.state.pricing_delay = 0.1
+        api = make_client(server)
+        quotes = [{'subcategory_id': 101002, 'width': w, 'height': 10} for w in (8, 10, 12, 14, 16, 18)]
+        quotes.append({'subcategory_id': 101002, 'width': 8, 'height': 10})                  # duplicate
+        quotes.append({'subcategory_id': 101002, 'width': 8, 'height': 10, 'options': [7]})
+        quotes.append({'subcategory_id': 999, 'width': 8, 'height': 10})
+
+        results = api.get_pricing_bulk(quotes, max_workers=8)
+
+        assert len(results) == 8
+        assert server.state.hits[('POST', '/pricing')] == 8
+        assert server.state.max_in_flight > 1
+        assert results[0]['price'] == 8.0
+        assert results[6]['options'] == [7] and results[6]['price'] == 10.0
+        assert results[7]['error'] == 'Unknown subcategory'
+    finally:
+        server.shutdown()
+
+
+def test_refresh_pricing_db_writes_quotes_and_base_pricing():
+    server = start_stub()
+    db_path = make_pricing_db()
+    try:
+        calculator = LumaprintsPricingCalculator(make_client(server), markup_percentage=100.0)
+        summary = calculator.refresh_pricing_db([
+            {'subcategory_id': 101002, 'width': 8, 'height': 10},
+            {'subcategory_id': 101002, 'width': 12, 'height': 18},
+            {'subcategory_id': 101002, 'width': 12, 'height': 18, 'options': [7]},
+            {'subcategory_id': 101002, 'width': 20, 'height': 30},    # not in print_sizes
+            {'subcategory_id': 999, 'width': 8, 'height': 10},
+        ], db_path=db_path)
+
+        assert summary['fetched'] == 4
+        assert summary['failed'] == 1
+        assert summary['base_prices_updated'] == 2
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute('SELECT COUNT(*) FROM lumaprints_price_quotes').fetchone()[0] == 4
+        prices = dict(conn.execute('''
+            SELECT ps.size_name, bp.cost_price FROM base_pricing bp JOIN print_sizes ps ON ps.size_id = bp.size_id
+        ''').fetchall())
+        conn.close()
+        assert prices == {'8×10': 8.0, '12×18': 21.6}
+    finally:
+        server.shutdown()
+        os.remove(db_path)
+
+
+def test_store_pricing_quotes_keeps_availability_flag():
+    db_path = make_pricing_db()
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute('INSERT INTO base_pricing (subcategory_id, size_id, cost_price, is_available) VALUES (101002, 1, 5, 0)')
+        conn.commit()
+        conn.close()
+
+        store_pricing_quotes([{'subcategory_id': 101002, 'width': 8, 'height': 10, 'quantity': 1,
+                               'options': [], 'price': 9.5}], db_path)
+
+        conn = sqlite3.connect(db_path)
+        row = conn.execute('SELECT cost_price, is_available FROM base_pricing WHERE size_id = 1').fetchone()
+        conn.close()
+        assert row == (9.5, 0)
+    finally:
+        os.remove(db_path)
+
+
+def test_calculate_retail_prices_applies_markup():
+    server = start_stub()
+    try:
+        calculator = LumaprintsPricingCalculator(make_client(server), markup_percentage=50.0)
+        result = calculator.calculate_retail_prices([{'subcategory_id': 101002, 'width': 8, 'height': 10}])[0]
+        assert result['wholesale_price'] == 8.0
+        assert result['retail_price'] == 12.0
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f'✅ {name}')
@@ -0,0 +1,194 @@
+"""
+Query plan regression tests for the pricing/ordering databases.
+
+Builds empty print_ordering and lumaprints_pricing databases from the schema,
+applies migrate_query_indexes, then runs EXPLAIN QUERY PLAN on each production
+query and fails if any table is read with a full SCAN. The queries are imported
+from the modules that run them, so they can't drift from what the app executes.
+
+Run: python -m pytest test_query_plans.py   (or: python test_query_plans.py)
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+
+import migrate_query_indexes
+import hierarchical_queries
+from product_option_links import install_product_option_links
+from routes import (add_metal_migration, shopify_admin, shopify_api_creator, shopify_csv_generator,
+                    shopify_price_sync_api)
+
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'database', 'print_ordering_schema.sql')
+
+# shopify_products and frame_options are created at runtime, not by the schema file
+PRINT_ORDERING_RUNTIME_TABLES = """
+CREATE TABLE IF NOT EXISTS shopify_products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image_filename TEXT NOT NULL,
+    category TEXT,
+    shopify_product_id TEXT NOT NULL,
+    shopify_handle TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(image_filename, category)
+);
+CREATE TABLE IF NOT EXISTS frame_options (
+    frame_option_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subcategory_id INTEGER NOT NULL,
+    frame_name TEXT NOT NULL,
+    is_available BOOLEAN DEFAULT TRUE
+);
+"""
+
+# Union of the columns the app reads from lumaprints_pricing.db
+LUMAPRINTS_SCHEMA = """
+CREATE TABLE settings (id INTEGER PRIMARY KEY AUTOINCREMENT, key_name TEXT UNIQUE NOT NULL, value TEXT NOT NULL);
+CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, display_order INTEGER DEFAULT 0);
+CREATE TABLE product_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, display_order INTEGER DEFAULT 0,
+    has_sub_options INTEGER DEFAULT 0, max_sub_option_levels INTEGER DEFAULT 0, active INTEGER DEFAULT 1
+);
+CREATE TABLE sub_options (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, product_type_id INTEGER, level INTEGER, option_type TEXT,
+    name TEXT, value TEXT, image_path TEXT, display_order INTEGER DEFAULT 0, active INTEGER DEFAULT 1
+);
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, category_id INTEGER, name TEXT, size TEXT, cost_price REAL,
+    retail_price REAL, product_type_id INTEGER, sub_option_1_id INTEGER, sub_option_2_id INTEGER,
+    lumaprints_subcategory_id INTEGER, lumaprints_options TEXT, lumaprints_frame_option INTEGER,
+    active INTEGER DEFAULT 1
+);
+"""
+
+# (source, sql, params) - print_ordering.db, the statements the app itself runs
+PRINT_ORDERING_QUERIES = [
+    ('shopify_api_creator.get_markup_multiplier', shopify_api_creator.GLOBAL_MARKUP_SQL, ()),
+    ('shopify_price_sync_api.load_sync_pricing markup', shopify_price_sync_api.GLOBAL_MARKUP_SQL, ()),
+    ('shopify_csv_generator markup', shopify_csv_generator.GLOBAL_MARKUP_SQL, ()),
+    ('retail_pricing view (specific/subcategory/category/global markup subqueries)', """
+        SELECT * FROM retail_pricing WHERE subcategory_id = ? AND size_id = ?
+    """, (1, 1)),
+    ('shopify_api_creator.create_products_for_image unframed pricing',
+     shopify_api_creator.UNFRAMED_PRICING_SQL, ('Standard',)),
+    ('shopify_api_creator framed canvas pricing',
+     shopify_api_creator.FRAMED_PRICING_SQL, ('Standard', '0.75" Framed Canvas')),
+    ('shopify_api_creator frame price adjustment', shopify_api_creator.FRAME_PRICE_SQL, ('black_floating_075',)),
+    ('shopify_price_sync_api.load_sync_pricing base pricing', shopify_price_sync_api.BASE_PRICING_SQL, ()),
+    ('shopify_price_sync_api.load_sync_pricing framed pricing',
+     shopify_price_sync_api.FRAMED_PRICING_SQL, ('0.75" Framed Canvas',)),
+    ('shopify_price_sync_api frame price adjustment', shopify_price_sync_api.FRAME_PRICE_SQL, ('black_floating_075',)),
+    ('shopify_csv_generator.load_pricing_for_aspect_ratio', shopify_csv_generator.ASPECT_RATIO_PRICING_SQL, ('Standard',)),
+    ('shopify_csv_generator frame options', shopify_csv_generator.FRAME_OPTIONS_125_SQL, ()),
+    ('add_metal_migration aspect ratio lookup', add_metal_migration.STANDARD_ASPECT_RATIO_SQL, ()),
+    ('shopify_admin product lookup', shopify_admin.PRODUCT_MAPPINGS_SQL, ('image.jpg',)),
+]
+
+# (source, sql, params) - lumaprints_pricing.db
+LUMAPRINTS_QUERIES = [
+    ('app.get_hierarchical_product_types', hierarchical_queries.PRODUCT_TYPES_SQL, ()),
+    ('app.get_hierarchical_sub_options', hierarchical_queries.SUB_OPTIONS_SQL, (1, 1)),
+    ('app.get_hierarchical_available_sizes markup', hierarchical_queries.MARKUP_PERCENTAGE_SQL, ()),
+    ('app.get_hierarchical_available_sizes by lumaprints subcategory',
+     *hierarchical_queries.build_available_sizes_query(1, lumaprints_subcategory_id=101001)),
+    ('app.get_hierarchical_available_sizes by lumaprints option',
+     *hierarchical_queries.build_available_sizes_query(2, lumaprints_subcategory_id=102001, lumaprints_option_id=12)),
+    ('app.get_hierarchical_available_sizes by sub option',
+     *hierarchical_queries.build_available_sizes_query(1, sub_option_1_id=1)),
+    ('app.get_hierarchical_available_sizes by both sub options',
+     *hierarchical_queries.build_available_sizes_query(1, sub_option_1_id=1, sub_option_2_id=2)),
+    ('app.get_hierarchical_product_details', hierarchical_queries.PRODUCT_DETAILS_SQL, (1,)),
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def full_scans(conn, sql, params):
+    """Return the plan lines that read a table without using an index"""
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    return [row[3] for row in plan if FULL_SCAN.match(row[3])]
+
+
+def build_print_ordering_db(path):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_FILE, 'r') as f:
+        conn.executescript(f.read())
+    conn.executescript(PRINT_ORDERING_RUNTIME_TABLES)
+    conn.close()
+    migrate_query_indexes.apply_print_ordering_indexes(path)
+    return sqlite3.connect(path)
+
+
+def build_lumaprints_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(LUMAPRINTS_SCHEMA)
+    install_product_option_links(conn)
+    conn.close()
+    migrate_query_indexes.apply_lumaprints_indexes(path)
+    return sqlite3.connect(path)
+
+
+def check_queries(conn, queries):
+    failures = []
+    for source, sql, params in queries:
+        scans = full_scans(conn, sql, params)
+        if scans:
+            failures.append(f'{source}: {scans}')
+    return failures
+
+
+def test_print_ordering_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_print_ordering_db(os.path.join(tmp, 'print_ordering.db'))
+        failures = check_queries(conn, PRINT_ORDERING_QUERIES)
+        conn.close()
+    assert not failures, 'Full table scans:\n' + '\n'.join(failures)
+
+
+def test_lumaprints_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_lumaprints_db(os.path.join(tmp, 'lumaprints_pricing.db'))
+        failures = check_queries(conn, LUMAPRINTS_QUERIES)
+        conn.close()
+    assert not failures, 'Full table scans:\n' + '\n'.join(failures)
+
+
+def test_option_links_follow_product_writes():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(LUMAPRINTS_SCHEMA)
+    install_product_option_links(conn)
+    conn.execute("INSERT INTO products (id, lumaprints_options) VALUES (1, '[1, 4, 123]')")
+    conn.execute("INSERT INTO products (id, lumaprints_options) VALUES (2, '{\"frame_color\": 12}')")
+    conn.execute("INSERT INTO products (id, lumaprints_options) VALUES (3, 'not json')")
+
+    def links(product_id):
+        return [row[0] for row in conn.execute(
+            'SELECT option_id FROM product_option_links WHERE product_id = ? ORDER BY position', (product_id,))]
+
+    assert links(1) == [1, 4, 123]
+    assert links(2) == [12]
+    assert links(3) == []
+    # id 12 no longer matches 123 the way LIKE '%12%' did
+    assert not conn.execute('SELECT 1 FROM product_option_links WHERE option_id = 12 AND product_id = 1').fetchone()
+
+    conn.execute("UPDATE products SET lumaprints_options = '[4]' WHERE id = 1")
+    assert links(1) == [4]
+    conn.execute('DELETE FROM products WHERE id = 2')
+    assert links(2) == []
+    conn.close()
+
+
+def test_migration_is_idempotent():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'print_ordering.db')
+        build_print_ordering_db(path).close()
+        assert migrate_query_indexes.apply_print_ordering_indexes(path)
+
+
+if __name__ == '__main__':
+    test_print_ordering_queries_use_indexes()
+    test_lumaprints_queries_use_indexes()
+    test_option_links_follow_product_writes()
+    test_migration_is_idempotent()
+    print('All production queries use indexes')
@@ -1,149 +1,160 @@
 import os
-from PIL import Image, ImageStat, ImageEnhance
+from functools import lru_cache
+from PIL import Image, ImageStat
+
+# Watermark size as a fraction of the image width
+SCALE_FACTORS = {'small': 0.15, 'medium': 0.25, 'large': 0.35}
+PADDING = 2  # pixels from edge
+
+# Regions brighter than this get the black watermark in auto mode
+AUTO_BRIGHTNESS_THRESHOLD = 140
+# Longest side of the region sampled for the auto brightness check
+BRIGHTNESS_SAMPLE_SIZE = 64
+
+# Resized watermark variants kept in memory, keyed by (file, color, width, opacity)
+WATERMARK_CACHE_SIZE = 64
 
 def get_watermark_path(color='white'):
     """Get path to watermark file based on color"""
     # In production on Railway, this should be /data/watermarks
     # For local dev/sandbox, we check local path first
-    
+
     filename = f"WATERMARK_RCorey_{color.upper()}.png"
-    
+
     # Check /data/watermarks first (Production)
     prod_path = os.path.join('/data/watermarks', filename)
     if os.path.exists(prod_path):
         return prod_path
-        
+
     # Check local app directory (Sandbox/Dev)
     local_path = os.path.join(os.path.dirname(__file__), 'watermarks', filename)
     if os.path.exists(local_path):
         return local_path
-        
+
     return None
 
+@lru_cache(maxsize=8)
+def _load_watermark(path, mtime_ns):
+    """Watermark PNG decoded once per file version (mtime is part of the key so replacing the file reloads it)"""
+    with Image.open(path) as wm_img:
+        return wm_img.convert('RGBA')
+
+@lru_cache(maxsize=WATERMARK_CACHE_SIZE)
+def _scaled_watermark(path, mtime_ns, width, opacity):
+    wm_img = _load_watermark(path, mtime_ns)
+    height = max(1, int(width * wm_img.height / wm_img.width))
+    wm_resized = wm_img.resize((width, height), Image.Resampling.LANCZOS)
+    if opacity < 1.0:
+        alpha = wm_resized.getchannel('A').point(lambda value: int(value * opacity))
+        wm_resized.putalpha(alpha)
+    return wm_resized
+
+def get_watermark(color, width, opacity=1.0):
+    """RGBA watermark of `color` resized to `width` (cached per color/width/opacity), or None if missing"""
+    wm_path = get_watermark_path(color)
+    if not wm_path:
+        return None
+    return _scaled_watermark(wm_path, os.stat(wm_path).st_mtime_ns, max(1, int(width)), round(float(opacity), 3))
+
+def get_watermark_aspect(color='white'):
+    """Height/width ratio of the watermark file, or None if missing"""
+    wm_path = get_watermark_path(color)
+    if not wm_path:
+        return None
+    wm_img = _load_watermark(wm_path, os.stat(wm_path).st_mtime_ns)
+    return wm_img.height / wm_img.width
+
 def calculate_brightness(image_region):
     """
     Calculate average brightness of an image region.
     Returns value 0-255 (0=black, 255=white)
     """
-    # Convert to grayscale
+    # Downsample first: the mean of a small box-filtered copy is close enough to pick a color
+    factor = max(1, max(image_region.size) // BRIGHTNESS_SAMPLE_SIZE)
+    if factor > 1:
+        image_region = image_region.reduce(factor)
     grayscale = image_region.convert('L')
     stat = ImageStat.Stat(grayscale)
     return stat.mean[0]
 
+def watermark_position(width, height, wm_width, wm_height, position='bottom-right'):
+    """Top-left corner of the watermark for a position name"""
+    if position == 'bottom-left':
+        return PADDING, height - wm_height - PADDING
+    if position == 'top-right':
+        return width - wm_width - PADDING, PADDING
+    if position == 'top-left':
+        return PADDING, PADDING
+    if position == 'center':
+        return (width - wm_width) // 2, (height - wm_height) // 2
+    return width - wm_width - PADDING, height - wm_height - PADDING
+
+def watermark_image(base_image, position='bottom-right', size='medium', color_mode='auto', opacity=1.0):
+    """
+    Watermark a PIL image in memory and return it (RGB/RGBA/L images are
+    modified in place; other modes are converted to RGB first).
+    Only the watermark's region is read for auto color and composited.
+    Raises FileNotFoundError if the watermark file is missing.
+    """
+    if base_image.mode not in ('RGB', 'RGBA', 'L'):
+        base_image = base_image.convert('RGB')
+    width, height = base_image.size
+
+    target_wm_width = max(1, int(width * SCALE_FACTORS.get(size, 0.25)))
+    wm_aspect = get_watermark_aspect('black' if color_mode == 'black' else 'white')
+    if wm_aspect is None:
+        raise FileNotFoundError('Watermark file not found')
+    target_wm_height = max(1, int(target_wm_width * wm_aspect))
+    x, y = watermark_position(width, height, target_wm_width, target_wm_height, position)
+
+    # Smart Auto-Color Logic: bright region (>140) gets the black watermark, else white
+    wm_color = 'black' if color_mode == 'black' else 'white'
+    if color_mode == 'auto':
+        region = base_image.crop((x, y, x + target_wm_width, y + target_wm_height))
+        wm_color = 'black' if calculate_brightness(region) > AUTO_BRIGHTNESS_THRESHOLD else 'white'
+
+    wm_resized = get_watermark(wm_color, target_wm_width, opacity)
+    if wm_resized is None:
+        raise FileNotFoundError(f'Watermark file not found for color {wm_color}')
+
+    # Composite just the watermark box, using its alpha as the mask
+    base_image.paste(wm_resized.convert(base_image.mode), (x, y), wm_resized.getchannel('A'))
+    return base_image
+
 def apply_watermark(image_path, output_path=None, position='bottom-right', size='medium', color_mode='auto', opacity=1.0):
     """
     Apply watermark to an image.
-    
+
     Args:
         image_path (str): Path to source image
         output_path (str): Path to save result (defaults to overwriting source)
         position (str): 'bottom-right', 'bottom-left', 'top-right', 'top-left', 'center'
-        size (str): 'small' (10%), 'medium' (20%), 'large' (30%) of image width
+        size (str): 'small' (15%), 'medium' (25%), 'large' (35%) of image width
         color_mode (str): 'auto', 'white', 'black'
         opacity (float): 0.0 to 1.0
     """
     if output_path is None:
         output_path = image_path
-        
-    print(f"DEBUG: Applying watermark to {image_path}")
-    
+
     try:
-        # Open base image
         if not os.path.exists(image_path):
-            print(f"DEBUG: Source image not found at {image_path}")
-            return False
-            
-        base_image = Image.open(image_path).convert('RGBA')
-        print(f"DEBUG: Opened source image. Size: {base_image.size}")
-        width, height = base_image.size
-        
-        # Determine watermark size
-        scale_factors = {'small': 0.15, 'medium': 0.25, 'large': 0.35}
-        scale = scale_factors.get(size, 0.25)
-        target_wm_width = int(width * scale)
-        
-        # Determine position coordinates
-        padding = 2  # 2 pixels from edge
-        
-        # Define regions for brightness calculation if auto
-        # We need to know where the watermark WILL go to check brightness there
-        
-        # Load watermark to get aspect ratio
-        # First, determine which color to load if not auto
-        wm_color = 'white' # Default
-        if color_mode == 'black':
-            wm_color = 'black'
-            
-        wm_path = get_watermark_path(wm_color)
-        print(f"DEBUG: Using watermark file: {wm_path}")
-        
-        if not wm_path:
-            print(f"Watermark file not found for color {wm_color}")
+            print(f"Watermark source image not found at {image_path}")
             return False
-            
-        wm_img = Image.open(wm_path).convert('RGBA')
-        print(f"DEBUG: Opened watermark. Size: {wm_img.size}")
-        wm_aspect = wm_img.height / wm_img.width
-        target_wm_height = int(target_wm_width * wm_aspect)
-        
-        # Calculate coordinates
-        x, y = 0, 0
-        if position == 'bottom-right':
-            x = width - target_wm_width - padding
-            y = height - target_wm_height - padding
-        elif position == 'bottom-left':
-            x = padding
-            y = height - target_wm_height - padding
-        elif position == 'top-right':
-            x = width - target_wm_width - padding
-            y = padding
-        elif position == 'top-left':
-            x = padding
-            y = padding
-        elif position == 'center':
-            x = (width - target_wm_width) // 2
-            y = (height - target_wm_height) // 2
-            
-        # Smart Auto-Color Logic
-        if color_mode == 'auto':
-            # Crop the region where watermark will be
-            region = base_image.crop((x, y, x + target_wm_width, y + target_wm_height))
-            brightness = calculate_brightness(region)
-            
-            # If region is bright (>128), use black watermark. Else white.
-            # We add a threshold buffer.
-            if brightness > 140: 
-                wm_color = 'black'
+
+        with Image.open(image_path) as img:
+            img.load()
+            base_image = watermark_image(img, position=position, size=size, color_mode=color_mode, opacity=opacity)
+
+            # Save result (convert back to RGB for JPEG)
+            if output_path.lower().endswith(('.jpg', '.jpeg')):
+                if base_image.mode != 'RGB':
+                    base_image = base_image.convert('RGB')
+                base_image.save(output_path, quality=95)
             else:
-                wm_color = 'white'
-                
-            # Reload watermark if we guessed wrong initially
-            wm_path = get_watermark_path(wm_color)
-            wm_img = Image.open(wm_path).convert('RGBA')
-            
-        # Resize watermark
-        wm_resized = wm_img.resize((target_wm_width, target_wm_height), Image.Resampling.LANCZOS)
-        
-        # Apply opacity
-        if opacity < 1.0:
-            alpha = wm_resized.split()[3]
-            alpha = ImageEnhance.Brightness(alpha).enhance(opacity)
-            wm_resized.putalpha(alpha)
-            
-        # Composite
-        base_image.paste(wm_resized, (x, y), wm_resized)
-        
-        # Save result (convert back to RGB for JPEG)
-        print(f"DEBUG: Saving to {output_path}")
-        if output_path.lower().endswith(('.jpg', '.jpeg')):
-            base_image = base_image.convert('RGB')
-            base_image.save(output_path, quality=95)
-        else:
-            base_image.save(output_path)
-            
-        print("DEBUG: Save successful")
+                base_image.save(output_path)
+
         return True
-        
+
     except Exception as e:
         print(f"Error applying watermark: {e}")
         return False